@@ -0,0 +1,267 @@
+# ==========================================
+# MODO LOTE POR LÍNEA DE COMANDOS (SIN NAVEGADOR)
+# ==========================================
+#
+# Procesa una carpeta de PDFs con una misma configuración JSON y escribe un
+# DOCX por archivo (y, si se pide, la vista previa en PDF). Cada archivo se
+# procesa en un proceso del pool; no se usa Streamlit ni el caché de resultados.
+#
+# Uso:
+#   python -m app.cli entrada/ salida/ --config lote.json [--procesos N] [--preview]
+#                     [--recursivo] [--sobrescribir] [--reporte reporte.json]
+#
+# Formato de lote.json (todas las claves son opcionales salvo "colores"):
+#   {
+#     "motor_extraccion": "pymupdf",
+#     "usar_toc": true,
+#     "separar_paginas": true,
+#     "padding": 1,
+#     "config_toc": {"fuente": "Arial", "tamano": 16},
+#     "colores": {
+#       "#ffff00": {"accion": "Título", "tamano": 16},
+#       "*": {"accion": "Texto Normal"}
+#     }
+#   }
+# Los colores van en hex como los muestra la app; "*" se aplica a cualquier
+# color que no esté listado. Cada opción se completa con DEFAULT_COLOR_OPTIONS.
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import sys
+import time
+
+from app.config import DEFAULT_COLOR_OPTIONS, DEFAULT_GLOBAL_SETTINGS, DEFAULT_TOC_CONFIG, LISTA_MOTORES
+from app.core import PDFMapeado, escanear_colores_pdf, generar_preview_visual, procesar_pdf, rgb_pdf_a_hex
+
+
+COLOR_POR_DEFECTO = "*"
+
+
+# ==========================================
+# CONFIGURACIÓN DEL LOTE
+# ==========================================
+
+def cargar_config_lote(ruta):
+    """Lee el JSON del lote y lo completa con los valores por defecto de la app"""
+    with open(ruta, encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+
+    colores = datos.get('colores')
+    if not isinstance(colores, dict) or not colores:
+        raise ValueError("El JSON debe tener un objeto 'colores' con al menos un color")
+
+    config = {clave: datos.get(clave, valor) for clave, valor in DEFAULT_GLOBAL_SETTINGS.items()}
+    if config['motor_extraccion'] not in LISTA_MOTORES:
+        raise ValueError(f"Motor desconocido: {config['motor_extraccion']}")
+    config['config_toc'] = dict(DEFAULT_TOC_CONFIG, **datos.get('config_toc', {}))
+    config['colores'] = {
+        color.lower(): dict(DEFAULT_COLOR_OPTIONS, **opciones) for color, opciones in colores.items()
+    }
+    return config
+
+
+def config_para_pdf(config_lote, colores):
+    """Config de procesar_pdf para un PDF con los colores detectados:
+    cada color toma su entrada del lote, o la de "*" si no está listado"""
+    por_defecto = config_lote['colores'].get(COLOR_POR_DEFECTO)
+    mapa_colores = {}
+    for color in colores:
+        opciones = config_lote['colores'].get(rgb_pdf_a_hex(color), por_defecto)
+        if opciones is not None:
+            mapa_colores[color] = dict(opciones)
+
+    return {
+        'padding': config_lote['padding'],
+        'usar_toc': config_lote['usar_toc'],
+        'separar_paginas': config_lote['separar_paginas'],
+        'motor_extraccion': config_lote['motor_extraccion'],
+        'procesos': 1,  # El paralelismo del lote es por archivo
+        'mapa_colores': mapa_colores,
+        'config_toc': config_lote['config_toc']
+    }
+
+
+# ==========================================
+# PROCESAMIENTO DE UN ARCHIVO (EN UN WORKER)
+# ==========================================
+
+def _escribir(ruta, datos):
+    """Escritura atómica: un archivo a medio escribir nunca queda con el nombre final"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    ruta_tmp = ruta + ".tmp"
+    with open(ruta_tmp, "wb") as f:
+        f.write(datos)
+    os.replace(ruta_tmp, ruta)
+
+
+def procesar_archivo(ruta_pdf, ruta_docx, config_lote, ruta_preview=None):
+    """Tarea de un proceso worker: escanea colores, genera el DOCX y opcionalmente la vista previa.
+    Retorna un resumen del archivo; los errores se reportan en el resumen en vez de propagarse."""
+    resumen = {'archivo': ruta_pdf, 'estado': "ok", 'docx': None, 'preview': None, 'avisos': []}
+    inicio = time.perf_counter()
+    try:
+        # El archivo se mapea una vez y cada parser lo lee sin copiarlo
+        with PDFMapeado(ruta_pdf) as pdf:
+            colores = escanear_colores_pdf(pdf.abrir(), config_lote['motor_extraccion'])
+            config = config_para_pdf(config_lote, colores)
+            word_buffer, lista_datos = procesar_pdf(pdf.abrir(), config)
+
+        resumen['colores'] = [rgb_pdf_a_hex(color) for color in colores]
+        resumen['elementos'] = len(lista_datos)
+        if not lista_datos:
+            resumen['estado'] = "sin_contenido"
+        else:
+            _escribir(ruta_docx, word_buffer.getvalue())
+            resumen['docx'] = ruta_docx
+            if ruta_preview:
+                pdf_bytes = generar_preview_visual(
+                    lista_datos, config['mapa_colores'], config['config_toc'],
+                    al_avisar=resumen['avisos'].append
+                )
+                _escribir(ruta_preview, pdf_bytes)
+                resumen['preview'] = ruta_preview
+    except Exception as e:
+        resumen['estado'] = "error"
+        resumen['error'] = f"{type(e).__name__}: {e}"
+    resumen['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumen
+
+
+# ==========================================
+# LOTE
+# ==========================================
+
+def buscar_pdfs(entrada, recursivo=False):
+    """Rutas de los PDFs de la entrada (un archivo o una carpeta), en orden estable"""
+    if os.path.isfile(entrada):
+        return [entrada]
+    if recursivo:
+        rutas = [
+            os.path.join(carpeta, nombre)
+            for carpeta, _, nombres in os.walk(entrada)
+            for nombre in nombres
+        ]
+    else:
+        rutas = [os.path.join(entrada, nombre) for nombre in os.listdir(entrada)]
+    return sorted(ruta for ruta in rutas if ruta.lower().endswith(".pdf") and os.path.isfile(ruta))
+
+
+def rutas_salida(ruta_pdf, entrada, salida):
+    """DOCX y vista previa de un PDF, replicando su subcarpeta dentro de la salida"""
+    base = os.path.dirname(entrada) if os.path.isfile(entrada) else entrada
+    relativa = os.path.splitext(os.path.relpath(ruta_pdf, base))[0]
+    destino = os.path.join(salida, relativa)
+    return destino + ".docx", destino + "_preview.pdf"
+
+
+def procesar_lote(pdfs, entrada, salida, config_lote, procesos=1, preview=False, sobrescribir=False, al_terminar=None):
+    """Procesa los PDFs repartidos en un pool de procesos.
+    al_terminar(resumen, listos, total) se llama a medida que termina cada archivo.
+    Retorna los resúmenes en el orden de pdfs."""
+    tareas = []
+    resumenes = {}
+    for ruta_pdf in pdfs:
+        ruta_docx, ruta_preview = rutas_salida(ruta_pdf, entrada, salida)
+        if not sobrescribir and os.path.exists(ruta_docx):
+            resumenes[ruta_pdf] = {'archivo': ruta_pdf, 'estado': "omitido", 'docx': ruta_docx}
+            continue
+        tareas.append((ruta_pdf, ruta_docx, config_lote, ruta_preview if preview else None))
+
+    listos = len(resumenes)
+    for resumen in resumenes.values():
+        if al_terminar:
+            al_terminar(resumen, listos, len(pdfs))
+
+    if procesos <= 1:
+        for tarea in tareas:
+            resumen = procesar_archivo(*tarea)
+            resumenes[resumen['archivo']] = resumen
+            listos += 1
+            if al_terminar:
+                al_terminar(resumen, listos, len(pdfs))
+    elif tareas:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+            futuros = [pool.submit(procesar_archivo, *tarea) for tarea in tareas]
+            try:
+                for futuro in as_completed(futuros):
+                    resumen = futuro.result()
+                    resumenes[resumen['archivo']] = resumen
+                    listos += 1
+                    if al_terminar:
+                        al_terminar(resumen, listos, len(pdfs))
+            except KeyboardInterrupt:
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    return [resumenes[ruta_pdf] for ruta_pdf in pdfs if ruta_pdf in resumenes]
+
+
+def _imprimir_avance(resumen, listos, total):
+    nombre = os.path.basename(resumen['archivo'])
+    detalle = {
+        "ok": f"{resumen.get('elementos', 0)} elementos",
+        "sin_contenido": "sin contenido para los colores configurados",
+        "omitido": "ya existe el DOCX",
+        "error": resumen.get('error', ""),
+    }[resumen['estado']]
+    segundos = f" ({resumen['segundos']:.1f} s)" if 'segundos' in resumen else ""
+    print(f"[{listos}/{total}] {nombre}: {resumen['estado']} - {detalle}{segundos}", flush=True)
+    for aviso in resumen.get('avisos', []):
+        print(f"    {aviso}", flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Procesa en lote una carpeta de PDFs y genera un DOCX por archivo"
+    )
+    parser.add_argument("entrada", help="Carpeta con PDFs (o un único PDF)")
+    parser.add_argument("salida", help="Carpeta donde se escriben los DOCX")
+    parser.add_argument("--config", required=True, help="JSON con colores, TOC y ajustes globales")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                        help="Archivos procesados en paralelo (por defecto, uno por CPU)")
+    parser.add_argument("--preview", action="store_true", help="Generar también la vista previa en PDF")
+    parser.add_argument("--recursivo", action="store_true", help="Incluir subcarpetas")
+    parser.add_argument("--sobrescribir", action="store_true", help="Reprocesar aunque el DOCX ya exista")
+    parser.add_argument("--reporte", help="Guardar el resumen del lote en este JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        config_lote = cargar_config_lote(args.config)
+    except (OSError, ValueError) as e:
+        parser.error(f"Config inválida: {e}")
+    if not os.path.exists(args.entrada):
+        parser.error(f"No existe la entrada: {args.entrada}")
+
+    pdfs = buscar_pdfs(args.entrada, args.recursivo)
+    if not pdfs:
+        print("No se encontraron PDFs.")
+        return 0
+
+    inicio = time.perf_counter()
+    resumenes = procesar_lote(
+        pdfs, args.entrada, args.salida, config_lote,
+        procesos=max(1, args.procesos),
+        preview=args.preview,
+        sobrescribir=args.sobrescribir,
+        al_terminar=_imprimir_avance
+    )
+    duracion = time.perf_counter() - inicio
+
+    por_estado = {}
+    for resumen in resumenes:
+        por_estado[resumen['estado']] = por_estado.get(resumen['estado'], 0) + 1
+    print(f"\n{len(resumenes)} archivo(s) en {duracion:.1f} s: "
+          + ", ".join(f"{estado} {cantidad}" for estado, cantidad in sorted(por_estado.items())))
+
+    if args.reporte:
+        with open(args.reporte, "w", encoding="utf-8") as archivo:
+            json.dump({'duracion_s': round(duracion, 3), 'archivos': resumenes}, archivo, indent=2, ensure_ascii=False)
+
+    return 1 if por_estado.get("error") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -49,6 +49,18 @@ LISTA_ESPACIADOS = [
     "Doble"
 ]
 
+# Motores de extracción disponibles (ver app/core/motores_pdf.py)
+LISTA_MOTORES = {
+    "pymupdf": "PyMuPDF (una sola pasada)",
+    "pypdf": "pypdf + pdfplumber (clásico)"
+}
+
+# Modos de vista previa: PDF fiel (FPDF) o HTML liviano sin generar un PDF
+LISTA_MODOS_PREVIEW = {
+    "pdf": "PDF (fiel al documento)",
+    "html": "HTML (rápida)"
+}
+
 # Valores por defecto para opciones de color
 DEFAULT_COLOR_OPTIONS = {
     'accion': 'Ignorar',
@@ -71,5 +83,7 @@ DEFAULT_TOC_CONFIG = {
 DEFAULT_GLOBAL_SETTINGS = {
     'usar_toc': True,
     'separar_paginas': True,
-    'padding': 1
+    'padding': 1,
+    'motor_extraccion': 'pymupdf',
+    'modo_preview': 'pdf'
 }
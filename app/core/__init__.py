@@ -1,7 +1,12 @@
 # Core - Lógica de negocio (extracción, generación, utilidades)
 from .utils import rgb_pdf_a_hex, escanear_colores_pdf, obtener_mapa_capitulos
-from .pdf_extractor import procesar_pdf
-from .pdf_preview import generar_preview_visual
+from .cache import hash_contenido, cache_resultados, clave_resultado
+from .instrumentacion import RegistroInstrumentacion
+from .ingesta import LectorMapeado, PDFMapeado, presupuesto_memoria
+from .pdf_extractor import procesar_pdf, extraer_documento, renderizar_documento
+from .pdf_preview import generar_preview_visual, generar_preview_ventana
+from .html_preview import generar_preview_html
+from .trabajos import cola_trabajos, trabajo_procesar_pdf, ESTADOS_FINALES
 from .word_generator import (
     aplicar_estilos_word,
     agregar_heading_toc,
@@ -0,0 +1,111 @@
+# ==========================================
+# CACHÉ DE RESULTADOS POR CONTENIDO (LRU)
+# ==========================================
+
+from collections import OrderedDict
+import hashlib
+import io
+import sys
+import threading
+
+
+TAMANO_BLOQUE_HASH = 1024 * 1024  # 1 MB por lectura
+PRESUPUESTO_CACHE_MB = 256
+
+# Claves de config que no cambian el resultado (solo cómo se calcula)
+CLAVES_SIN_EFECTO = ('procesos', 'exportar_disco', 'usuario')
+
+
+def hash_contenido(archivo, tam_bloque=TAMANO_BLOQUE_HASH):
+    """SHA-256 del archivo leído por bloques, sin cargarlo entero en memoria"""
+    h = hashlib.sha256()
+    archivo.seek(0)
+    for bloque in iter(lambda: archivo.read(tam_bloque), b""):
+        h.update(bloque)
+    archivo.seek(0)
+    return h.hexdigest()
+
+
+def _congelar(valor):
+    """Convierte dicts/listas anidados en tuplas ordenadas (hashables y deterministas)"""
+    if isinstance(valor, dict):
+        return tuple(sorted((repr(k), _congelar(v)) for k, v in valor.items()))
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        items = [_congelar(v) for v in valor]
+        return tuple(sorted(items, key=repr)) if isinstance(valor, (set, frozenset)) else tuple(items)
+    return valor
+
+
+def normalizar_config(config):
+    """Representación canónica de la config, ignorando claves que no afectan el resultado"""
+    return _congelar({k: v for k, v in config.items() if k not in CLAVES_SIN_EFECTO})
+
+
+def _tamano_aproximado(valor):
+    """Estimación barata del tamaño en bytes de un valor cacheado"""
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, io.BytesIO):
+        return valor.getbuffer().nbytes
+    if isinstance(valor, str):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(_tamano_aproximado(k) + _tamano_aproximado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(_tamano_aproximado(v) for v in valor) + 8 * len(valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Caché LRU con presupuesto en bytes, compartido por todas las sesiones del proceso"""
+
+    def __init__(self, presupuesto_bytes):
+        self.presupuesto_bytes = presupuesto_bytes
+        self.bytes_usados = 0
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        """Retorna el valor cacheado (o None) y lo marca como usado recientemente"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[0]
+
+    def guardar(self, clave, valor):
+        """Guarda el valor y desaloja los menos usados hasta entrar en el presupuesto"""
+        tamano = _tamano_aproximado(valor)
+        if tamano > self.presupuesto_bytes:
+            return
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior[1]
+            self._entradas[clave] = (valor, tamano)
+            self.bytes_usados += tamano
+            while self.bytes_usados > self.presupuesto_bytes:
+                _, (_, tamano_viejo) = self._entradas.popitem(last=False)
+                self.bytes_usados -= tamano_viejo
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes_usados = 0
+
+
+cache_resultados = CacheLRU(PRESUPUESTO_CACHE_MB * 1024 * 1024)
+
+
+def clave_colores(hash_pdf, motor_extraccion):
+    return ("colores", hash_pdf, motor_extraccion)
+
+
+def clave_extraccion(hash_pdf, motor_extraccion):
+    """La representación intermedia no depende de estilos: solo del PDF y del motor"""
+    return ("extraccion", hash_pdf, motor_extraccion)
+
+
+def clave_resultado(hash_pdf, config):
+    return ("resultado", hash_pdf, normalizar_config(config))
@@ -0,0 +1,140 @@
+# ==========================================
+# ESCRITOR DOCX EN STREAMING
+# ==========================================
+#
+# En lugar de construir todo el árbol de python-docx en memoria, escribe
+# word/document.xml párrafo a párrafo dentro del zip a medida que llegan
+# los registros. Cada estilo distinto se arma UNA vez con las mismas
+# funciones de word_generator sobre un documento auxiliar; de ahí sale
+# una plantilla XML (prefijo + texto + sufijo) que luego solo se rellena.
+# Los estilos con nombre que registra el documento auxiliar se escriben
+# en word/styles.xml al cerrar.
+
+from docx import Document
+from docx.opc.oxml import serialize_part_xml
+from xml.sax.saxutils import escape
+import io
+import zipfile
+
+from .word_generator import (
+    RegistroEstilos,
+    agregar_heading_toc,
+    agregar_separador_pagina,
+    agregar_texto_resaltado
+)
+
+
+PARTE_DOCUMENTO = "word/document.xml"
+PARTE_ESTILOS = "word/styles.xml"
+_MARCADOR = "\ue000"  # Carácter de uso privado: nunca aparece en texto extraído
+
+_docx_base = None
+
+
+def _bytes_docx_base():
+    """Documento vacío de python-docx serializado una sola vez por proceso"""
+    global _docx_base
+    if _docx_base is None:
+        buffer = io.BytesIO()
+        Document().save(buffer)
+        _docx_base = buffer.getvalue()
+    return _docx_base
+
+
+def _partes_xml(doc):
+    """Divide document.xml en (cabecera hasta <w:body>, cuerpo, pie desde <w:sectPr>)"""
+    xml = serialize_part_xml(doc.element)
+    inicio = xml.index(b"<w:body>") + len(b"<w:body>")
+    fin = xml.rindex(b"<w:sectPr")
+    return xml[:inicio], xml[inicio:fin], xml[fin:]
+
+
+def _texto_simple(texto):
+    """True si el texto se serializa igual escapándolo a mano.
+    Tabs, saltos y espacios en los bordes los transforma python-docx: van por el camino lento."""
+    return (
+        texto == texto.strip()
+        and not any(c in texto for c in "\t\n\r" + _MARCADOR)
+        and all(c >= " " for c in texto)
+    )
+
+
+class EscritorDocxStreaming:
+    """Escribe el DOCX incrementalmente con la misma interfaz que DocumentoWord"""
+
+    def __init__(self):
+        self._buffer = io.BytesIO()
+        self._plantillas = {}
+
+        # Documento auxiliar: registra los estilos y sirve para armar las plantillas
+        self._doc = Document(io.BytesIO(_bytes_docx_base()))
+        self.estilos = RegistroEstilos(self._doc)
+
+        base = zipfile.ZipFile(io.BytesIO(_bytes_docx_base()))
+        self._zip = zipfile.ZipFile(self._buffer, "w", zipfile.ZIP_DEFLATED)
+        for nombre in base.namelist():
+            if nombre not in (PARTE_DOCUMENTO, PARTE_ESTILOS):
+                self._zip.writestr(nombre, base.read(nombre))
+
+        cabecera, _, self._pie = _partes_xml(self._doc)
+        self._xml = self._zip.open(PARTE_DOCUMENTO, "w", force_zip64=True)
+        self._xml.write(cabecera)
+
+    def _fragmento(self, construir):
+        """XML exacto que python-docx produce para los párrafos que agrega construir(doc).
+        Los párrafos se quitan del documento auxiliar apenas se serializan."""
+        construir(self._doc)
+        fragmento = _partes_xml(self._doc)[1]
+        body = self._doc.element.body
+        for elemento in list(body):
+            if elemento is not body.sectPr:
+                body.remove(elemento)
+        return fragmento
+
+    def _escribir(self, clave, construir, texto):
+        """Escribe un párrafo usando la plantilla del estilo (o python-docx si el texto es raro)"""
+        if not _texto_simple(texto):
+            self._xml.write(self._fragmento(lambda doc: construir(doc, texto)))
+            return
+        plantilla = self._plantillas.get(clave)
+        if plantilla is None:
+            xml = self._fragmento(lambda doc: construir(doc, _MARCADOR)).decode("utf-8")
+            prefijo, sufijo = xml.split(_MARCADOR)
+            plantilla = (prefijo.encode("utf-8"), sufijo.encode("utf-8"))
+            self._plantillas[clave] = plantilla
+        self._xml.write(plantilla[0] + escape(texto).encode("utf-8") + plantilla[1])
+
+    def agregar_heading_toc(self, titulo_toc, nivel_word, config_toc):
+        clave = ("toc", nivel_word, tuple(sorted(config_toc.items())))
+        self._escribir(
+            clave,
+            lambda doc, t: agregar_heading_toc(doc, t, nivel_word, config_toc, self.estilos),
+            titulo_toc
+        )
+
+    def agregar_separador_pagina(self, num_pag):
+        # El número de página es lo único variable dentro del texto del separador
+        self._escribir(
+            ("sep",),
+            lambda doc, t: agregar_separador_pagina(doc, t, self.estilos),
+            str(num_pag)
+        )
+        return f"--- Página {num_pag} ---"
+
+    def agregar_texto_resaltado(self, texto_final, conf):
+        clave = ("resaltado", tuple(sorted(conf.items())))
+        self._escribir(
+            clave,
+            lambda doc, t: agregar_texto_resaltado(doc, t, conf, self.estilos),
+            texto_final
+        )
+
+    def guardar(self):
+        """Cierra document.xml, agrega los estilos registrados y cierra el zip;
+        retorna el buffer listo para descargar"""
+        self._xml.write(self._pie)
+        self._xml.close()
+        self._zip.writestr(PARTE_ESTILOS, serialize_part_xml(self._doc.styles.element))
+        self._zip.close()
+        self._buffer.seek(0)
+        return self._buffer
@@ -0,0 +1,101 @@
+# ==========================================
+# GENERADOR DE VISTA PREVIA HTML
+# ==========================================
+#
+# Alternativa liviana a la vista previa FPDF: convierte lista_datos
+# directamente en HTML con estilos en línea. Respeta la misma semántica que
+# renderizar_resaltado / renderizar_toc / renderizar_separador del preview PDF.
+
+import html
+
+from .cache import cache_resultados
+from .instrumentacion import instrumentar
+
+
+ALINEACIONES_CSS = {"Izquierda": "left", "Centrado": "center", "Derecha": "right", "Justificado": "justify"}
+INTERLINEADOS_CSS = {"Simple": "1.0", "1.15": "1.15", "1.5": "1.5", "Doble": "2.0"}
+
+_ESTILO_PAGINA = (
+    "background:#fff;color:#000;max-width:700px;margin:0 auto;padding:24px 32px;"
+    "font-family:Arial,Helvetica,sans-serif;"
+)
+
+
+def _html_toc(tipo, texto, config_toc):
+    """Mismo criterio que renderizar_toc: negrita, azul y 2 pt menos desde el nivel 2"""
+    nivel = int(tipo[-1])
+    font_size = config_toc.get('tamano', 14)
+    if nivel > 1:
+        font_size -= 2
+    fuente = html.escape(config_toc.get('fuente', 'Arial'))
+    return (
+        f'<p style="margin:8px 0 4px;font-family:{fuente};font-size:{font_size}pt;'
+        f'font-weight:bold;color:rgb(31,73,125);">{html.escape(texto)}</p>'
+    )
+
+
+def _html_separador(texto):
+    """Mismo criterio que renderizar_separador: itálica, 9 pt, gris y centrado"""
+    return (
+        '<p style="margin:16px 0 4px;font-size:9pt;font-style:italic;'
+        f'color:rgb(150,150,150);text-align:center;">{html.escape(texto)}</p>'
+    )
+
+
+def _html_resaltado(texto, ref, config_colores_final):
+    """Mismo criterio que renderizar_resaltado: tamaño, negrita, alineación y listas simuladas"""
+    font_size = 11
+    peso = 'normal'
+    align = 'left'
+    fuente = 'Arial'
+    interlineado = '1.0'
+
+    if ref in config_colores_final:
+        conf = config_colores_final[ref]
+        font_size = conf.get('tamano', 11)
+        fuente = conf.get('fuente', 'Arial')
+
+        if conf['accion'] in ["Título", "Dato Clave"]:
+            peso = 'bold'
+
+        align = ALINEACIONES_CSS.get(conf.get('alineacion', 'Izquierda'), 'left')
+        interlineado = INTERLINEADOS_CSS.get(conf.get('interlineado', 'Simple'), '1.0')
+
+        # Listas simuladas
+        if conf.get('lista') == "Bullets (•)":
+            texto = f"• {texto}"
+        elif conf.get('lista') == "Numerada (1.)":
+            texto = f"1. {texto}"
+
+    return (
+        f'<p style="margin:0 0 4px;font-family:{html.escape(fuente)};font-size:{font_size}pt;'
+        f'font-weight:{peso};text-align:{align};line-height:{interlineado};">{html.escape(texto)}</p>'
+    )
+
+
+@instrumentar("preview_html")
+def generar_preview_html(lista_datos, config_colores_final, config_toc, clave_cache=None):
+    """Genera la vista previa como HTML. Con clave_cache se reutiliza desde el caché."""
+    clave = ("preview_html", clave_cache) if clave_cache else None
+    if clave:
+        cacheado = cache_resultados.obtener(clave)
+        if cacheado is not None:
+            return cacheado
+
+    partes = [f'<div style="{_ESTILO_PAGINA}">']
+    for tipo, texto, ref in lista_datos:
+        # CASO A: TOC
+        if "CAPITULO_L" in tipo:
+            partes.append(_html_toc(tipo, texto, config_toc))
+        # CASO B: Separador
+        elif tipo == "Separador":
+            partes.append(_html_separador(texto))
+        # CASO C: Resaltados
+        else:
+            partes.append(_html_resaltado(texto, ref, config_colores_final))
+    partes.append('</div>')
+    resultado = "".join(partes)
+
+    if clave:
+        cache_resultados.guardar(clave, resultado)
+    return resultado
@@ -0,0 +1,217 @@
+# ==========================================
+# ÍNDICE ESPACIAL DE CARACTERES POR PÁGINA
+# ==========================================
+
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa el índice en Python puro
+    np = None
+
+
+class OrdenPagina:
+    """Columnas y orden de lectura de los caracteres que seleccionan los
+    highlights de una página, armados una sola vez para todos ellos.
+    reconstruir_texto ordena cada highlight comparando los rangos enteros
+    rango_y / rango_x en lugar de volver a ordenar diccionarios por top y
+    luego cada línea por x0. Las columnas se indexan por posición local
+    (0..m-1 sobre la unión de lo seleccionado); selecciones trae, para cada
+    highlight, sus caracteres ya traducidos a esas posiciones."""
+
+    def __init__(self, textos, x0, x1, top, alto, claves, rango_y, rango_x, selecciones):
+        self.textos = textos
+        self.x0 = x0
+        self.x1 = x1
+        self.top = top
+        self.alto = alto
+        self.claves = claves  # Iguales si y solo si coinciden x0 y top redondeados a 1 decimal
+        self.rango_y = rango_y  # Posición en el orden (top, x0)
+        self.rango_x = rango_x  # Posición en el orden (x0, top)
+        self.selecciones = selecciones
+
+
+def orden_lectura(all_chars, selecciones):
+    """Arma el OrdenPagina en Python puro para las selecciones (listas de índices de all_chars)"""
+    locales = {}
+    for indices in selecciones:
+        for idx in indices:
+            if idx not in locales:
+                locales[idx] = len(locales)
+    selecciones = [[locales[idx] for idx in indices] for indices in selecciones]
+
+    textos, x0s, x1s, tops, altos, claves = [], [], [], [], [], []
+    for idx in locales:
+        c = all_chars[idx]
+        x0, top = c['x0'], c['top']
+        textos.append(c['text'])
+        x0s.append(x0)
+        x1s.append(c['x1'])
+        tops.append(top)
+        altos.append(c['bottom'] - top)
+        claves.append((round(x0, 1), round(top, 1)))
+
+    m = len(locales)
+    rango_y = [0] * m
+    rango_x = [0] * m
+    for posicion, (_, _, k) in enumerate(sorted(zip(tops, x0s, range(m)))):
+        rango_y[k] = posicion
+    for posicion, (_, _, k) in enumerate(sorted(zip(x0s, tops, range(m)))):
+        rango_x[k] = posicion
+    return OrdenPagina(textos, x0s, x1s, tops, altos, claves, rango_y, rango_x, selecciones)
+
+
+def _decimas(valores):
+    """Entero k tal que round(v, 1) == k / 10, vectorizado. Solo los valores cuyo
+    v * 10 queda pegado a x.5 (donde el redondeo binario puede diferir del de
+    Python) se resuelven uno por uno con round()."""
+    escalados = valores * 10
+    decimas = np.rint(escalados)
+    dudosos = np.nonzero(np.abs(np.abs(escalados - np.floor(escalados)) - 0.5) < 1e-6)[0]
+    for k in dudosos.tolist():
+        decimas[k] = round(round(float(valores[k]), 1) * 10)
+    return decimas.astype(np.int64)
+
+
+def _rangos(permutacion):
+    """Invierte una permutación: posición de cada índice dentro del orden"""
+    rangos = np.empty_like(permutacion)
+    rangos[permutacion] = np.arange(len(permutacion))
+    return rangos
+
+
+class IndiceEspacialPagina:
+    """Índice de caracteres de una página ordenado por punto medio vertical.
+    Se construye una sola vez por página y lo comparten todos sus highlights:
+    cada consulta de rectángulo hace una búsqueda binaria sobre la banda
+    vertical y solo filtra en X los caracteres de esa banda."""
+
+    def __init__(self, all_chars):
+        self.chars = all_chars
+        medios = []
+        for idx, char in enumerate(all_chars):
+            char_mid_y = (char['top'] + char['bottom']) / 2
+            char_mid_x = (char['x0'] + char['x1']) / 2
+            medios.append((char_mid_y, idx, char_mid_x))
+        medios.sort()
+        self._mid_y = [m[0] for m in medios]
+        self._indices = [m[1] for m in medios]
+        self._mid_x = [m[2] for m in medios]
+
+    def indices(self, top, bottom, left, right):
+        """Índices de los caracteres cuyo punto medio cae dentro del rectángulo,
+        en el mismo orden en que aparecen en la página."""
+        inicio = bisect_left(self._mid_y, top)
+        fin = bisect_right(self._mid_y, bottom)
+        encontrados = [
+            self._indices[k] for k in range(inicio, fin)
+            if left <= self._mid_x[k] <= right
+        ]
+        encontrados.sort()
+        return encontrados
+
+    def indices_varios(self, rects):
+        """Índices para una lista de rectángulos (top, bottom, left, right), concatenados"""
+        encontrados = []
+        for top, bottom, left, right in rects:
+            encontrados.extend(self.indices(top, bottom, left, right))
+        return encontrados
+
+    def orden_lectura(self, selecciones):
+        """OrdenPagina para las selecciones de los highlights de la página"""
+        return orden_lectura(self.chars, selecciones)
+
+    def consultar(self, top, bottom, left, right):
+        """Retorna los caracteres cuyo punto medio cae dentro del rectángulo,
+        en el mismo orden en que aparecen en la página."""
+        return [self.chars[idx] for idx in self.indices(top, bottom, left, right)]
+
+    def consultar_varios(self, rects):
+        """Consulta una lista de rectángulos (top, bottom, left, right) y concatena los resultados"""
+        return [self.chars[idx] for idx in self.indices_varios(rects)]
+
+
+class TablaCaracteresPagina:
+    """Tabla preprocesada de los caracteres de una página, armada una sola vez y
+    compartida por todos sus highlights: columnas contiguas (x0, x1, top, bottom),
+    puntos medios y altos. Las filas se ordenan por punto medio vertical, así que
+    los caracteres de un mismo renglón quedan contiguos: cada quad selecciona un
+    rango de filas con dos búsquedas binarias y solo filtra en X dentro de ese
+    rango. El orden de lectura (por Y y por X) se arma después con orden_lectura
+    sobre la unión de lo que seleccionan los highlights de la página."""
+
+    def __init__(self, all_chars):
+        self.chars = all_chars
+        n = len(all_chars)
+        self.x0 = np.fromiter((c['x0'] for c in all_chars), dtype=np.float64, count=n)
+        self.x1 = np.fromiter((c['x1'] for c in all_chars), dtype=np.float64, count=n)
+        self.top = np.fromiter((c['top'] for c in all_chars), dtype=np.float64, count=n)
+        self.bottom = np.fromiter((c['bottom'] for c in all_chars), dtype=np.float64, count=n)
+        self.mid_x = (self.x0 + self.x1) / 2
+        self.mid_y = (self.top + self.bottom) / 2
+        self.alto = self.bottom - self.top
+
+        # Filas ordenadas por punto medio vertical; cada selección se reordena
+        # luego por índice de página, así que el orden entre empates no importa
+        self._filas = np.argsort(self.mid_y)
+        self._mid_y_filas = self.mid_y[self._filas]
+        self._mid_x_filas = self.mid_x[self._filas]
+
+    def indices(self, top, bottom, left, right):
+        """Índices de los caracteres cuyo punto medio cae dentro del rectángulo,
+        en el mismo orden en que aparecen en la página."""
+        return self.indices_varios([(top, bottom, left, right)])
+
+    def indices_varios(self, rects):
+        """Índices para una lista de rectángulos (top, bottom, left, right), concatenados"""
+        encontrados = []
+        for top, bottom, left, right in rects:
+            inicio = self._mid_y_filas.searchsorted(top, 'left')
+            fin = self._mid_y_filas.searchsorted(bottom, 'right')
+            mid_x = self._mid_x_filas[inicio:fin]
+            rango = self._filas[inicio:fin][(left <= mid_x) & (mid_x <= right)]
+            rango.sort()
+            encontrados.extend(rango.tolist())
+        return encontrados
+
+    def consultar(self, top, bottom, left, right):
+        """Retorna los caracteres cuyo punto medio cae dentro del rectángulo,
+        en el mismo orden en que aparecen en la página."""
+        return [self.chars[idx] for idx in self.indices(top, bottom, left, right)]
+
+    def consultar_varios(self, rects):
+        """Consulta una lista de rectángulos (top, bottom, left, right) y concatena los resultados"""
+        return [self.chars[idx] for idx in self.indices_varios(rects)]
+
+    def orden_lectura(self, selecciones):
+        """OrdenPagina para las selecciones de los highlights de la página: toma de
+        la tabla las filas de la unión de los índices seleccionados"""
+        largos = [len(indices) for indices in selecciones]
+        todos = np.fromiter((idx for indices in selecciones for idx in indices), dtype=np.intp, count=sum(largos))
+        unicos, locales = np.unique(todos, return_inverse=True)
+        locales = locales.tolist()
+        cortes = [0]
+        for largo in largos:
+            cortes.append(cortes[-1] + largo)
+
+        x0, top = self.x0[unicos], self.top[unicos]
+        # Una sola clave entera por caracter: décimas de x0 en los bits altos, de top en los bajos
+        claves = _decimas(x0) * (1 << 32) + _decimas(top)
+        return OrdenPagina(
+            [self.chars[idx]['text'] for idx in unicos.tolist()],
+            x0.tolist(),
+            self.x1[unicos].tolist(),
+            top.tolist(),
+            self.alto[unicos].tolist(),
+            claves.tolist(),
+            _rangos(np.lexsort((x0, top))).tolist(),
+            _rangos(np.lexsort((top, x0))).tolist(),
+            [locales[inicio:fin] for inicio, fin in zip(cortes, cortes[1:])]
+        )
+
+
+def crear_indice_pagina(all_chars):
+    """Crea el índice de la página: la tabla preprocesada si NumPy está disponible, en Python puro si no"""
+    if np is not None:
+        return TablaCaracteresPagina(all_chars)
+    return IndiceEspacialPagina(all_chars)
@@ -0,0 +1,179 @@
+# ==========================================
+# INGESTA CON MEMORIA ACOTADA (SPOOL + MMAP)
+# ==========================================
+#
+# Un PDF subido de 200 MB no debe copiarse una vez por parser. PDFMapeado
+# vuelca la subida a un archivo temporal anónimo (sin nombre en disco, se
+# borra al cerrarse) y lo mapea en memoria una sola vez. Cada parser recibe su
+# propio LectorMapeado sobre el mismo mapa: cursor independiente y sin copiar
+# el contenido (PyMuPDF lo usa directo con getbuffer()). Las páginas del mapa
+# viven en el caché de páginas del sistema y se pueden liberar bajo presión.
+#
+# PresupuestoMemoria limita cuánta memoria estimada pueden tomar a la vez los
+# trabajos en curso: los que no entran esperan su turno en vez de sumar RSS.
+
+from contextlib import contextmanager
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+
+
+TAMANO_BLOQUE_SPOOL = 1024 * 1024  # 1 MB por escritura al temporal
+PRESUPUESTO_MEMORIA_MB = 1024
+
+# Estimación del pico de un trabajo: estructuras de los parsers y del DOCX por
+# cada byte del PDF, más una base fija (fuentes, documento base, intérprete)
+FACTOR_MEMORIA_PDF = 2
+MEMORIA_BASE_TRABAJO_MB = 64
+
+_MB = 1024 * 1024
+
+
+class LectorMapeado(io.RawIOBase):
+    """Archivo de solo lectura sobre un mapa compartido, con cursor propio.
+    ruta: archivo mapeado, para que otro proceso lo abra (None si es un temporal anónimo)"""
+
+    def __init__(self, vista, ruta=None):
+        self._vista = vista
+        self._posicion = 0
+        self.ruta = ruta
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._posicion
+
+    def seek(self, desplazamiento, desde=io.SEEK_SET):
+        if desde == io.SEEK_SET:
+            self._posicion = desplazamiento
+        elif desde == io.SEEK_CUR:
+            self._posicion += desplazamiento
+        elif desde == io.SEEK_END:
+            self._posicion = len(self._vista) + desplazamiento
+        else:
+            raise ValueError(f"whence inválido: {desde}")
+        if self._posicion < 0:
+            raise ValueError("Posición negativa")
+        return self._posicion
+
+    def read(self, cantidad=-1):
+        fin = len(self._vista) if cantidad is None or cantidad < 0 else min(self._posicion + cantidad, len(self._vista))
+        datos = self._vista[self._posicion:fin].tobytes() if fin > self._posicion else b""
+        self._posicion = max(self._posicion, fin)
+        return datos
+
+    def readinto(self, destino):
+        datos = self.read(len(destino))
+        destino[:len(datos)] = datos
+        return len(datos)
+
+    def getbuffer(self):
+        """Vista de todo el contenido sin copiar (como io.BytesIO.getbuffer)"""
+        return self._vista
+
+    def close(self):
+        self._vista = memoryview(b"")
+        super().close()
+
+
+class PDFMapeado:
+    """PDF mapeado en memoria una sola vez y compartido por todos los parsers.
+    origen: ruta a un PDF (se mapea el archivo mismo) o un archivo abierto /
+    subido, que se vuelca a un temporal anónimo."""
+
+    def __init__(self, origen):
+        if isinstance(origen, (str, os.PathLike)):
+            self.ruta = os.path.abspath(origen)
+            self._archivo = open(origen, "rb")
+        else:
+            self.ruta = None
+            self._archivo = tempfile.TemporaryFile()
+            origen.seek(0)
+            shutil.copyfileobj(origen, self._archivo, TAMANO_BLOQUE_SPOOL)
+            origen.seek(0)
+            self._archivo.flush()
+        try:
+            self._mapa = mmap.mmap(self._archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._archivo.close()
+            raise ValueError("El PDF está vacío")
+        self.tamano = len(self._mapa)
+
+    def abrir(self):
+        """Nuevo lector con cursor propio sobre el mismo mapa"""
+        return LectorMapeado(memoryview(self._mapa), self.ruta)
+
+    def cerrar(self):
+        try:
+            self._mapa.close()
+        except BufferError:
+            # Algún parser todavía tiene una vista: el mapa se libera cuando la suelte
+            pass
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def vista_sin_copia(archivo):
+    """Contenido del archivo para parsers que trabajan sobre un buffer en memoria:
+    sin copiar si el archivo lo permite (LectorMapeado, io.BytesIO), si no leyéndolo"""
+    if hasattr(archivo, 'getbuffer'):
+        return archivo.getbuffer()
+    archivo.seek(0)
+    return archivo.read()
+
+
+# ==========================================
+# PRESUPUESTO DE MEMORIA ENTRE TRABAJOS
+# ==========================================
+
+def estimar_memoria_pdf(tamano_bytes):
+    """Pico de memoria estimado para procesar un PDF de ese tamaño"""
+    return FACTOR_MEMORIA_PDF * tamano_bytes + MEMORIA_BASE_TRABAJO_MB * _MB
+
+
+class PresupuestoMemoria:
+    """Reservas de memoria estimada, compartidas por todo el proceso"""
+
+    def __init__(self, limite_mb):
+        self.limite_bytes = limite_mb * _MB
+        self.bytes_reservados = 0
+        self._condicion = threading.Condition()
+
+    def ajustar_limite(self, limite_mb):
+        with self._condicion:
+            self.limite_bytes = limite_mb * _MB
+            self._condicion.notify_all()
+
+    @contextmanager
+    def reservar(self, cantidad, al_esperar=None):
+        """Bloquea hasta que la reserva entre en el límite. Una reserva mayor que el
+        límite se recorta a él (corre sola). al_esperar() se llama mientras se
+        espera, p. ej. para cortar la espera de un trabajo cancelado."""
+        with self._condicion:
+            cantidad = min(cantidad, self.limite_bytes)
+            while self.bytes_reservados + cantidad > self.limite_bytes:
+                if al_esperar:
+                    al_esperar()
+                self._condicion.wait(timeout=0.5)
+            self.bytes_reservados += cantidad
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self.bytes_reservados -= cantidad
+                self._condicion.notify_all()
+
+
+presupuesto_memoria = PresupuestoMemoria(PRESUPUESTO_MEMORIA_MB)
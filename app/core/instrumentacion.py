@@ -0,0 +1,186 @@
+# ==========================================
+# INSTRUMENTACIÓN: TIEMPO Y MEMORIA POR ETAPA
+# ==========================================
+#
+# app/core marca sus etapas con span("nombre", pagina=...) o @instrumentar.
+# Si no hay un RegistroInstrumentacion activo en el contexto, los spans no
+# hacen nada. Quien quiera métricas activa un registro alrededor del trabajo:
+#
+#     registro = RegistroInstrumentacion(memoria=True)
+#     with registro.activo():
+#         procesar_pdf(...)
+#     metricas = registro.como_dict()
+#
+# Con memoria=True se usa tracemalloc (bastante más lento): solo para diagnóstico.
+# tracemalloc es global al proceso (un único pico, que cada span reinicia), así
+# que solo un registro a la vez mide memoria: si otro ya la está midiendo, el
+# registro corre sin memoria y como_dict() lo indica con memoria_no_disponible.
+# El pico incluye lo que asignen otros hilos mientras tanto.
+# Los workers de la extracción en paralelo corren en otros procesos; de ellos
+# solo se registra el span total de la extracción.
+
+from contextlib import contextmanager
+import contextvars
+import functools
+import threading
+import time
+import tracemalloc
+
+
+_registro_activo = contextvars.ContextVar("registro_instrumentacion", default=None)
+
+_MB = 1024 * 1024
+
+# Lo tiene el registro que está midiendo memoria (ver arriba)
+_cerrojo_memoria = threading.Lock()
+
+
+class RegistroInstrumentacion:
+    """Acumula spans por etapa y por página: llamadas, tiempo de pared y pico
+    de memoria (bytes por encima de lo que ya estaba en uso al abrir el span)."""
+
+    def __init__(self, memoria=False):
+        self.memoria = memoria
+        self.etapas = {}
+        self.paginas = {}
+        self.contadores = {}
+        self.duracion_total = 0.0
+        self.memoria_no_disponible = False  # Otro registro tenía tracemalloc
+        self._midiendo_memoria = False
+        self._abiertos = []  # Spans abiertos: [uso_al_inicio, pico_oculto]
+
+    @contextmanager
+    def activo(self):
+        """Activa el registro en el contexto actual mientras dura el bloque"""
+        token = _registro_activo.set(self)
+        midiendo = self.memoria and _cerrojo_memoria.acquire(blocking=False)
+        if self.memoria and not midiendo:
+            self.memoria_no_disponible = True
+        tracemalloc_propio = midiendo and not tracemalloc.is_tracing()
+        if tracemalloc_propio:
+            tracemalloc.start()
+        self._midiendo_memoria = midiendo
+        inicio = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.duracion_total += time.perf_counter() - inicio
+            self._midiendo_memoria = False
+            if tracemalloc_propio:
+                tracemalloc.stop()
+            if midiendo:
+                _cerrojo_memoria.release()
+            _registro_activo.reset(token)
+
+    def _abrir_memoria(self):
+        """tracemalloc tiene un único pico global: antes de reiniciarlo para este
+        span, el pico acumulado hasta ahora se guarda en el span padre"""
+        uso, pico = tracemalloc.get_traced_memory()
+        if self._abiertos:
+            padre = self._abiertos[-1]
+            padre[1] = max(padre[1], pico)
+        tracemalloc.reset_peak()
+        self._abiertos.append([uso, 0])
+
+    def _cerrar_memoria(self):
+        """Pico del span (incluye los de sus hijos); se propaga al padre"""
+        uso_inicio, pico_oculto = self._abiertos.pop()
+        pico = max(tracemalloc.get_traced_memory()[1], pico_oculto)
+        if self._abiertos:
+            padre = self._abiertos[-1]
+            padre[1] = max(padre[1], pico)
+        return max(0, pico - uso_inicio)
+
+    @contextmanager
+    def span(self, nombre, pagina=None):
+        """Mide el bloque como una llamada a la etapa nombre (y de esa página, si se indica)"""
+        medir_memoria = self._midiendo_memoria
+        if medir_memoria:
+            self._abrir_memoria()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - inicio
+            pico = self._cerrar_memoria() if medir_memoria else None
+            self._acumular(self.etapas.setdefault(nombre, {}), duracion, pico)
+            if pagina is not None:
+                self._acumular(self.paginas.setdefault(pagina, {}).setdefault(nombre, {}), duracion, pico)
+
+    @staticmethod
+    def _acumular(metricas, duracion, pico):
+        metricas['llamadas'] = metricas.get('llamadas', 0) + 1
+        metricas['total_s'] = metricas.get('total_s', 0.0) + duracion
+        metricas['max_s'] = max(metricas.get('max_s', 0.0), duracion)
+        if pico is not None:
+            metricas['pico_bytes'] = max(metricas.get('pico_bytes', 0), pico)
+
+    def contar(self, nombre, cantidad=1, pagina=None):
+        """Suma cantidad al contador nombre (global y de la página, si se indica)"""
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + cantidad
+        if pagina is not None:
+            contadores_pagina = self.paginas.setdefault(pagina, {}).setdefault('contadores', {})
+            contadores_pagina[nombre] = contadores_pagina.get(nombre, 0) + cantidad
+
+    def como_dict(self):
+        """Métricas como dict plano (tiempos en segundos, memoria en MB)"""
+        def exportar(metricas):
+            if 'llamadas' not in metricas:
+                return dict(metricas)  # Contadores de la página
+            salida = {
+                'llamadas': metricas['llamadas'],
+                'total_s': round(metricas['total_s'], 6),
+                'max_s': round(metricas['max_s'], 6),
+            }
+            if 'pico_bytes' in metricas:
+                salida['pico_memoria_mb'] = round(metricas['pico_bytes'] / _MB, 3)
+            return salida
+
+        return {
+            'duracion_total_s': round(self.duracion_total, 6),
+            'memoria': self.memoria,
+            'memoria_no_disponible': self.memoria_no_disponible,
+            'etapas': {nombre: exportar(m) for nombre, m in self.etapas.items()},
+            'paginas': {
+                pagina: {nombre: exportar(m) for nombre, m in etapas.items()}
+                for pagina, etapas in sorted(self.paginas.items())
+            },
+            'contadores': dict(self.contadores),
+        }
+
+
+def registro_actual():
+    """Registro activo en este contexto, o None"""
+    return _registro_activo.get()
+
+
+@contextmanager
+def span(nombre, pagina=None):
+    """Span sobre el registro activo; sin registro no mide nada"""
+    registro = _registro_activo.get()
+    if registro is None:
+        yield
+        return
+    with registro.span(nombre, pagina):
+        yield
+
+
+def contar(nombre, cantidad=1, pagina=None):
+    """Contador sobre el registro activo; sin registro no hace nada"""
+    registro = _registro_activo.get()
+    if registro is not None:
+        registro.contar(nombre, cantidad, pagina)
+
+
+def instrumentar(nombre):
+    """Decorador: cada llamada a la función es un span de la etapa nombre"""
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            registro = _registro_activo.get()
+            if registro is None:
+                return funcion(*args, **kwargs)
+            with registro.span(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
@@ -0,0 +1,324 @@
+# ==========================================
+# MOTORES DE EXTRACCIÓN DE PDF (BACKENDS)
+# ==========================================
+#
+# Cada motor expone la misma interfaz mínima que usa procesar_pdf:
+#   - total_paginas
+#   - mapa_capitulos()            -> {pag_num: (titulo, nivel)}
+#   - highlights_pagina(i)        -> lista de dicts con "/Rect", "/QuadPoints", "/C"
+#   - caracteres_pagina(i)        -> (alto, chars) con claves text/x0/x1/top/bottom
+#   - liberar_pagina(i)           -> descarta los cachés de la página ya procesada
+#   - iterar_colores_xref()       -> colores crudos de los Highlight, recorriendo la tabla xref
+#   - iterar_colores_paginas(idx) -> colores crudos de los Highlight de esas páginas
+#   - cerrar()
+#
+# Los quads de las anotaciones están en el espacio de usuario del PDF y
+# procesar_pdf los pasa a "desde arriba" con alto - y (alto = alto del MediaBox).
+# Las cajas de caracteres de todos los motores van en ese mismo marco: sin
+# rotar (se ignora /Rotate) y sin recortar (se ignora el CropBox).
+
+from pypdf import PdfReader
+from pypdf.generic import IndirectObject
+import pdfplumber
+import re
+
+from .ingesta import vista_sin_copia
+from .utils import obtener_mapa_capitulos
+
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf  # Nombre histórico del paquete
+    except ImportError:
+        pymupdf = None
+
+
+MOTOR_PYMUPDF = "pymupdf"
+MOTOR_PYPDF = "pypdf"
+
+
+def normalizar_color(color):
+    """Redondeo a 1 decimal para agrupar colores similares"""
+    return tuple(round(c, 1) for c in color)
+
+
+TAMANO_VENTANA_XREF = 4096
+
+# Fin del diccionario de un objeto: o termina el objeto o empieza su stream
+_FIN_OBJETO = re.compile(rb"endobj|>>\s*stream")
+
+
+def _color_highlight(obj):
+    """Color crudo de un objeto si es una anotación Highlight, o None"""
+    # Verificar que obj sea un diccionario antes de usar .get()
+    if not hasattr(obj, 'get') or obj.get("/Subtype") != "/Highlight":
+        return None
+    return obj.get("/C") or obj.get("/Color")
+
+
+def _numero_pdf(token):
+    """Convierte un número PDF crudo respetando enteros y reales, como pypdf"""
+    if "." in token:
+        return float(token)
+    return int(token)
+
+
+def _caracteres_sin_rotar(plumber_page):
+    """pdfplumber mide las páginas con /Rotate ya giradas, como se muestran.
+    Se deshace el giro invirtiendo la matriz con la que pdfminer gira la página
+    (PDFPageInterpreter.process_page) y se vuelve al marco de los quads."""
+    x0, y0, x1, y1 = plumber_page.page_obj.mediabox
+    alto = abs(y1 - y0)
+    rotacion = plumber_page.rotation
+    # pdfplumber le suma a x el origen del MediaBox girado; y0/y1 quedan como los da pdfminer
+    origen_x = plumber_page.mediabox[0]
+    chars = []
+    for c in plumber_page.chars:
+        u0, u1 = c['x0'] - origen_x, c['x1'] - origen_x
+        v0, v1 = c['y0'], c['y1']
+        # Caja en el espacio de usuario: (x mínimo, y mínimo, x máximo, y máximo)
+        if rotacion == 90:
+            caja = (x1 - v1, u0 + y0, x1 - v0, u1 + y0)
+        elif rotacion == 180:
+            caja = (x1 - u1, y1 - v1, x1 - u0, y1 - v0)
+        else:  # 270
+            caja = (v0 + x0, y1 - u1, v1 + x0, y1 - u0)
+        chars.append({'text': c['text'], 'x0': caja[0], 'x1': caja[2], 'top': alto - caja[3], 'bottom': alto - caja[1]})
+    return alto, chars
+
+
+class MotorPypdf:
+    """Motor clásico: pypdf para anotaciones y outline, pdfplumber para caracteres.
+    pdfplumber se abre recién cuando se piden caracteres por primera vez."""
+
+    nombre = MOTOR_PYPDF
+
+    def __init__(self, archivo_pdf):
+        self._archivo = archivo_pdf
+        self._archivo.seek(0)
+        self.reader = PdfReader(self._archivo)
+        self._plumber = None
+
+    @property
+    def total_paginas(self):
+        return len(self.reader.pages)
+
+    def mapa_capitulos(self):
+        return obtener_mapa_capitulos(self.reader)
+
+    def highlights_pagina(self, i):
+        pypdf_page = self.reader.pages[i]
+        if "/Annots" not in pypdf_page:
+            return []
+        anotaciones = [x.get_object() for x in pypdf_page["/Annots"]]
+        # Filtrar solo objetos que tienen el método .get() (son diccionarios)
+        return [x for x in anotaciones if hasattr(x, 'get') and x.get("/Subtype") == "/Highlight" and "/Rect" in x]
+
+    def caracteres_pagina(self, i):
+        if self._plumber is None:
+            self._archivo.seek(0)
+            self._plumber = pdfplumber.open(self._archivo)
+        plumber_page = self._plumber.pages[i]
+        if not plumber_page.rotation:
+            return plumber_page.height, plumber_page.chars
+        return _caracteres_sin_rotar(plumber_page)
+
+    def liberar_pagina(self, i):
+        """pdfplumber conserva los objetos parseados de cada página: se vacían tras usarla"""
+        if self._plumber is not None:
+            self._plumber.pages[i].close()
+
+    def iterar_colores_xref(self):
+        """Recorre la tabla xref sin construir el árbol de páginas. Antes de parsear
+        cada objeto se mira una ventana de bytes crudos: si el objeto termina sin
+        mencionar /Highlight, se descarta sin pasar por el parser de pypdf."""
+        stream = self.reader.stream
+        for gen, objetos in self.reader.xref.items():
+            for idnum, offset in objetos.items():
+                if gen == 65535 or not offset:
+                    continue  # Entradas libres
+                try:
+                    stream.seek(offset)
+                    ventana = stream.read(TAMANO_VENTANA_XREF)
+                    if b"/Highlight" not in ventana and _FIN_OBJETO.search(ventana):
+                        continue
+                    color = _color_highlight(self.reader.get_object(IndirectObject(idnum, gen, self.reader)))
+                    if color:
+                        yield color
+                except Exception:
+                    # Ignorar objetos que no se pueden procesar
+                    continue
+        # Objetos comprimidos dentro de object streams: no hay bytes crudos que mirar
+        for idnum in self.reader.xref_objStm:
+            try:
+                color = _color_highlight(self.reader.get_object(IndirectObject(idnum, 0, self.reader)))
+                if color:
+                    yield color
+            except Exception:
+                continue
+
+    def iterar_colores_paginas(self, indices):
+        for i in indices:
+            page = self.reader.pages[i]
+            if "/Annots" in page:
+                for annot in page["/Annots"]:
+                    try:
+                        color = _color_highlight(annot.get_object())
+                        if color:
+                            yield color
+                    except Exception:
+                        # Ignorar anotaciones que no se pueden procesar
+                        continue
+
+    def cerrar(self):
+        if self._plumber is not None:
+            self._plumber.close()
+            self._plumber = None
+
+
+def _matriz_texto(page):
+    """Matriz del espacio de usuario del PDF a las coordenadas de get_text.
+    MuPDF mide la página girada desde la esquina superior izquierda del CropBox
+    y PyMuPDF deshace el giro con rotation_matrix. page.transformation_matrix no
+    sirve: en páginas giradas ignora el origen del CropBox."""
+    mediabox, cropbox = page.mediabox, page.cropbox
+    # page.cropbox viene invertido en y respecto del MediaBox: se vuelve al espacio de usuario
+    caja = pymupdf.Rect(cropbox.x0, mediabox.y1 - cropbox.y1, cropbox.x1, mediabox.y1 - cropbox.y0)
+    matriz = pymupdf.Matrix(1, 0, 0, -1, 0, 0) * pymupdf.Matrix(page.rotation)
+    girada = caja * matriz
+    matriz = matriz * pymupdf.Matrix(1, 0, 0, 1, -girada.x0, -girada.y0)
+    return matriz * ~page.rotation_matrix
+
+
+class MotorPyMuPDF:
+    """Motor de una sola pasada: PyMuPDF lee anotaciones, QuadPoints, outline
+    y cajas de caracteres del mismo documento abierto una única vez."""
+
+    nombre = MOTOR_PYMUPDF
+
+    def __init__(self, archivo_pdf):
+        # Sobre un buffer sin copiar (mmap o BytesIO) cuando el archivo lo permite
+        self.doc = pymupdf.open(stream=vista_sin_copia(archivo_pdf), filetype="pdf")
+
+    @property
+    def total_paginas(self):
+        return self.doc.page_count
+
+    def mapa_capitulos(self):
+        """Extrae la estructura del TOC (Outline)"""
+        mapa = {}
+        try:
+            for nivel, titulo, pag_num in self.doc.get_toc(simple=True):
+                if titulo and pag_num > 0:
+                    mapa[pag_num] = (titulo, nivel)
+        except Exception:
+            pass
+        return mapa
+
+    def _leer_array(self, xref, clave):
+        """Lee un array numérico crudo del objeto (mismos valores que ve pypdf)"""
+        tipo, valor = self.doc.xref_get_key(xref, clave)
+        if tipo != "array":
+            return None
+        try:
+            return [_numero_pdf(v) for v in valor.strip("[]").split()]
+        except ValueError:
+            return None
+
+    def highlights_pagina(self, i):
+        page = self.doc[i]
+        highlights = []
+        for annot in page.annots(types=[pymupdf.PDF_ANNOT_HIGHLIGHT]):
+            rect = self._leer_array(annot.xref, "Rect")
+            if not rect or len(rect) != 4:
+                continue
+            datos = {"/Rect": rect}
+            color = self._leer_array(annot.xref, "C") or self._leer_array(annot.xref, "Color")
+            if color:
+                datos["/C"] = color
+            quads = self._leer_array(annot.xref, "QuadPoints")
+            if quads:
+                datos["/QuadPoints"] = quads
+            highlights.append(datos)
+        return highlights
+
+    def caracteres_pagina(self, i):
+        """Retorna los caracteres con la misma geometría que pdfplumber:
+        caja de alto igual al tamaño de fuente apoyada sobre el descendente."""
+        page = self.doc[i]
+        alto = page.mediabox.height
+        # Del marco de PyMuPDF al espacio de usuario (x' = x + e, y' = f - y) y de
+        # ahí al marco de los quads (alto - y')
+        inversa = ~_matriz_texto(page)
+        desplazamiento_x = inversa.e
+        desplazamiento_y = alto - inversa.f
+        chars = []
+        # Sin recorte al MediaBox ni al CropBox: pdfplumber también conserva los caracteres fuera de la página
+        flags = pymupdf.TEXTFLAGS_RAWDICT & ~pymupdf.TEXT_MEDIABOX_CLIP
+        raw = page.get_text("rawdict", flags=flags, clip=pymupdf.INFINITE_RECT())
+        for block in raw.get("blocks", []):
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    size = span["size"]
+                    descendente = span.get("descender", 0) * size
+                    for c in span["chars"]:
+                        x0, _, x1, _ = c["bbox"]
+                        bottom = c["origin"][1] - descendente + desplazamiento_y
+                        chars.append({
+                            'text': c["c"],
+                            'x0': x0 + desplazamiento_x,
+                            'x1': x1 + desplazamiento_x,
+                            'top': bottom - size,
+                            'bottom': bottom,
+                        })
+        return alto, chars
+
+    def liberar_pagina(self, i):
+        """El objeto página se libera solo; MuPDF retiene fuentes, imágenes y objetos
+        parseados en su store global: se vacía tras cada página"""
+        pymupdf.TOOLS.store_shrink(100)
+
+    def iterar_colores_xref(self):
+        """Recorre la tabla xref leyendo solo la clave /Subtype de cada objeto"""
+        for xref in range(1, self.doc.xref_length()):
+            try:
+                if self.doc.xref_get_key(xref, "Subtype") != ("name", "/Highlight"):
+                    continue
+                color = self._leer_array(xref, "C") or self._leer_array(xref, "Color")
+                if color:
+                    yield color
+            except Exception:
+                continue
+
+    def iterar_colores_paginas(self, indices):
+        for i in indices:
+            try:
+                for datos in self.highlights_pagina(i):
+                    if "/C" in datos:
+                        yield datos["/C"]
+            except Exception:
+                continue
+
+    def cerrar(self):
+        self.doc.close()
+
+
+MOTORES = {
+    MOTOR_PYMUPDF: MotorPyMuPDF,
+    MOTOR_PYPDF: MotorPypdf,
+}
+
+
+def motor_por_defecto():
+    """PyMuPDF si está instalado; si no, el motor pypdf + pdfplumber"""
+    return MOTOR_PYMUPDF if pymupdf is not None else MOTOR_PYPDF
+
+
+def abrir_motor(archivo_pdf, nombre=None):
+    """Abre el PDF con el motor pedido (o el de por defecto)"""
+    nombre = nombre or motor_por_defecto()
+    if nombre == MOTOR_PYMUPDF and pymupdf is None:
+        nombre = MOTOR_PYPDF
+    clase = MOTORES.get(nombre, MotorPypdf)
+    return clase(archivo_pdf)
@@ -2,25 +2,29 @@
 # EXTRACTOR DE TEXTO RESALTADO DE PDF
 # ==========================================
 
-import streamlit as st
-import pdfplumber
-from pypdf import PdfReader
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import io
+import multiprocessing
+import os
+import re
+import tempfile
 import unicodedata
 
-from .utils import obtener_mapa_capitulos
-from .word_generator import (
-    agregar_heading_toc,
-    agregar_separador_pagina,
-    agregar_texto_resaltado,
-    guardar_documento_word
-)
+from .motores_pdf import abrir_motor
+from .ingesta import PDFMapeado, vista_sin_copia
+from .cache import cache_resultados, clave_extraccion
+from .indice_espacial import crear_indice_pagina, orden_lectura
+from .word_generator import DocumentoWord
+from .docx_streaming import EscritorDocxStreaming
+from .instrumentacion import contar, instrumentar, span
 
 
-def extraer_caracteres_quads(quads, alto, all_chars):
-    """Extrae caracteres usando QuadPoints (método preciso)"""
-    valid_chars = []
-    
+_ESPACIOS = re.compile(r'\s+')
+
+
+def _rects_quads(quads, alto):
+    """Convierte QuadPoints (coordenadas PDF) en rectángulos (top, bottom, left, right)"""
+    rects = []
     for q in range(0, len(quads), 8):
         if q + 7 >= len(quads):
             continue
@@ -30,7 +34,25 @@ def extraer_caracteres_quads(quads, alto, all_chars):
         quad_bottom = alto - min(y3, y4)
         quad_left = min(x1, x4)
         quad_right = max(x2, x3)
-        
+        rects.append((quad_top, quad_bottom, quad_left, quad_right))
+    return rects
+
+
+def _rect_anotacion(datos, alto):
+    """Convierte el /Rect de la anotación en (top, bottom, left, right)"""
+    x0, y_bottom, x1, y_top = datos["/Rect"]
+    return alto - float(y_top), alto - float(y_bottom), float(x0), float(x1)
+
+
+def extraer_caracteres_quads(quads, alto, all_chars, indice=None):
+    """Extrae caracteres usando QuadPoints (método preciso).
+    Si se pasa el índice espacial de la página, todos los quads se consultan en un solo lote."""
+    rects = _rects_quads(quads, alto)
+    if indice is not None:
+        return indice.consultar_varios(rects)
+    
+    valid_chars = []
+    for quad_top, quad_bottom, quad_left, quad_right in rects:
         for char in all_chars:
             char_mid_y = (char['top'] + char['bottom']) / 2
             char_mid_x = (char['x0'] + char['x1']) / 2
@@ -42,16 +64,14 @@ def extraer_caracteres_quads(quads, alto, all_chars):
     return valid_chars
 
 
-def extraer_caracteres_rect(datos, alto, all_chars):
+def extraer_caracteres_rect(datos, alto, all_chars, indice=None):
     """Extrae caracteres usando Rect (método fallback)"""
-    valid_chars = []
+    rect_top, rect_bottom, rect_left, rect_right = _rect_anotacion(datos, alto)
     
-    x0, y_bottom, x1, y_top = datos["/Rect"]
-    rect_top = alto - float(y_top)
-    rect_bottom = alto - float(y_bottom)
-    rect_left = float(x0)
-    rect_right = float(x1)
+    if indice is not None:
+        return indice.consultar(rect_top, rect_bottom, rect_left, rect_right)
     
+    valid_chars = []
     for char in all_chars:
         char_mid_y = (char['top'] + char['bottom']) / 2
         char_mid_x = (char['x0'] + char['x1']) / 2
@@ -66,96 +86,109 @@ def extraer_caracteres_rect(datos, alto, all_chars):
 def reconstruir_texto(valid_chars):
     """Reconstruye el texto desde los caracteres detectando espacios.
     Algoritmo mejorado para PDFs con OCR antiguo o mal formado."""
-    
     if not valid_chars:
         return ""
-    
+    orden = orden_lectura(valid_chars, [range(len(valid_chars))])
+    return reconstruir_texto_indices(orden.selecciones[0], orden)
+
+
+def reconstruir_texto_indices(indices, orden):
+    """Igual que reconstruir_texto, pero sobre posiciones dentro del orden de lectura
+    precalculado de la página (OrdenPagina.selecciones): deduplicar, agrupar en
+    líneas y ordenar cada línea son pasadas sobre enteros, sin tocar los dicts."""
+    if not indices:
+        return ""
+
     # Deduplicar caracteres por posición (mismo x0 y top)
-    seen = {}
-    for c in valid_chars:
-        key = (round(c['x0'], 1), round(c['top'], 1))
+    claves = orden.claves
+    textos = orden.textos
+    vistos = {}
+    for idx in indices:
+        clave = claves[idx]
+        previo = vistos.get(clave)
+        if previo is None:
+            vistos[clave] = idx
         # Si ya existe, preferir el que tenga texto no vacío
-        if key not in seen or (not seen[key]['text'].strip() and c['text'].strip()):
-            seen[key] = c
-    valid_chars = list(seen.values())
-    
-    if not valid_chars:
-        return ""
+        elif not textos[previo].strip() and textos[idx].strip():
+            vistos[clave] = idx
     
     # --- PASO 1: Agrupar caracteres en líneas usando clustering por posición Y ---
     # Calcular altura promedio de caracteres para tolerancia
-    alturas = [c['bottom'] - c['top'] for c in valid_chars if c['bottom'] - c['top'] > 0]
+    alto = orden.alto
+    alturas = [alto[idx] for idx in vistos.values() if alto[idx] > 0]
     altura_promedio = sum(alturas) / len(alturas) if alturas else 10
     tolerancia_linea = altura_promedio * 0.5  # 50% de altura como tolerancia
     
-    # Ordenar por Y primero para agrupar en líneas
-    chars_por_y = sorted(valid_chars, key=lambda c: c['top'])
+    # Orden por Y de la página (mismo resultado que ordenar por top en cada highlight)
+    unicos = sorted(vistos.values(), key=orden.rango_y.__getitem__)
     
+    top = orden.top
     lineas = []
-    linea_actual = [chars_por_y[0]]
-    y_base = chars_por_y[0]['top']
-    
-    for char in chars_por_y[1:]:
+    linea_actual = [unicos[0]]
+    y_base = top[unicos[0]]
+    for idx in unicos[1:]:
         # Si el caracter está dentro de la tolerancia vertical, es la misma línea
-        if abs(char['top'] - y_base) <= tolerancia_linea:
-            linea_actual.append(char)
+        if abs(top[idx] - y_base) <= tolerancia_linea:
+            linea_actual.append(idx)
         else:
-            # Nueva línea
             lineas.append(linea_actual)
-            linea_actual = [char]
-            y_base = char['top']
-    
-    # No olvidar la última línea
-    if linea_actual:
-        lineas.append(linea_actual)
+            linea_actual = [idx]
+            y_base = top[idx]
+    lineas.append(linea_actual)
     
     # --- PASO 2: Ordenar líneas por posición Y promedio y caracteres por X ---
-    def y_promedio_linea(linea):
-        return sum(c['top'] for c in linea) / len(linea)
-    
-    lineas.sort(key=y_promedio_linea)
+    if len(lineas) > 1:
+        lineas.sort(key=lambda linea: sum(top[idx] for idx in linea) / len(linea))
     
     # --- PASO 3: Reconstruir texto línea por línea ---
+    x0 = orden.x0
+    x1 = orden.x1
+    rango_x = orden.rango_x
     partes_finales = []
     
     for linea in lineas:
         # Ordenar caracteres de la línea por posición X (izquierda a derecha)
-        linea_ordenada = sorted(linea, key=lambda c: c['x0'])
+        if len(linea) > 1:
+            linea.sort(key=rango_x.__getitem__)
         
         partes_linea = []
         ultimo_x1 = None
-        
-        for char in linea_ordenada:
+        for idx in linea:
             # Detectar espacios por gap horizontal
             if ultimo_x1 is not None:
-                gap = char['x0'] - ultimo_x1
-                char_width = max(char['x1'] - char['x0'], 1)
                 # Gap mayor al 30% del ancho del caracter = espacio
-                if gap > char_width * 0.3:
+                if x0[idx] - ultimo_x1 > max(x1[idx] - x0[idx], 1) * 0.3:
                     partes_linea.append(' ')
-            
-            partes_linea.append(char['text'])
-            ultimo_x1 = char['x1']
+            partes_linea.append(textos[idx])
+            ultimo_x1 = x1[idx]
         
         texto_linea = ''.join(partes_linea).strip()
         if texto_linea:
             partes_finales.append(texto_linea)
     
     # Unir líneas con espacio (los highlights suelen ser continuos)
-    texto = ' '.join(partes_finales)
-    texto = unicodedata.normalize('NFC', texto)
+    texto = unicodedata.normalize('NFC', ' '.join(partes_finales))
     
     # Limpiar espacios múltiples
-    import re
-    texto = re.sub(r'\s+', ' ', texto).strip()
-    
-    return texto
+    return _ESPACIOS.sub(' ', texto).strip()
 
 
-def procesar_highlight(datos, alto, all_chars):
-    """Procesa un highlight individual y extrae su texto"""
-    valid_chars = []
-    
+def seleccionar_indices(datos, alto, indice):
+    """Índices (en la página) de los caracteres que cubre el highlight"""
+    quads = datos.get("/QuadPoints")
+    if quads:
+        return indice.indices_varios(_rects_quads(quads, alto))
+    return indice.indices(*_rect_anotacion(datos, alto))
+
+
+def procesar_highlight(datos, alto, all_chars, indice=None):
+    """Procesa un highlight individual y extrae su texto.
+    Con el índice espacial trabaja sobre índices en lugar de copiar caracteres;
+    extraer_pagina comparte además el orden de lectura entre todos los highlights."""
+    if indice is not None:
+        orden = indice.orden_lectura([seleccionar_indices(datos, alto, indice)])
+        return reconstruir_texto_indices(orden.selecciones[0], orden)
+
     # Usar QuadPoints (preciso) si está disponible
     quads = datos.get("/QuadPoints")
     if quads:
@@ -167,89 +200,287 @@ def procesar_highlight(datos, alto, all_chars):
     return reconstruir_texto(valid_chars)
 
 
-def procesar_pdf(archivo_pdf, config):
-    """Procesa el PDF y genera el documento Word con los resaltados"""
+def colores_a_extraer(mapa_colores):
+    """Colores cuyo texto hay que extraer: todos los que no están en 'Ignorar'"""
+    return frozenset(color for color, conf in mapa_colores.items() if conf['accion'] != "Ignorar")
 
-    # --- PRIVACIDAD: No se guarda ningún archivo en disco, todo se procesa en memoria ---
-    reader = PdfReader(archivo_pdf)
-    total_paginas = len(reader.pages)
-    
-    mapa_capitulos = {}
-    if config['usar_toc']:
-        mapa_capitulos = obtener_mapa_capitulos(reader)
 
-    archivo_pdf.seek(0)
-    plumber = pdfplumber.open(archivo_pdf)
-    doc = Document()
-    
+def filtrar_highlights_emitibles(highlights, colores):
+    """Pre-filtro: se queda solo con los highlights de los colores pedidos.
+    Retorna [(datos, color_key), ...] en el mismo orden recibido."""
+    emitibles = []
+    for datos in highlights:
+        raw_color = datos.get("/C") or datos.get("/Color")
+        if not raw_color: 
+            continue
+        color_key = tuple(round(c, 1) for c in raw_color)
+        
+        if color_key not in colores: 
+            continue
+        emitibles.append((datos, color_key))
+    return emitibles
+
+
+def extraer_pagina(motor, i, colores):
+    """Extrae los resaltados de una página sin aplicar ningún estilo.
+    Retorna (hay_highlights, registros) donde cada registro es un dict
+    {'pagina', 'color', 'texto', 'bbox'} en orden de lectura.
+    Los caracteres solo se materializan si algún highlight es de un color pedido."""
+    pagina = i + 1
+    with span("pdf_anotaciones", pagina):
+        highlights = motor.highlights_pagina(i)
+    if not highlights:
+        return False, []
+    contar("highlights", len(highlights), pagina)
+
+    emitibles = filtrar_highlights_emitibles(highlights, colores)
+    if not emitibles:
+        return True, []
+
+    emitibles.sort(key=lambda x: x[0]["/Rect"][3], reverse=True)
+
+    with span("pdf_caracteres", pagina):
+        alto, all_chars = motor.caracteres_pagina(i)
+    contar("caracteres", len(all_chars), pagina)
+
+    with span("indice_pagina", pagina):
+        # Índice espacial compartido por todos los highlights de la página
+        indice = crear_indice_pagina(all_chars)
+        # Orden de lectura armado una vez con la unión de lo seleccionado en la página
+        orden = indice.orden_lectura([seleccionar_indices(datos, alto, indice) for datos, _ in emitibles])
+    registros = []
+
+    with span("reconstruccion_texto", pagina):
+        for (datos, color_key), indices in zip(emitibles, orden.selecciones):
+            texto = reconstruir_texto_indices(indices, orden)
+            
+            if texto and len(texto.strip()) > 1:
+                registros.append({
+                    'pagina': pagina,
+                    'color': color_key,
+                    'texto': texto.strip().replace("\n", " "),
+                    'bbox': tuple(float(v) for v in datos["/Rect"]),
+                })
+    contar("registros", len(registros), pagina)
+
+    motor.liberar_pagina(i)
+    return True, registros
+
+
+# Los workers no se crean por fork: el proceso de Streamlit tiene hilos y un
+# fork puede heredar un lock tomado. Con forkserver (o spawn donde no existe)
+# arrancan limpios; el servidor de forkserver ya trae importado este módulo.
+# Cada worker mapea el PDF desde una ruta: la del archivo original o, si el PDF
+# está en un temporal anónimo o en memoria, la de una copia con nombre que solo
+# existe mientras dura la extracción en paralelo.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    _contexto_workers = multiprocessing.get_context("forkserver")
+    _contexto_workers.set_forkserver_preload([__name__])
+else:
+    _contexto_workers = multiprocessing.get_context("spawn")
+
+
+def _extraer_rango(ruta, inicio, fin, colores, motor_extraccion):
+    """Tarea de un proceso worker: mapea el PDF, abre su propio motor y extrae un rango de páginas"""
+    with PDFMapeado(ruta) as pdf:
+        motor = abrir_motor(pdf.abrir(), motor_extraccion)
+        try:
+            return [extraer_pagina(motor, i, colores) for i in range(inicio, fin)]
+        finally:
+            motor.cerrar()
+
+
+def _copia_con_nombre(archivo_pdf):
+    """Vuelca el PDF a un temporal con nombre (lo borra quien lo pidió) y retorna su ruta"""
+    with tempfile.NamedTemporaryFile(prefix="pdf_", suffix=".pdf", delete=False) as copia:
+        copia.write(vista_sin_copia(archivo_pdf))
+    return copia.name
+
+
+def _extraer_paginas_paralelo(archivo_pdf, total_paginas, colores, config, procesos, al_progresar):
+    """Reparte las páginas en rangos contiguos entre un pool de procesos.
+    Retorna los resultados por página en orden, igual que el recorrido serial."""
+    ruta = getattr(archivo_pdf, 'ruta', None)
+    copia = None if ruta else _copia_con_nombre(archivo_pdf)
+    try:
+        return _repartir_paginas(ruta or copia, total_paginas, colores, config, procesos, al_progresar)
+    finally:
+        if copia:
+            try:
+                os.remove(copia)
+            except OSError:
+                pass
+
+
+def _repartir_paginas(ruta, total_paginas, colores, config, procesos, al_progresar):
+    """Envía cada rango de páginas a un worker, que abre el PDF desde ruta"""
+    tam_rango = max(1, -(-total_paginas // (procesos * 4)))
+    rangos = [(inicio, min(inicio + tam_rango, total_paginas)) for inicio in range(0, total_paginas, tam_rango)]
+
+    resultados = {}
+    paginas_listas = 0
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=_contexto_workers) as pool:
+        futuros = {
+            pool.submit(_extraer_rango, ruta, inicio, fin, colores, config.get('motor_extraccion')): inicio
+            for inicio, fin in rangos
+        }
+        try:
+            for futuro in as_completed(futuros):
+                resultado = futuro.result()
+                resultados[futuros[futuro]] = resultado
+                paginas_listas += len(resultado)
+                al_progresar(paginas_listas / total_paginas)
+        except BaseException:
+            # Error o cancelación desde al_progresar: los rangos que no arrancaron no se ejecutan
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return [pagina for inicio, _ in rangos for pagina in resultados[inicio]]
+
+
+def _sin_progreso(fraccion):
+    pass
+
+
+def _extraer_documento(archivo_pdf, colores, config, al_progresar=None):
+    """Etapa 1 sin caché: lee el outline y extrae el texto de los colores pedidos.
+    al_progresar(fraccion) recibe el avance de 0 a 1 a medida que se extraen páginas."""
+    al_progresar = al_progresar or _sin_progreso
+    with span("apertura_pdf"):
+        motor = abrir_motor(archivo_pdf, config.get('motor_extraccion'))
+        total_paginas = motor.total_paginas
+    with span("outline"):
+        mapa_capitulos = motor.mapa_capitulos()
+    contar("paginas", total_paginas)
+
+    al_progresar(0)
+    procesos = max(1, int(config.get('procesos', 1)))
+
+    # --- EXTRACCIÓN (serial o repartida entre procesos) ---
+    with span("extraccion_paginas"):
+        if procesos > 1 and total_paginas > 1:
+            motor.cerrar()
+            paginas = _extraer_paginas_paralelo(archivo_pdf, total_paginas, colores, config, procesos, al_progresar)
+        else:
+            paginas = []
+            for i in range(total_paginas):
+                paginas.append(extraer_pagina(motor, i, colores))
+                al_progresar((i + 1) / total_paginas)
+            motor.cerrar()
+
+    return {
+        'total_paginas': total_paginas,
+        'capitulos': mapa_capitulos,
+        'paginas_con_highlights': [i + 1 for i, (hay, _) in enumerate(paginas) if hay],
+        'registros': [registro for _, registros in paginas for registro in registros],
+        'colores': colores,
+    }
+
+
+def extraccion_en_cache(config, hash_pdf):
+    """Extracción del caché que ya cubre los colores de config, o None.
+    Con ella el documento se arma sin volver a abrir el PDF."""
+    if not hash_pdf:
+        return None
+    previa = cache_resultados.obtener(clave_extraccion(hash_pdf, config.get('motor_extraccion')))
+    if previa is not None and colores_a_extraer(config['mapa_colores']) <= previa['colores']:
+        return previa
+    return None
+
+
+@instrumentar("extraccion")
+def extraer_documento(archivo_pdf, config, hash_pdf=None, al_progresar=None):
+    """Etapa 1 (extracción): produce la representación intermedia sin estilos.
+    Solo depende del PDF, del motor y de qué colores se extraen; con el hash del
+    contenido se reutiliza desde el caché mientras cubra los colores pedidos."""
+    colores = colores_a_extraer(config['mapa_colores'])
+    clave = clave_extraccion(hash_pdf, config.get('motor_extraccion')) if hash_pdf else None
+
+    previa = cache_resultados.obtener(clave) if clave else None
+    if previa is not None:
+        if colores <= previa['colores']:
+            contar("extraccion_desde_cache")
+            return previa
+        # Se amplía la extracción previa para no perder los colores que ya cubría
+        colores = colores | previa['colores']
+
+    extraccion = _extraer_documento(archivo_pdf, colores, config, al_progresar)
+    if clave:
+        cache_resultados.guardar(clave, extraccion)
+    return extraccion
+
+
+@instrumentar("render_docx")
+def renderizar_documento(extraccion, config):
+    """Etapa 2 (render): aplica mapa_colores, numeración, sufijos de página y TOC
+    sobre la representación intermedia y arma el documento Word."""
+    mapa_colores = config['mapa_colores']
+    mapa_capitulos = extraccion['capitulos'] if config['usar_toc'] else {}
+    paginas_con_highlights = set(extraccion['paginas_con_highlights'])
+
+    registros_por_pagina = {}
+    for registro in extraccion['registros']:
+        conf = mapa_colores.get(registro['color'])
+        if conf and conf['accion'] != "Ignorar":
+            registros_por_pagina.setdefault(registro['pagina'], []).append(registro)
+
+    # --- ARMADO: numeración y escritura en Word siempre en orden de página ---
+    # Por defecto el DOCX se escribe en streaming; python-docx completo queda como alternativa
+    doc = EscritorDocxStreaming() if config.get('docx_streaming', True) else DocumentoWord()
     lista_datos_estructurados = [] 
-    barra = st.progress(0)
-    contadores = {k: 0 for k in config['mapa_colores'].keys()} 
+    contadores = {k: 0 for k in mapa_colores.keys()} 
     ultima_pag_registrada = 0
 
-    for i, pypdf_page in enumerate(reader.pages):
-        num_pag_real = i + 1
-        barra.progress(num_pag_real / total_paginas)
-        
+    for num_pag_real in range(1, extraccion['total_paginas'] + 1):
         # --- TOC ---
         if num_pag_real in mapa_capitulos:
             titulo_toc, nivel_cap = mapa_capitulos[num_pag_real]
             nivel_word = min(nivel_cap, 9)
             
             conf_toc = config.get('config_toc', {})
-            agregar_heading_toc(doc, titulo_toc, nivel_word, conf_toc)
+            doc.agregar_heading_toc(titulo_toc, nivel_word, conf_toc)
             lista_datos_estructurados.append((f"CAPITULO_L{nivel_word}", titulo_toc, "TOC"))
 
         # --- RESALTADOS ---
-        if "/Annots" in pypdf_page:
-            plumber_page = plumber.pages[i]
-            alto = plumber_page.height
-            all_chars = plumber_page.chars
-            
-            anotaciones = [x.get_object() for x in pypdf_page["/Annots"]]
-            # Filtrar solo objetos que tienen el método .get() (son diccionarios)
-            highlights = [x for x in anotaciones if hasattr(x, 'get') and x.get("/Subtype") == "/Highlight" and "/Rect" in x]
-            highlights.sort(key=lambda x: x["/Rect"][3], reverse=True)
+        if num_pag_real not in paginas_con_highlights:
+            continue
+
+        # Separador de página
+        if config['separar_paginas'] and num_pag_real > ultima_pag_registrada:
+            txt_sep = doc.agregar_separador_pagina(num_pag_real)
+            ultima_pag_registrada = num_pag_real
+            lista_datos_estructurados.append(("Separador", txt_sep, "SEP"))
+
+        for registro in registros_por_pagina.get(num_pag_real, []):
+            color_key = registro['color']
+            conf = mapa_colores[color_key]
             
-            # Separador de página
-            if highlights and config['separar_paginas'] and num_pag_real > ultima_pag_registrada:
-                txt_sep = agregar_separador_pagina(doc, num_pag_real)
-                ultima_pag_registrada = num_pag_real
-                lista_datos_estructurados.append(("Separador", txt_sep, "SEP"))
+            # Aplicar prefijo y sufijo
+            prefijo, sufijo = "", ""
+            if conf.get('autonumerar'):
+                contadores[color_key] += 1
+                prefijo = f"{contadores[color_key]}. " 
+            if conf.get('pag_en_linea'):
+                sufijo = f" (Pág. {num_pag_real})"
             
-            # Procesar cada highlight
-            for datos in highlights:
-                raw_color = datos.get("/C") or datos.get("/Color")
-                if not raw_color: 
-                    continue
-                color_key = tuple(round(c, 1) for c in raw_color)
-                
-                conf = config['mapa_colores'].get(color_key)
-                if not conf or conf['accion'] == "Ignorar": 
-                    continue
-                
-                # Extraer texto del highlight
-                texto = procesar_highlight(datos, alto, all_chars)
-                
-                if texto and len(texto.strip()) > 1:
-                    texto_clean = texto.strip().replace("\n", " ")
-                    
-                    # Aplicar prefijo y sufijo
-                    prefijo, sufijo = "", ""
-                    if conf.get('autonumerar'):
-                        contadores[color_key] += 1
-                        prefijo = f"{contadores[color_key]}. " 
-                    if conf.get('pag_en_linea'):
-                        sufijo = f" (Pág. {num_pag_real})"
-                    
-                    texto_final = f"{prefijo}{texto_clean}{sufijo}"
-                    lista_datos_estructurados.append((conf['accion'], texto_final, color_key))
-
-                    # Escribir en Word
-                    agregar_texto_resaltado(doc, texto_final, conf)
-
-    plumber.close()
+            texto_final = f"{prefijo}{registro['texto']}{sufijo}"
+            lista_datos_estructurados.append((conf['accion'], texto_final, color_key))
+
+            # Escribir en Word
+            doc.agregar_texto_resaltado(texto_final, conf)
     
-    # Guardar documento
-    buffer = guardar_documento_word(doc)
+    # Guardar documento (la exportación opcional a disco la hace quien lo pide, ver trabajos.py)
+    with span("guardar_docx"):
+        buffer = doc.guardar()
     return buffer, lista_datos_estructurados
+
+
+def procesar_pdf(archivo_pdf, config, hash_pdf=None, al_progresar=None):
+    """Procesa el PDF y genera el documento Word con los resaltados.
+    Si se pasa el hash del contenido, la extracción se reutiliza desde el caché.
+    al_progresar(fraccion) informa el avance de la extracción (p. ej. una barra de progreso)."""
+
+    # --- PRIVACIDAD: No se guarda ningún archivo con nombre en disco, salvo la copia que usa
+    # la extracción en varios procesos mientras dura (ver _extraer_paginas_paralelo) ---
+    extraccion = extraer_documento(archivo_pdf, config, hash_pdf, al_progresar)
+    return renderizar_documento(extraccion, config)
@@ -2,41 +2,86 @@
 # GENERADOR DE VISTA PREVIA PDF (FPDF)
 # ==========================================
 
-import streamlit as st
 from fpdf import FPDF
 from fpdf.enums import XPos, YPos
 import os
 
+from .cache import cache_resultados
+from .instrumentacion import instrumentar, span
 
-def cargar_fuentes_pdf(pdf):
-    """Carga las fuentes personalizadas para el PDF"""
-    ruta_arial = os.path.join("assets", "arial.ttf")
-    ruta_arial_bold = os.path.join("assets", "arialbd.ttf")
-    ruta_arial_italic = os.path.join("assets", "ariali.ttf")
+
+PAGINAS_POR_VENTANA = 5  # Páginas de salida por ventana de la vista previa paginada
+
+
+# ==========================================
+# FUENTES DE LA VISTA PREVIA
+# ==========================================
+#
+# Las fuentes se registran con pdf.add_font, pero cada estilo recién la primera
+# vez que la vista previa lo usa (fijar_fuente): fpdf2 parsea el TTF al
+# registrarlo y, al generar el PDF, recorta y embebe todas las fuentes
+# registradas aunque no se hayan usado. Una ventana sin separadores no carga
+# la itálica. fpdf2 ya embebe solo los glifos usados de cada fuente.
+
+FAMILIA_PERSONALIZADA = "CustomArial"
+RUTAS_FUENTES = {
+    "": os.path.join("assets", "arial.ttf"),
+    "B": os.path.join("assets", "arialbd.ttf"),
+    "I": os.path.join("assets", "ariali.ttf"),
+}
+
+_existe_archivo = {}
+
+
+def _archivo_existe(ruta):
+    """os.path.exists memorizado: los assets no cambian mientras corre el proceso"""
+    if ruta not in _existe_archivo:
+        _existe_archivo[ruta] = os.path.exists(ruta)
+    return _existe_archivo[ruta]
+
+
+def _sin_aviso(mensaje):
+    pass
+
+
+def cargar_fuentes_pdf(pdf, al_avisar=None):
+    """Carga las fuentes personalizadas para el PDF (la regular; los demás
+    estilos los registra fijar_fuente al usarlos).
+    al_avisar(mensaje) recibe los problemas con las fuentes (p. ej. para mostrarlos en la UI)."""
+    al_avisar = al_avisar or _sin_aviso
 
     fuente_cargada = False
     font_main = "Arial"
     
-    if os.path.exists(ruta_arial) and os.path.exists(ruta_arial_bold):
+    if _archivo_existe(RUTAS_FUENTES[""]) and _archivo_existe(RUTAS_FUENTES["B"]):
         try:
-            pdf.add_font("CustomArial", "", ruta_arial)
-            pdf.add_font("CustomArial", "B", ruta_arial_bold)
+            pdf.add_font(FAMILIA_PERSONALIZADA, "", RUTAS_FUENTES[""])
 
-            if os.path.exists(ruta_arial_italic):
-                pdf.add_font("CustomArial", "I", ruta_arial_italic)
-            else:
-                st.warning("⚠️ No se encontró 'ariali.ttf'. Usando fuente regular en lugar de itálica.")
+            if not _archivo_existe(RUTAS_FUENTES["I"]):
+                al_avisar("⚠️ No se encontró 'ariali.ttf'. Usando fuente regular en lugar de itálica.")
 
-            font_main = "CustomArial"
+            font_main = FAMILIA_PERSONALIZADA
             fuente_cargada = True
         except Exception as e:
-            st.error(f"Error cargando fuentes: {e}")
+            al_avisar(f"Error cargando fuentes: {e}")
     else:
-        st.warning("⚠️ No se encontraron las fuentes en 'assets'. Usando Arial estándar.")
+        al_avisar("⚠️ No se encontraron las fuentes en 'assets'. Usando Arial estándar.")
     
     return font_main, fuente_cargada
 
 
+def fijar_fuente(pdf, familia, estilo, tamano):
+    """pdf.set_font que antes registra el estilo de la fuente personalizada
+    si este PDF todavía no lo usó (sin itálica, con el TTF regular)"""
+    if familia == FAMILIA_PERSONALIZADA and f"{familia.lower()}{estilo}" not in pdf.fonts:
+        ruta = RUTAS_FUENTES[estilo]
+        if not _archivo_existe(ruta):
+            ruta = RUTAS_FUENTES[""]
+        with span("fuentes_preview"):
+            pdf.add_font(familia, estilo, ruta)
+    pdf.set_font(familia, estilo, tamano)
+
+
 def renderizar_toc(pdf, tipo, txt_safe, config_toc, font_main, fuente_cargada):
     """Renderiza un elemento TOC en el PDF"""
     pdf.ln(2)
@@ -57,7 +102,7 @@ def renderizar_toc(pdf, tipo, txt_safe, config_toc, font_main, fuente_cargada):
 def renderizar_separador(pdf, txt_safe, font_main, fuente_cargada):
     """Renderiza un separador de página en el PDF"""
     pdf.ln(5)
-    pdf.set_font(font_main, 'I', 9)
+    fijar_fuente(pdf, font_main, 'I', 9)
     pdf.set_text_color(150, 150, 150)
     
     if not fuente_cargada:
@@ -94,17 +139,15 @@ def renderizar_resaltado(txt_safe, ref, config_colores_final, fuente_cargada):
     return txt_safe, is_bold, font_size, align
 
 
-def generar_preview_visual(lista_datos, config_colores_final, config_toc):
-    """Genera PDF visual usando FPDF con soporte Unicode"""
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Cargar fuentes
-    font_main, fuente_cargada = cargar_fuentes_pdf(pdf)
-    
-    pdf.add_page()
-    
-    for tipo, texto, ref in lista_datos:
+def _renderizar_elementos(pdf, lista_datos, inicio, config_colores_final, config_toc, font_main, fuente_cargada, max_paginas=None):
+    """Renderiza lista_datos desde el índice inicio. Con max_paginas se detiene
+    antes del primer elemento que empezaría después de esa página.
+    Retorna el índice del próximo elemento sin renderizar, o None si no quedan."""
+    for indice in range(inicio, len(lista_datos)):
+        if max_paginas is not None and pdf.page_no() > max_paginas:
+            return indice
+
+        tipo, texto, ref = lista_datos[indice]
         txt_safe = texto 
         pdf.set_text_color(0, 0, 0)
         is_bold = ''
@@ -129,7 +172,7 @@ def generar_preview_visual(lista_datos, config_colores_final, config_toc):
             )
 
         # Renderizar celda
-        pdf.set_font(font_main, is_bold, font_size)
+        fijar_fuente(pdf, font_main, is_bold, font_size)
         try:
             pdf.multi_cell(0, font_size/2 + 2, txt_safe, align=align)
         except:
@@ -137,4 +180,50 @@ def generar_preview_visual(lista_datos, config_colores_final, config_toc):
             
         pdf.ln(1)
 
+    return None
+
+
+def _nuevo_pdf_preview(al_avisar=None):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    
+    # Cargar fuentes
+    with span("fuentes_preview"):
+        font_main, fuente_cargada = cargar_fuentes_pdf(pdf, al_avisar)
+    
+    pdf.add_page()
+    return pdf, font_main, fuente_cargada
+
+
+@instrumentar("preview_pdf")
+def generar_preview_visual(lista_datos, config_colores_final, config_toc, al_avisar=None):
+    """Genera PDF visual usando FPDF con soporte Unicode"""
+    pdf, font_main, fuente_cargada = _nuevo_pdf_preview(al_avisar)
+    _renderizar_elementos(pdf, lista_datos, 0, config_colores_final, config_toc, font_main, fuente_cargada)
     return bytes(pdf.output())
+
+
+@instrumentar("preview_pdf")
+def generar_preview_ventana(lista_datos, config_colores_final, config_toc, inicio=0, max_paginas=PAGINAS_POR_VENTANA,
+                            clave_cache=None, al_avisar=None):
+    """Genera solo una ventana de la vista previa: desde el elemento inicio
+    hasta completar unas max_paginas páginas de salida.
+    Retorna (pdf_bytes, siguiente) donde siguiente es el índice con el que
+    arranca la próxima ventana, o None si esta fue la última.
+    Con clave_cache (p. ej. la clave del resultado: hash + config) las ventanas
+    ya generadas se sirven desde el caché."""
+    clave = ("preview", clave_cache, inicio, max_paginas) if clave_cache else None
+    if clave:
+        ventana = cache_resultados.obtener(clave)
+        if ventana is not None:
+            return ventana
+
+    pdf, font_main, fuente_cargada = _nuevo_pdf_preview(al_avisar)
+    siguiente = _renderizar_elementos(
+        pdf, lista_datos, inicio, config_colores_final, config_toc, font_main, fuente_cargada, max_paginas
+    )
+    ventana = (bytes(pdf.output()), siguiente)
+
+    if clave:
+        cache_resultados.guardar(clave, ventana)
+    return ventana
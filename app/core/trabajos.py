@@ -0,0 +1,206 @@
+# ==========================================
+# COLA DE TRABAJOS EN SEGUNDO PLANO
+# ==========================================
+#
+# El procesamiento de un PDF grande no debe correr dentro de la ejecución del
+# script de Streamlit: cualquier interacción con un widget relanza el script y
+# se perdería el trabajo. Los trabajos se encolan en un pool de hilos del
+# proceso (sin broker externo), informan su avance y se consultan o cancelan
+# por id desde la UI. La cola es compartida por todas las sesiones del proceso.
+#
+# La función de un trabajo recibe al_progresar(fraccion) como argumento con
+# nombre; la cancelación es cooperativa: la próxima llamada a al_progresar de
+# un trabajo cancelado lanza TrabajoCancelado. Un trabajo cancelado en cola
+# nunca llega a correr: lo que sea suyo (p. ej. la vista sobre el PDF subido)
+# lo libera al_finalizar(), que se llama una vez en cualquier final del trabajo.
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+import threading
+import time
+import uuid
+
+from .cache import cache_resultados, clave_resultado
+from .ingesta import PDFMapeado, estimar_memoria_pdf, presupuesto_memoria
+from .instrumentacion import RegistroInstrumentacion, contar
+from .pdf_extractor import extraccion_en_cache, procesar_pdf, renderizar_documento
+from .word_generator import exportar_docx_async
+
+
+TRABAJADORES_COLA = 2          # Trabajos que corren a la vez
+RETENCION_TRABAJOS_S = 3600    # Trabajos terminados y no retirados se descartan pasado este tiempo
+
+ESTADOS_FINALES = ("completado", "error", "cancelado")
+
+
+class TrabajoCancelado(Exception):
+    """Interrumpe un trabajo cuya cancelación se pidió mientras corría"""
+
+
+class ColaTrabajos:
+    """Pool de hilos con el estado de cada trabajo por id"""
+
+    def __init__(self, trabajadores, retencion_s=RETENCION_TRABAJOS_S):
+        self.trabajadores = trabajadores
+        self.retencion_s = retencion_s
+        self._trabajos = {}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def enviar(self, funcion, *args, al_finalizar=None, **kwargs):
+        """Encola funcion(*args, **kwargs, al_progresar=...) y retorna el id del trabajo.
+        al_finalizar() se llama una sola vez cuando el trabajo termina, falla o se
+        cancela (aunque no haya llegado a correr)."""
+        id_trabajo = uuid.uuid4().hex
+        trabajo = {
+            'id': id_trabajo,
+            'estado': "pendiente",
+            'progreso': 0.0,
+            'creado': time.time(),
+            'fin': None,
+            'resultado': None,
+            'error': None,
+            'cancelar': threading.Event(),
+            'futuro': None,
+            'al_finalizar': al_finalizar,
+        }
+        with self._lock:
+            self._purgar()
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.trabajadores, thread_name_prefix="trabajo")
+            self._trabajos[id_trabajo] = trabajo
+            trabajo['futuro'] = self._pool.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+        return id_trabajo
+
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        if trabajo['cancelar'].is_set():
+            self._terminar(trabajo, "cancelado")
+            return
+        with self._lock:
+            trabajo['estado'] = "ejecutando"
+
+        def al_progresar(fraccion):
+            if trabajo['cancelar'].is_set():
+                raise TrabajoCancelado()
+            trabajo['progreso'] = fraccion
+
+        try:
+            resultado = funcion(*args, al_progresar=al_progresar, **kwargs)
+        except TrabajoCancelado:
+            self._terminar(trabajo, "cancelado")
+        except Exception as e:
+            self._terminar(trabajo, "error", error=f"{type(e).__name__}: {e}")
+        else:
+            if trabajo['cancelar'].is_set():
+                self._terminar(trabajo, "cancelado")
+            else:
+                trabajo['progreso'] = 1.0
+                self._terminar(trabajo, "completado", resultado=resultado)
+
+    def _terminar(self, trabajo, estado, resultado=None, error=None):
+        # Lo del trabajo se libera antes de publicarlo como terminado
+        with self._lock:
+            al_finalizar, trabajo['al_finalizar'] = trabajo['al_finalizar'], None
+        if al_finalizar is not None:
+            try:
+                al_finalizar()
+            except Exception:
+                # La limpieza no cambia el resultado del trabajo
+                pass
+        with self._lock:
+            trabajo['resultado'] = resultado
+            trabajo['error'] = error
+            trabajo['fin'] = time.time()
+            trabajo['futuro'] = None
+            trabajo['estado'] = estado
+
+    def _purgar(self):
+        """Descarta trabajos terminados que nadie retiró a tiempo (con el lock tomado)"""
+        limite = time.time() - self.retencion_s
+        vencidos = [
+            id_trabajo for id_trabajo, trabajo in self._trabajos.items()
+            if trabajo['fin'] is not None and trabajo['fin'] < limite
+        ]
+        for id_trabajo in vencidos:
+            del self._trabajos[id_trabajo]
+
+    def estado(self, id_trabajo):
+        """{'id', 'estado', 'progreso', 'error'} del trabajo, o None si no existe"""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return None
+            return {
+                'id': id_trabajo,
+                'estado': trabajo['estado'],
+                'progreso': trabajo['progreso'],
+                'error': trabajo['error'],
+            }
+
+    def cancelar(self, id_trabajo):
+        """Pide cancelar el trabajo. Uno en cola no llega a correr; uno en curso
+        se interrumpe en su próximo aviso de progreso."""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo['estado'] in ESTADOS_FINALES:
+                return False
+            trabajo['cancelar'].set()
+            futuro = trabajo['futuro']
+        if futuro is not None and futuro.cancel():
+            self._terminar(trabajo, "cancelado")
+        return True
+
+    def retirar(self, id_trabajo):
+        """Quita un trabajo terminado de la cola y lo retorna con su resultado (None si no terminó)"""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo['estado'] not in ESTADOS_FINALES:
+                return None
+            del self._trabajos[id_trabajo]
+        return {clave: trabajo[clave] for clave in ('id', 'estado', 'resultado', 'error')}
+
+
+cola_trabajos = ColaTrabajos(TRABAJADORES_COLA)
+
+
+def trabajo_procesar_pdf(origen, config, hash_pdf=None, medir_memoria=False, al_progresar=None):
+    """Trabajo de la cola: procesa el PDF (o lo toma del caché) con métricas de instrumentación.
+    origen es el PDF subido (un archivo legible) o un PDFMapeado, que el trabajo cierra
+    al terminar. Solo si hay que extraer el PDF de nuevo (ni el resultado ni la extracción
+    están en caché) se vuelca a un temporal anónimo y se reserva su memoria estimada en el
+    presupuesto del proceso, esperando si no hay lugar.
+    Con config['exportar_disco'] el DOCX también se guarda en disco (en segundo plano).
+    Retorna {'clave', 'word_bytes', 'lista_datos', 'metricas'}."""
+    clave = clave_resultado(hash_pdf, config) if hash_pdf else None
+    registro = RegistroInstrumentacion(memoria=medir_memoria)
+    pdf = origen if isinstance(origen, PDFMapeado) else None
+    try:
+        resultado = cache_resultados.obtener(clave) if clave else None
+        extraccion = extraccion_en_cache(config, hash_pdf) if resultado is None else None
+        if extraccion is not None:
+            with registro.activo():
+                contar("extraccion_desde_cache")
+                word_buffer, lista_datos = renderizar_documento(extraccion, config)
+        elif resultado is None:
+            al_esperar = (lambda: al_progresar(0)) if al_progresar else None
+            tamano = pdf.tamano if pdf else origen.seek(0, io.SEEK_END)
+            with presupuesto_memoria.reservar(estimar_memoria_pdf(tamano), al_esperar):
+                pdf = pdf or PDFMapeado(origen)
+                with registro.activo():
+                    word_buffer, lista_datos = procesar_pdf(pdf.abrir(), config, hash_pdf, al_progresar)
+        if resultado is None:
+            resultado = (word_buffer.getvalue(), lista_datos)
+            if clave:
+                cache_resultados.guardar(clave, resultado)
+    finally:
+        if pdf is not None:
+            pdf.cerrar()
+    if config.get('exportar_disco'):
+        # También en un acierto de caché: exportar_disco no es parte de la clave del resultado
+        exportar_docx_async(resultado[0], config.get('usuario'), clave)
+    return {
+        'clave': clave,
+        'word_bytes': resultado[0],
+        'lista_datos': resultado[1],
+        'metricas': registro.como_dict(),
+    }
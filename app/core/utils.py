@@ -2,7 +2,9 @@
 # UTILIDADES Y MOTORES LÓGICOS
 # ==========================================
 
-from pypdf import PdfReader
+from .cache import cache_resultados, clave_colores
+from .instrumentacion import contar, instrumentar
+
 
 def rgb_pdf_a_hex(rgb_tuple):
     """Convierte tupla (0-1) a Hex string"""
@@ -13,29 +15,52 @@ def rgb_pdf_a_hex(rgb_tuple):
     b = int(rgb_tuple[2] * 255)
     return f"#{r:02x}{g:02x}{b:02x}"
 
-def escanear_colores_pdf(archivo_pdf):
-    """Escanea el PDF en busca de anotaciones Highlight"""
-    colores_encontrados = set()
-    archivo_pdf.seek(0)
-    reader = PdfReader(archivo_pdf)
-    for page in reader.pages:
-        if "/Annots" in page:
-            for annot in page["/Annots"]:
-                try:
-                    obj = annot.get_object()
-                    # Verificar que obj sea un diccionario antes de usar .get()
-                    if not hasattr(obj, 'get'):
-                        continue
-                    if obj.get("/Subtype") == "/Highlight":
-                        color = obj.get("/C") or obj.get("/Color")
-                        if color:
-                            # Redondeo a 1 decimal para agrupar colores similares
-                            color_normalizado = tuple(round(c, 1) for c in color)
-                            colores_encontrados.add(color_normalizado)
-                except Exception:
-                    # Ignorar anotaciones que no se pueden procesar
-                    continue
-    return list(colores_encontrados)
+def muestrear_paginas(total_paginas, limite_paginas):
+    """Índices de hasta limite_paginas páginas repartidas uniformemente en el documento"""
+    if not limite_paginas or limite_paginas >= total_paginas:
+        return range(total_paginas)
+    paso = total_paginas / limite_paginas
+    return sorted({int(k * paso) for k in range(limite_paginas)})
+
+
+@instrumentar("escaneo_colores")
+def escanear_colores_pdf(archivo_pdf, motor_extraccion=None, hash_pdf=None, limite_paginas=None, al_encontrar=None):
+    """Escanea el PDF en busca de anotaciones Highlight.
+    Por defecto recorre la tabla xref directamente (sin árbol de páginas). Con
+    limite_paginas solo muestrea esa cantidad de páginas repartidas en el documento.
+    al_encontrar(color) se llama con cada color nuevo apenas aparece.
+    Con el hash del contenido, un archivo ya escaneado se resuelve desde el caché."""
+    from .motores_pdf import abrir_motor, normalizar_color  # Import local: motores_pdf depende de este módulo
+    if hash_pdf and not limite_paginas:
+        colores = cache_resultados.obtener(clave_colores(hash_pdf, motor_extraccion))
+        if colores is not None:
+            contar("colores_desde_cache")
+            return list(colores)
+
+    motor = abrir_motor(archivo_pdf, motor_extraccion)
+    colores = []
+    try:
+        if limite_paginas:
+            fuente = motor.iterar_colores_paginas(muestrear_paginas(motor.total_paginas, limite_paginas))
+        else:
+            fuente = motor.iterar_colores_xref()
+        vistos = set()
+        for color in fuente:
+            # Redondeo a 1 decimal para agrupar colores similares
+            color_normalizado = normalizar_color(color)
+            if color_normalizado in vistos:
+                continue
+            vistos.add(color_normalizado)
+            colores.append(color_normalizado)
+            if al_encontrar:
+                al_encontrar(color_normalizado)
+    finally:
+        motor.cerrar()
+
+    if hash_pdf and not limite_paginas:
+        cache_resultados.guardar(clave_colores(hash_pdf, motor_extraccion), tuple(colores))
+    return colores
+
 
 def obtener_mapa_capitulos(reader):
     """Extrae la estructura del TOC (Outline)"""
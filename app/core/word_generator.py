@@ -4,27 +4,37 @@
 
 from docx import Document
 from docx.shared import RGBColor, Pt
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+import hashlib
 import io
 import os
+import queue
+import re
+import threading
 
 
-def aplicar_estilos_word(paragraph, run, config_estilo):
-    """Aplica formato granular al objeto Word"""
+# Claves de la config de un color que afectan el formato (las demás solo cambian el texto)
+CLAVES_ESTILO = ('accion', 'fuente', 'tamano', 'alineacion', 'interlineado', 'lista')
+
+
+def _aplicar_formato(font, paragraph_format, config_estilo):
+    """Aplica fuente, color, alineación e interlineado sobre un formato de
+    carácter y uno de párrafo (de un run/párrafo o de un estilo con nombre)"""
     # 1. Fuente y Tamaño
-    run.font.name = config_estilo.get('fuente', 'Arial')
-    run.font.size = Pt(config_estilo.get('tamano', 11))
+    font.name = config_estilo.get('fuente', 'Arial')
+    font.size = Pt(config_estilo.get('tamano', 11))
     
     # 2. Estilos específicos por Acción
     accion = config_estilo.get('accion', 'Texto Normal')
     if accion == "Título":
-        run.bold = True
-        run.font.color.rgb = RGBColor(0, 0, 0)
+        font.bold = True
+        font.color.rgb = RGBColor(0, 0, 0)
     elif accion == "Dato Clave":
-        run.bold = True
-        run.font.color.rgb = RGBColor(0, 50, 150)
+        font.bold = True
+        font.color.rgb = RGBColor(0, 50, 150)
     elif accion == "Subtítulo":
-        run.font.color.rgb = RGBColor(80, 80, 80)
+        font.color.rgb = RGBColor(80, 80, 80)
     
     # 3. Alineación
     align_map = {
@@ -33,16 +43,84 @@ def aplicar_estilos_word(paragraph, run, config_estilo):
         "Derecha": WD_ALIGN_PARAGRAPH.RIGHT,
         "Justificado": WD_ALIGN_PARAGRAPH.JUSTIFY
     }
-    paragraph.alignment = align_map.get(config_estilo.get('alineacion', 'Izquierda'))
+    paragraph_format.alignment = align_map.get(config_estilo.get('alineacion', 'Izquierda'))
     
     # 4. Interlineado
     spacing_map = {"Simple": 1.0, "1.15": 1.15, "1.5": 1.5, "Doble": 2.0}
     val_spacing = spacing_map.get(config_estilo.get('interlineado', 'Simple'))
-    paragraph.paragraph_format.line_spacing = val_spacing
+    paragraph_format.line_spacing = val_spacing
+
+
+def aplicar_estilos_word(paragraph, run, config_estilo):
+    """Aplica formato granular al objeto Word"""
+    _aplicar_formato(run.font, paragraph.paragraph_format, config_estilo)
+
+
+def _estilo_base_resaltado(conf):
+    """Estilo de Word sobre el que se apoya un resaltado según su acción y lista"""
+    if conf['accion'] == "Título":
+        return 'Heading 2'
+    if conf['accion'] == "Subtítulo":
+        return 'Heading 3'
+    if conf.get('lista') == "Bullets (•)": 
+        return 'List Bullet'
+    if conf.get('lista') == "Numerada (1.)": 
+        return 'List Number'
+    return 'Normal'
 
 
-def agregar_heading_toc(doc, titulo_toc, nivel_word, config_toc):
+class RegistroEstilos:
+    """Crea un estilo de párrafo con nombre por cada formato distinto (config de
+    color, nivel de TOC, separador) la primera vez que se usa en el documento.
+    Después cada párrafo solo referencia su estilo, sin formato directo."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self._nombres = {}
+
+    def _registrar(self, clave, nombre, base, configurar):
+        if clave in self._nombres:
+            return self._nombres[clave]
+        estilo = self.doc.styles.add_style(nombre, WD_STYLE_TYPE.PARAGRAPH)
+        estilo.base_style = self.doc.styles[base]
+        estilo.quick_style = True
+        configurar(estilo)
+        self._nombres[clave] = nombre
+        return nombre
+
+    def estilo_resaltado(self, conf):
+        clave = ('resaltado',) + tuple(conf.get(k) for k in CLAVES_ESTILO)
+        nombre = f"Resaltado {sum(1 for c in self._nombres if c[0] == 'resaltado') + 1}"
+        return self._registrar(
+            clave, nombre, _estilo_base_resaltado(conf),
+            lambda estilo: _aplicar_formato(estilo.font, estilo.paragraph_format, conf)
+        )
+
+    def estilo_toc(self, nivel_word, config_toc):
+        tamano = config_toc.get('tamano', 14) if nivel_word == 1 else config_toc.get('tamano', 14)-2
+
+        def configurar(estilo):
+            estilo.font.name = config_toc.get('fuente', 'Arial')
+            estilo.font.size = Pt(tamano)
+            estilo.font.color.rgb = RGBColor(60, 60, 60)
+
+        clave = ('toc', nivel_word, config_toc.get('fuente', 'Arial'), tamano)
+        return self._registrar(clave, f"Indice Nivel {nivel_word}", f"Heading {nivel_word}", configurar)
+
+    def estilo_separador(self):
+        def configurar(estilo):
+            estilo.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            estilo.font.italic = True
+            estilo.font.color.rgb = RGBColor(150, 150, 150)
+
+        return self._registrar(('separador',), "Separador Pagina", 'Normal', configurar)
+
+
+def agregar_heading_toc(doc, titulo_toc, nivel_word, config_toc, estilos=None):
     """Agrega un heading de TOC al documento Word"""
+    if estilos is not None:
+        return doc.add_paragraph(titulo_toc, style=estilos.estilo_toc(nivel_word, config_toc))
+
     h = doc.add_heading(titulo_toc, level=nivel_word)
     for run in h.runs:
         run.font.name = config_toc.get('fuente', 'Arial')
@@ -51,9 +129,13 @@ def agregar_heading_toc(doc, titulo_toc, nivel_word, config_toc):
     return h
 
 
-def agregar_separador_pagina(doc, num_pag):
+def agregar_separador_pagina(doc, num_pag, estilos=None):
     """Agrega un separador de página al documento Word"""
     txt_sep = f"--- Página {num_pag} ---"
+    if estilos is not None:
+        doc.add_paragraph(txt_sep, style=estilos.estilo_separador())
+        return txt_sep
+
     p = doc.add_paragraph(txt_sep)
     p.alignment = WD_ALIGN_PARAGRAPH.CENTER
     p.runs[0].font.italic = True
@@ -61,8 +143,12 @@ def agregar_separador_pagina(doc, num_pag):
     return txt_sep
 
 
-def agregar_texto_resaltado(doc, texto_final, conf):
-    """Agrega texto resaltado al documento Word con el estilo apropiado"""
+def agregar_texto_resaltado(doc, texto_final, conf, estilos=None):
+    """Agrega texto resaltado al documento Word con el estilo apropiado.
+    Con un RegistroEstilos el párrafo solo referencia el estilo del color."""
+    if estilos is not None:
+        return doc.add_paragraph(texto_final, style=estilos.estilo_resaltado(conf))
+
     style = None
     if conf.get('lista') == "Bullets (•)": 
         style = 'List Bullet'
@@ -86,14 +172,92 @@ def agregar_texto_resaltado(doc, texto_final, conf):
 
 
 def guardar_documento_word(doc):
-    """Guarda el documento Word en carpeta export y retorna buffer"""
-    # Guardado automático en carpeta export
-    if not os.path.exists("export"):
-        os.makedirs("export")
-    doc.save(os.path.join("export", "resumen_generado.docx"))
-
-    # Retornar buffer para descarga
+    """Serializa el documento Word una sola vez y retorna el buffer para descarga.
+    No escribe en disco: la exportación es opcional (ver exportar_docx_async)."""
     buffer = io.BytesIO()
     doc.save(buffer)
     buffer.seek(0)
     return buffer
+
+
+# ==========================================
+# EXPORTACIÓN OPCIONAL A DISCO (EN SEGUNDO PLANO)
+# ==========================================
+
+# Cada archivo se nombra por usuario y por resultado (resumen_<usuario>_<huella>.docx):
+# volver a exportar el mismo resultado lo pisa. Además, de cada usuario se
+# conservan solo las MAX_EXPORTACIONES_POR_USUARIO exportaciones más recientes.
+
+CARPETA_EXPORT = "export"
+MAX_EXPORTACIONES_POR_USUARIO = 20
+
+_cola_exportacion = None
+_lock_exportacion = threading.Lock()
+
+
+def _podar_exportaciones(carpeta, nombre_usuario, conservar):
+    """Borra las exportaciones del usuario más viejas que las conservar más recientes"""
+    patron = re.compile(rf"resumen_{re.escape(nombre_usuario)}_[0-9a-f]{{16}}\.docx")
+    rutas = [os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta) if patron.fullmatch(nombre)]
+    rutas.sort(key=os.path.getmtime, reverse=True)
+    for ruta in rutas[conservar:]:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+def _escritor_exportacion():
+    """Hilo de fondo: escribe los DOCX encolados sin bloquear la ejecución del script"""
+    while True:
+        ruta, datos, nombre_usuario = _cola_exportacion.get()
+        try:
+            carpeta = os.path.dirname(ruta)
+            os.makedirs(carpeta, exist_ok=True)
+            ruta_tmp = ruta + ".tmp"
+            with open(ruta_tmp, "wb") as f:
+                f.write(datos)
+            os.replace(ruta_tmp, ruta)
+            _podar_exportaciones(carpeta, nombre_usuario, MAX_EXPORTACIONES_POR_USUARIO)
+        except Exception:
+            # Silencioso: la exportación a disco nunca debe romper la descarga
+            pass
+        finally:
+            _cola_exportacion.task_done()
+
+
+def exportar_docx_async(datos, usuario=None, clave=None, carpeta=CARPETA_EXPORT):
+    """Encola los bytes del DOCX para guardarlos en disco con un nombre por usuario y por
+    resultado (clave del resultado o, sin ella, el contenido). Retorna la ruta donde quedará el archivo."""
+    global _cola_exportacion
+    with _lock_exportacion:
+        if _cola_exportacion is None:
+            _cola_exportacion = queue.Queue()
+            threading.Thread(target=_escritor_exportacion, name="exportacion-docx", daemon=True).start()
+
+    nombre_usuario = re.sub(r"[^A-Za-z0-9_-]", "_", str(usuario or "anonimo"))[:64]
+    huella = hashlib.sha256(repr(clave).encode() if clave is not None else datos).hexdigest()[:16]
+    ruta = os.path.join(carpeta, f"resumen_{nombre_usuario}_{huella}.docx")
+    _cola_exportacion.put((ruta, datos, nombre_usuario))
+    return ruta
+
+
+class DocumentoWord:
+    """Destino python-docx: arma el árbol completo en memoria y lo guarda al final.
+    Los formatos se registran como estilos con nombre una vez por documento."""
+
+    def __init__(self):
+        self.doc = Document()
+        self.estilos = RegistroEstilos(self.doc)
+
+    def agregar_heading_toc(self, titulo_toc, nivel_word, config_toc):
+        return agregar_heading_toc(self.doc, titulo_toc, nivel_word, config_toc, self.estilos)
+
+    def agregar_separador_pagina(self, num_pag):
+        return agregar_separador_pagina(self.doc, num_pag, self.estilos)
+
+    def agregar_texto_resaltado(self, texto_final, conf):
+        return agregar_texto_resaltado(self.doc, texto_final, conf, self.estilos)
+
+    def guardar(self):
+        return guardar_documento_word(self.doc)
@@ -8,7 +8,8 @@ from .auth import (
     iniciar_sesion,
     cerrar_sesion,
     obtener_usuario_actual,
-    esta_autenticado
+    esta_autenticado,
+    es_admin
 )
 
 __all__ = [
@@ -17,5 +18,6 @@ __all__ = [
     'iniciar_sesion', 
     'cerrar_sesion',
     'obtener_usuario_actual',
-    'esta_autenticado'
+    'esta_autenticado',
+    'es_admin'
 ]
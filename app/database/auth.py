@@ -3,8 +3,14 @@
 # ==========================================
 
 import streamlit as st
-from .supabase_client import get_supabase_client
+from app.environment import get_proxies_confiables
+from .supabase_client import get_supabase_client, descartar_cliente_sesion
+from .perfiles import sincronizador_perfiles
+from collections import OrderedDict
+import base64
+import json
 import re
+import threading
 import time
 
 
@@ -37,17 +43,15 @@ def enviar_reset_password(email: str) -> dict:
         return {"success": False, "message": f"Error al enviar email de recuperación: {e}"}
 
 
-def ensure_profile(user_id: str) -> None:
-    """Crea (si no existe) el perfil del usuario con rol 'user'.
-    Requiere que exista la tabla public.profiles con RLS que permita upsert del propio id.
+def ensure_profile(user_id: str, access_token: str = None) -> None:
+    """Asegura (si no existe) el perfil del usuario con rol 'user', sin bloquear el login.
+    El alta la hace el trigger on_auth_user_created; esto es un respaldo que se envía
+    en segundo plano. Sin access token no hay nada que hacer: RLS solo permite
+    insertar el propio perfil.
     """
-    try:
-        supabase = get_supabase_client()
-        # upsert id + default role on conflict
-        supabase.table("profiles").upsert({"id": user_id, "role": "user"}).execute()
-    except Exception:
-        # Silencioso: si la tabla aún no existe, no rompemos el login
-        pass
+    if not access_token:
+        return
+    sincronizador_perfiles.asegurar(user_id, access_token)
 
 
 def registrar_usuario(email: str, password: str) -> dict:
@@ -71,7 +75,7 @@ def registrar_usuario(email: str, password: str) -> dict:
         if response.user:
             # Crear/asegurar perfil
             try:
-                ensure_profile(response.user.id)
+                ensure_profile(response.user.id, getattr(response.session, 'access_token', None))
             except Exception:
                 pass
             return {
@@ -91,6 +95,153 @@ def registrar_usuario(email: str, password: str) -> dict:
         }
 
 
+# ==========================================
+# LIMITADOR DE INTENTOS DE LOGIN (COMPARTIDO)
+# ==========================================
+#
+# Los intentos fallidos se cuentan por proceso, no por sesión de Streamlit:
+# abrir otra pestaña no reinicia el bloqueo. Cada clave lleva un contador de
+# ventana deslizante aproximado: intentos de la ventana actual más los de la
+# anterior ponderados por cuánto de ella sigue dentro. Cada intento es O(1) y
+# la memoria está acotada (se desalojan las claves inactivas).
+#
+# Hay dos claves por intento: (email, cliente), para que nadie pueda bloquear
+# una cuenta ajena desde su propio IP, y el cliente solo, que frena el
+# password spraying (muchos emails desde un mismo IP). Si no se conoce el
+# cliente no se comparte un "cliente desconocido" entre todos: esos intentos
+# cuentan por email solo, con un umbral más alto, y su bloqueo no alcanza a
+# los intentos desde un cliente conocido.
+
+MAX_INTENTOS_EMAIL = 5      # Por email y cliente
+MAX_INTENTOS_EMAIL_SIN_CLIENTE = 20
+MAX_INTENTOS_CLIENTE = 20   # Un mismo IP puede ser una red compartida (NAT)
+VENTANA_INTENTOS_S = 10 * 60
+BLOQUEO_LOGIN_S = 15 * 60
+MAX_CLAVES_LIMITADOR = 10000
+
+
+class AlmacenLimitadorMemoria:
+    """Estado del limitador en memoria del proceso, con desalojo LRU de las claves inactivas.
+    Otro almacén con la misma interfaz (p. ej. sobre Redis, con la actualización
+    atómica en el servidor) permite compartir los contadores entre workers."""
+
+    def __init__(self, max_claves=MAX_CLAVES_LIMITADOR):
+        self.max_claves = max_claves
+        self._estados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            return self._estados.get(clave)
+
+    def actualizar(self, clave, funcion):
+        """Aplica funcion(estado o None) -> nuevo estado (None lo borra) de forma atómica"""
+        with self._lock:
+            estado = funcion(self._estados.pop(clave, None))
+            if estado is not None:
+                self._estados[clave] = estado
+                while len(self._estados) > self.max_claves:
+                    self._estados.popitem(last=False)
+            return estado
+
+
+class LimitadorIntentos:
+    """Bloquea una clave por bloqueo_s cuando acumula max_intentos fallos en ventana_s"""
+
+    def __init__(self, almacen, prefijo, max_intentos, ventana_s=VENTANA_INTENTOS_S, bloqueo_s=BLOQUEO_LOGIN_S):
+        self.almacen = almacen
+        self.prefijo = prefijo
+        self.max_intentos = max_intentos
+        self.ventana_s = ventana_s
+        self.bloqueo_s = bloqueo_s
+
+    def bloqueado_hasta(self, clave, ahora=None):
+        """Momento (epoch) hasta el que la clave está bloqueada, o 0"""
+        if not clave:
+            return 0.0
+        estado = self.almacen.obtener(f"{self.prefijo}:{clave}")
+        ahora = time.time() if ahora is None else ahora
+        if estado and estado['bloqueado_hasta'] > ahora:
+            return estado['bloqueado_hasta']
+        return 0.0
+
+    def registrar_fallo(self, clave, ahora=None):
+        """Suma un intento fallido. Retorna hasta cuándo queda bloqueada la clave (0 si no)"""
+        if not clave:
+            return 0.0
+        ahora = time.time() if ahora is None else ahora
+        ventana = ahora - ahora % self.ventana_s
+
+        def sumar(estado):
+            estado = dict(estado) if estado else {'ventana': ventana, 'actual': 0, 'previa': 0, 'bloqueado_hasta': 0.0}
+            if estado['ventana'] != ventana:
+                # La ventana actual pasa a ser la previa (o se pierde si quedó más atrás)
+                estado['previa'] = estado['actual'] if ventana - estado['ventana'] == self.ventana_s else 0
+                estado['actual'] = 0
+                estado['ventana'] = ventana
+            estado['actual'] += 1
+            peso_previa = 1 - (ahora - ventana) / self.ventana_s
+            if estado['actual'] + estado['previa'] * peso_previa >= self.max_intentos:
+                estado['bloqueado_hasta'] = ahora + self.bloqueo_s
+                estado['actual'] = estado['previa'] = 0
+            return estado
+
+        return self.almacen.actualizar(f"{self.prefijo}:{clave}", sumar)['bloqueado_hasta']
+
+    def reiniciar(self, clave):
+        self.almacen.actualizar(f"{self.prefijo}:{clave}", lambda estado: None)
+
+
+almacen_limitador = AlmacenLimitadorMemoria()
+limitador_email_cliente = LimitadorIntentos(almacen_limitador, "email_cliente", MAX_INTENTOS_EMAIL)
+limitador_email = LimitadorIntentos(almacen_limitador, "email", MAX_INTENTOS_EMAIL_SIN_CLIENTE)
+limitador_cliente = LimitadorIntentos(almacen_limitador, "cliente", MAX_INTENTOS_CLIENTE)
+
+
+def _id_cliente():
+    """IP del cliente, o None si no se conoce.
+    X-Forwarded-For lo puede escribir el propio cliente: solo se usa detrás de
+    PROXIES_CONFIABLES proxies, y solo la entrada que agregó el más externo."""
+    try:
+        proxies = get_proxies_confiables()
+        if proxies:
+            reenviado = [ip.strip() for ip in st.context.headers.get("X-Forwarded-For", "").split(",")]
+            if len(reenviado) >= proxies and reenviado[-proxies]:
+                return reenviado[-proxies]
+        return st.context.ip_address or None
+    except Exception:
+        return None
+
+
+def _limitador_email(email, cliente):
+    """(limitador, clave) que cuenta los intentos del email: por email y cliente o,
+    sin cliente conocido, por email solo"""
+    if cliente:
+        return limitador_email_cliente, f"{email}|{cliente}"
+    return limitador_email, email
+
+
+def _bloqueo_login(email, cliente, ahora):
+    """Hasta cuándo está bloqueado el login para este email desde este cliente, o para el cliente (0 si no)"""
+    limitador, clave = _limitador_email(email, cliente)
+    return max(limitador.bloqueado_hasta(clave, ahora), limitador_cliente.bloqueado_hasta(cliente, ahora))
+
+
+def _registrar_fallo_login(email, cliente, ahora):
+    """Cuenta un intento fallido para el email desde el cliente y para el cliente; arma la respuesta de error"""
+    limitador, clave = _limitador_email(email, cliente)
+    bloqueo = max(limitador.registrar_fallo(clave, ahora), limitador_cliente.registrar_fallo(cliente, ahora))
+    if bloqueo > ahora:
+        return {
+            "success": False,
+            "message": "⛔ Demasiados intentos fallidos. Te bloqueamos por 15 minutos. Usa 'Olvidé mi contraseña'."
+        }
+    return {
+        "success": False,
+        "message": "❌ Email o contraseña incorrectos."
+    }
+
+
 def iniciar_sesion(email: str, password: str) -> dict:
     """
     Inicia sesión con email y contraseña.
@@ -98,22 +249,16 @@ def iniciar_sesion(email: str, password: str) -> dict:
     """
     supabase = get_supabase_client()
 
-    # Rate limiting / bloqueo tras intentos fallidos
-    max_intentos = 5
-    ventana_segundos = 10 * 60  # 10 minutos ventana
-    lockout_segundos = 15 * 60  # bloqueo 15 minutos
-
-    if 'failed_attempts' not in st.session_state:
-        st.session_state['failed_attempts'] = []  # lista de timestamps
-    if 'lockout_until' not in st.session_state:
-        st.session_state['lockout_until'] = 0.0
-
+    # Rate limiting / bloqueo tras intentos fallidos (por email y cliente, y por cliente, en todo el proceso)
+    email_normalizado = email.strip().lower()
+    cliente = _id_cliente()
     now = time.time()
-    if st.session_state['lockout_until'] and now < st.session_state['lockout_until']:
-        restante = int(st.session_state['lockout_until'] - now)
+    bloqueo = _bloqueo_login(email_normalizado, cliente, now)
+    if bloqueo:
+        restante = int(bloqueo - now)
         return {
             "success": False,
-            "message": f"⛔ Cuenta temporalmente bloqueada por intentos fallidos. Intenta en {restante//60} min o usa 'Olvidé mi contraseña'."
+            "message": f"⛔ Cuenta temporalmente bloqueada por intentos fallidos. Intenta en {max(1, restante // 60)} min o usa 'Olvidé mi contraseña'."
         }
     
     try:
@@ -140,17 +285,16 @@ def iniciar_sesion(email: str, password: str) -> dict:
                     "message": "⚠️ Debes confirmar tu email antes de acceder. Revisa tu bandeja y confirma la cuenta."
                 }
 
-            # Guardar en session_state
-            st.session_state['user'] = response.user
-            st.session_state['session'] = response.session
-            st.session_state['authenticated'] = True
+            # Guardar en session_state (con la expiración del token para no revalidarlo en cada rerun)
+            _guardar_sesion(response.session, response.user)
 
-            # Limpiar intentos fallidos tras éxito
-            st.session_state['failed_attempts'] = []
+            # Limpiar intentos fallidos del email desde este cliente tras éxito
+            limitador, clave = _limitador_email(email_normalizado, cliente)
+            limitador.reiniciar(clave)
 
-            # Asegurar perfil existente
+            # Asegurar perfil existente (en segundo plano)
             try:
-                ensure_profile(response.user.id)
+                ensure_profile(response.user.id, response.session.access_token)
             except Exception:
                 pass
             
@@ -161,26 +305,12 @@ def iniciar_sesion(email: str, password: str) -> dict:
             }
         else:
             # Registrar intento fallido
-            st.session_state['failed_attempts'].append(now)
-            # Filtrar a ventana
-            st.session_state['failed_attempts'] = [t for t in st.session_state['failed_attempts'] if now - t <= ventana_segundos]
-            if len(st.session_state['failed_attempts']) >= max_intentos:
-                st.session_state['lockout_until'] = now + lockout_segundos
-                return {
-                    "success": False,
-                    "message": "⛔ Demasiados intentos fallidos. Te bloqueamos por 15 minutos. Usa 'Olvidé mi contraseña'."
-                }
-            return {
-                "success": False,
-                "message": "❌ Email o contraseña incorrectos."
-            }
+            return _registrar_fallo_login(email_normalizado, cliente, now)
     except Exception as e:
         error_msg = str(e)
         if "Invalid login credentials" in error_msg:
-            return {
-                "success": False,
-                "message": "❌ Email o contraseña incorrectos."
-            }
+            # Supabase informa las credenciales inválidas como excepción: también cuentan
+            return _registrar_fallo_login(email_normalizado, cliente, now)
         return {
             "success": False,
             "message": f"❌ Error: {error_msg}"
@@ -189,16 +319,11 @@ def iniciar_sesion(email: str, password: str) -> dict:
 
 def cerrar_sesion():
     """Cierra la sesión actual."""
-    try:
-        supabase = get_supabase_client()
-        supabase.auth.sign_out()
-    except:
-        pass
+    # Cierra la sesión en Supabase y descarta el cliente de esta sesión
+    descartar_cliente_sesion()
     
     # Limpiar session_state
-    st.session_state['user'] = None
-    st.session_state['session'] = None
-    st.session_state['authenticated'] = False
+    _limpiar_sesion()
 
 
 def obtener_usuario_actual():
@@ -211,25 +336,134 @@ def esta_autenticado() -> bool:
     return st.session_state.get('authenticated', False)
 
 
+def obtener_rol_usuario() -> str:
+    """Rol del usuario actual según public.profiles ('user' si no se puede leer).
+    Se consulta una sola vez por sesión y usuario."""
+    usuario = obtener_usuario_actual()
+    if usuario is None:
+        return "user"
+
+    if st.session_state.get('rol_usuario_id') != usuario.id:
+        rol = "user"
+        try:
+            supabase = get_supabase_client()
+            # RLS: cada usuario solo puede leer su propio perfil, con su token
+            sesion = st.session_state.get('session')
+            if getattr(sesion, 'access_token', None):
+                supabase.postgrest.auth(sesion.access_token)
+            respuesta = supabase.table("profiles").select("role").eq("id", usuario.id).limit(1).execute()
+            if respuesta.data:
+                rol = respuesta.data[0].get("role") or "user"
+                sincronizador_perfiles.marcar_conocido(usuario.id)
+        except Exception:
+            pass
+        st.session_state['rol_usuario'] = rol
+        st.session_state['rol_usuario_id'] = usuario.id
+    return st.session_state['rol_usuario']
+
+
+def es_admin() -> bool:
+    """Verifica si el usuario actual tiene rol 'admin'."""
+    return obtener_rol_usuario() == "admin"
+
+
+# Refresh-ahead: la sesión se renueva cuando le quedan menos de estos segundos
+MARGEN_REFRESCO_S = 120
+# Si la renovación falla con el token todavía vigente, se reintenta pasado este tiempo
+REINTENTO_REFRESCO_S = 30
+
+
+def _expiracion_sesion(sesion):
+    """Momento (epoch) en que vence el access token, leído localmente sin consultar a Supabase.
+    Usa expires_at de la sesión o, si falta, el claim 'exp' del JWT. None si no se puede leer."""
+    expira = getattr(sesion, 'expires_at', None)
+    if expira:
+        return float(expira)
+    token = getattr(sesion, 'access_token', None)
+    try:
+        carga = token.split(".")[1]
+        carga += "=" * (-len(carga) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(carga))['exp'])
+    except Exception:
+        return None
+
+
+def _guardar_sesion(sesion, usuario=None):
+    """Deja la sesión en session_state y cachea hasta cuándo es válida sin volver a verificarla"""
+    st.session_state['user'] = usuario or sesion.user
+    st.session_state['session'] = sesion
+    st.session_state['authenticated'] = True
+    expira = _expiracion_sesion(sesion)
+    # Sin expiración legible se verifica en el próximo rerun
+    st.session_state['sesion_valida_hasta'] = expira - MARGEN_REFRESCO_S if expira else 0.0
+
+
+def _limpiar_sesion():
+    st.session_state['user'] = None
+    st.session_state['session'] = None
+    st.session_state['authenticated'] = False
+    st.session_state['sesion_valida_hasta'] = 0.0
+
+
+def _refrescar_sesion(sesion):
+    """Renueva la sesión. Si falla, la conserva mientras el access token siga
+    vigente y la descarta cuando ya venció."""
+    ahora = time.time()
+    try:
+        supabase = get_supabase_client()
+        # El cliente de la sesión renueva con su propio refresh token, el último que
+        # rotó: el guardado en session_state puede estar ya usado y Supabase revoca
+        # la sesión si se reusa. Solo si el cliente no tiene sesión (no pudo haberlo
+        # rotado) se usa el guardado.
+        if supabase.auth.get_session() is not None:
+            respuesta = supabase.auth.refresh_session()
+        else:
+            respuesta = supabase.auth.refresh_session(sesion.refresh_token)
+        nueva = supabase.auth.get_session() or getattr(respuesta, 'session', None)
+        if nueva:
+            _guardar_sesion(nueva, getattr(respuesta, 'user', None))
+            return
+    except Exception:
+        pass
+
+    expira = _expiracion_sesion(sesion)
+    if expira and ahora < expira:
+        st.session_state['sesion_valida_hasta'] = ahora + REINTENTO_REFRESCO_S
+    else:
+        _limpiar_sesion()
+
+
 def inicializar_estado_auth():
-    """Inicializa las variables de sesión para autenticación."""
+    """Inicializa las variables de sesión para autenticación.
+    Corre en cada rerun: mientras el token no esté por vencer no consulta a Supabase."""
     if 'user' not in st.session_state:
         st.session_state['user'] = None
     if 'session' not in st.session_state:
         st.session_state['session'] = None
     if 'authenticated' not in st.session_state:
         st.session_state['authenticated'] = False
-    
-    # Verificar si hay una sesión activa en Supabase
+    if 'sesion_valida_hasta' not in st.session_state:
+        st.session_state['sesion_valida_hasta'] = 0.0
+
+    sesion = st.session_state['session']
+    if sesion is not None:
+        # Caché de validación: la expiración se verificó localmente al guardar la sesión
+        if time.time() < st.session_state['sesion_valida_hasta']:
+            return
+        _refrescar_sesion(sesion)
+        return
+
+    # Sin sesión en el estado: se busca una sola vez por sesión de Streamlit en el cliente
+    if st.session_state.get('sesion_buscada'):
+        return
+    st.session_state['sesion_buscada'] = True
     try:
         supabase = get_supabase_client()
         user_session = supabase.auth.get_session()
-        
+
         if user_session and user_session.user:
             # Hay una sesión activa, actualizar estado
-            st.session_state['user'] = user_session.user
-            st.session_state['session'] = user_session
-            st.session_state['authenticated'] = True
+            _guardar_sesion(user_session)
     except Exception as e:
         # Si hay error, mantener estado actual
         pass
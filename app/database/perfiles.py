@@ -0,0 +1,134 @@
+# ==========================================
+# SINCRONIZACIÓN DE PERFILES (EN SEGUNDO PLANO)
+# ==========================================
+#
+# El trigger on_auth_user_created (supabase_sql/001_profiles_and_rls.sql) ya
+# crea el perfil de cada usuario nuevo; el upsert desde la app es solo un
+# respaldo y no debe sumar un viaje a la base al login. Los ids que ya se
+# sabe que tienen perfil se recuerdan un tiempo (conjunto con TTL) y el resto
+# se encola para un hilo de fondo que los envía por lotes.
+#
+# Por RLS cada usuario solo puede insertar su propia fila: cada id viaja con el
+# access token de su sesión y el lote se envía como un upsert por usuario.
+# Es un insert-si-no-existe: un perfil existente (p. ej. un admin) no se toca.
+
+from collections import OrderedDict
+import threading
+import time
+
+from .supabase_client import crear_cliente_supabase
+
+
+TTL_PERFIL_CONOCIDO_S = 6 * 3600
+MAX_PERFILES_CONOCIDOS = 10000
+INTERVALO_LOTE_S = 2.0
+TAMANO_LOTE = 50
+
+
+class ConjuntoTTL:
+    """Conjunto de claves que vencen pasado ttl_s; con tope de tamaño (descarta las más viejas)"""
+
+    def __init__(self, ttl_s, max_claves):
+        self.ttl_s = ttl_s
+        self.max_claves = max_claves
+        self._vencimientos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def contiene(self, clave):
+        with self._lock:
+            vence = self._vencimientos.get(clave)
+            if vence is None:
+                return False
+            if vence <= time.monotonic():
+                del self._vencimientos[clave]
+                return False
+            return True
+
+    def agregar(self, clave):
+        with self._lock:
+            self._vencimientos.pop(clave, None)
+            self._vencimientos[clave] = time.monotonic() + self.ttl_s
+            while len(self._vencimientos) > self.max_claves:
+                self._vencimientos.popitem(last=False)
+
+    def descartar(self, clave):
+        with self._lock:
+            self._vencimientos.pop(clave, None)
+
+    def __len__(self):
+        return len(self._vencimientos)
+
+
+class SincronizadorPerfiles:
+    """Asegura perfiles sin bloquear: recuerda los conocidos y encola el resto
+    para un hilo de fondo que los envía por lotes"""
+
+    def __init__(self, crear_cliente, ttl_s=TTL_PERFIL_CONOCIDO_S, max_conocidos=MAX_PERFILES_CONOCIDOS,
+                 intervalo_s=INTERVALO_LOTE_S, tamano_lote=TAMANO_LOTE):
+        self.conocidos = ConjuntoTTL(ttl_s, max_conocidos)
+        self.intervalo_s = intervalo_s
+        self.tamano_lote = tamano_lote
+        self._crear_cliente = crear_cliente
+        self._cliente = None
+        self._pendientes = OrderedDict()  # user_id -> access token (cada id pendiente una sola vez)
+        self._lock = threading.Lock()
+        self._lock_envio = threading.Lock()  # El cliente cambia de token entre upserts
+        self._hay_lote = threading.Event()
+        self._hilo = None
+
+    def asegurar(self, user_id, access_token):
+        """Encola el perfil de user_id salvo que ya se sepa que existe. No hace I/O."""
+        if self.conocidos.contiene(user_id):
+            return
+        with self._lock:
+            if self._cliente is None:
+                # Se crea en el hilo que llama (el del script), no en el de fondo
+                self._cliente = self._crear_cliente()
+            self._pendientes[user_id] = access_token  # El token más reciente del usuario
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="sync-perfiles", daemon=True)
+                self._hilo.start()
+            if len(self._pendientes) >= self.tamano_lote:
+                self._hay_lote.set()
+
+    def marcar_conocido(self, user_id):
+        """Registra que user_id ya tiene perfil (p. ej. porque se leyó su fila)"""
+        self.conocidos.agregar(user_id)
+        with self._lock:
+            self._pendientes.pop(user_id, None)
+
+    def _tomar_lote(self):
+        with self._lock:
+            lote = []
+            while self._pendientes and len(lote) < self.tamano_lote:
+                lote.append(self._pendientes.popitem(last=False))
+            return lote
+
+    def _bucle(self):
+        """Hilo de fondo: cada intervalo (o antes, si se juntó un lote completo) envía lo pendiente"""
+        while True:
+            self._hay_lote.wait(self.intervalo_s)
+            self._hay_lote.clear()
+            self.enviar_pendientes()
+
+    def enviar_pendientes(self):
+        """Envía todos los perfiles pendientes en lotes. Retorna cuántos quedaron asegurados."""
+        asegurados = 0
+        with self._lock_envio:
+            lote = self._tomar_lote()
+            while lote:
+                for user_id, access_token in lote:
+                    try:
+                        self._cliente.postgrest.auth(access_token)
+                        self._cliente.table("profiles").upsert({"id": user_id}, ignore_duplicates=True).execute()
+                        self.conocidos.agregar(user_id)
+                        asegurados += 1
+                    except Exception:
+                        # Silencioso: si la tabla aún no existe o el token venció, no rompemos
+                        # nada; el trigger de alta cubre el caso y el próximo login reintenta
+                        pass
+                lote = self._tomar_lote()
+        return asegurados
+
+
+sincronizador_perfiles = SincronizadorPerfiles(crear_cliente_supabase)
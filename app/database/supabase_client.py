@@ -1,18 +1,81 @@
 # ==========================================
 # CLIENTE DE SUPABASE
 # ==========================================
+#
+# Crear un cliente por llamada abría conexiones HTTP nuevas (con su handshake
+# TLS) en cada rerun. El pool de conexiones keep-alive es ahora uno por proceso
+# (st.cache_resource) y cada sesión de Streamlit tiene un único cliente sobre
+# ese pool. El cliente no se comparte entre sesiones: guarda el estado de
+# autenticación (GoTrue) y los encabezados con el token de su usuario.
+#
+# La renovación de tokens es de la app (ver auth.py): el auto-refresh de GoTrue
+# queda apagado. Con él, cada cliente arma un Timer que se reprograma solo,
+# sigue renovando después de que la sesión del navegador terminó y rota el
+# refresh token por su cuenta, dejando vencido el que guarda la app.
 
+import httpx
 import streamlit as st
-from supabase import create_client, Client
+from supabase import create_client, Client, ClientOptions
 from app.environment import get_supabase_url, get_supabase_key
 
 
-def get_supabase_client() -> Client:
+MAX_CONEXIONES_HTTP = 20
+MAX_CONEXIONES_KEEPALIVE = 10
+KEEPALIVE_S = 60
+TIMEOUT_HTTP_S = 15
+
+CLAVE_CLIENTE_SESION = 'cliente_supabase'
+
+
+@st.cache_resource(show_spinner=False)
+def _transporte_http() -> httpx.HTTPTransport:
+    """Pool de conexiones keep-alive compartido por todas las sesiones del proceso"""
+    return httpx.HTTPTransport(
+        limits=httpx.Limits(
+            max_connections=MAX_CONEXIONES_HTTP,
+            max_keepalive_connections=MAX_CONEXIONES_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_S
+        )
+    )
+
+
+def crear_cliente_supabase() -> Client:
     """
-    Crea y retorna un cliente de Supabase.
+    Crea un cliente de Supabase nuevo, sin sesión, sobre el pool compartido.
     Lee SUPABASE_URL y SUPABASE_KEY de tus secretos.
     """
-    url = get_supabase_url()
-    key = get_supabase_key()
-    
-    return create_client(url, key)
+    # httpx.Client propio (encabezados y token de este cliente) sobre el transporte común
+    http = httpx.Client(transport=_transporte_http(), timeout=TIMEOUT_HTTP_S)
+    try:
+        opciones = ClientOptions(httpx_client=http, auto_refresh_token=False, persist_session=False)
+    except TypeError:
+        # supabase-py sin la opción httpx_client: el cliente arma sus propias conexiones
+        opciones = ClientOptions(auto_refresh_token=False, persist_session=False)
+
+    return create_client(get_supabase_url(), get_supabase_key(), options=opciones)
+
+
+def get_supabase_client() -> Client:
+    """
+    Retorna el cliente de Supabase de la sesión actual de Streamlit.
+    Se crea una sola vez por sesión y se reutiliza en cada rerun.
+    """
+    cliente = st.session_state.get(CLAVE_CLIENTE_SESION)
+    if cliente is None:
+        cliente = crear_cliente_supabase()
+        st.session_state[CLAVE_CLIENTE_SESION] = cliente
+    return cliente
+
+
+def descartar_cliente_sesion() -> None:
+    """Cierra la sesión de auth del cliente de la sesión (p. ej. al cerrar sesión) y lo
+    olvida: el próximo arranca limpio"""
+    cliente = st.session_state.pop(CLAVE_CLIENTE_SESION, None)
+    if cliente is None:
+        return
+    try:
+        # Revoca solo esta sesión (scope local: las de otros dispositivos siguen) y
+        # cancela cualquier renovación pendiente del cliente
+        cliente.auth.sign_out({"scope": "local"})
+    except Exception:
+        pass
@@ -35,6 +35,50 @@ def get_supabase_key() -> str:
     return key
 
 
+def get_procesos_extraccion() -> int:
+    """Cantidad de procesos para extraer páginas en paralelo (1 = serial)"""
+    valor = _get_secret("PROCESOS_EXTRACCION") or "1"
+    try:
+        return max(1, int(valor))
+    except ValueError:
+        return 1
+
+
+def get_presupuesto_memoria_mb() -> int:
+    """Memoria (MB) que pueden reservar entre todos los procesamientos en curso del servidor"""
+    valor = _get_secret("PRESUPUESTO_MEMORIA_MB") or "1024"
+    try:
+        return max(64, int(valor))
+    except ValueError:
+        return 1024
+
+
+def get_limite_paginas_escaneo() -> Optional[int]:
+    """Páginas que muestrea el escaneo de colores, repartidas en el documento.
+    None (sin valor o 0) recorre todo el PDF por la tabla xref."""
+    valor = _get_secret("LIMITE_PAGINAS_ESCANEO") or "0"
+    try:
+        return max(0, int(valor)) or None
+    except ValueError:
+        return None
+
+
+def get_proxies_confiables() -> int:
+    """Cantidad de proxies propios delante de la app (0 = acceso directo).
+    Solo con un valor > 0 se lee X-Forwarded-For para identificar al cliente."""
+    valor = _get_secret("PROXIES_CONFIABLES") or "0"
+    try:
+        return max(0, int(valor))
+    except ValueError:
+        return 0
+
+
+def exportar_a_disco() -> bool:
+    """Si es True, cada DOCX generado también se guarda en 'export/' (en segundo plano)"""
+    valor = _get_secret("EXPORTAR_DISCO") or "false"
+    return str(valor).lower() in ("1", "true", "si", "yes")
+
+
 def is_dev() -> bool:
     """Verifica si estás en desarrollo local"""
     env = _get_secret("ENVIRONMENT", "dev").lower()
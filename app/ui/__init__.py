@@ -1,10 +1,15 @@
 # UI - Componentes de interfaz de usuario
 from .components import (
     render_color_config,
+    render_muestras_colores,
     render_toc_config,
     render_global_settings,
     render_preview,
+    render_preview_html,
+    render_navegacion_preview,
     render_download_button,
+    render_panel_rendimiento,
+    render_seguimiento_trabajo,
     render_tab_home,
     render_tab_pricing
 )
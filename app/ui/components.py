@@ -3,6 +3,7 @@
 # ==========================================
 
 import streamlit as st
+import streamlit.components.v1 as components
 import base64
 from streamlit_pdf_viewer import pdf_viewer
 
@@ -12,11 +13,14 @@ from app.config import (
     LISTA_ACCIONES,
     LISTA_ESTILOS_LISTA,
     LISTA_ESPACIADOS,
+    LISTA_MOTORES,
+    LISTA_MODOS_PREVIEW,
     DEFAULT_COLOR_OPTIONS,
     DEFAULT_TOC_CONFIG,
     DEFAULT_GLOBAL_SETTINGS
 )
 from app.core.utils import rgb_pdf_a_hex
+from app.core.trabajos import cola_trabajos, ESTADOS_FINALES
 
 
 def render_color_config(colores):
@@ -54,6 +58,17 @@ def render_color_config(colores):
     return config_final
 
 
+def render_muestras_colores(contenedor, colores):
+    """Muestras de los colores encontrados hasta ahora en el contenedor (un st.empty);
+    se vuelve a llamar con cada color nuevo durante el escaneo"""
+    muestras = "".join(
+        f"<span title='{rgb_pdf_a_hex(color)}' style='display:inline-block;width:22px;height:22px;"
+        f"margin-right:4px;border-radius:4px;border:1px solid #ccc;background:{rgb_pdf_a_hex(color)};'></span>"
+        for color in colores
+    )
+    contenedor.markdown(f"🎨 {len(colores)} color(es) encontrado(s)... {muestras}", unsafe_allow_html=True)
+
+
 def render_toc_config():
     """Renderiza el expander de configuración del TOC"""
     with st.expander("📑 Configuración del Índice (TOC)", expanded=False):
@@ -77,8 +92,28 @@ def render_global_settings():
             separar_paginas = st.toggle("Insertar Separador de Páginas", value=DEFAULT_GLOBAL_SETTINGS['separar_paginas'])
         with gc3: 
             padding = st.slider("Margen de Captura (Padding)", 0, 5, DEFAULT_GLOBAL_SETTINGS['padding'], help="Aumenta el área de recorte si el texto sale cortado.")
+        
+        opciones_motor = list(LISTA_MOTORES.keys())
+        motor_extraccion = st.selectbox(
+            "Motor de Extracción",
+            opciones_motor,
+            index=opciones_motor.index(DEFAULT_GLOBAL_SETTINGS['motor_extraccion']),
+            format_func=LISTA_MOTORES.get,
+            key="motor_ext",
+            help="PyMuPDF lee el PDF una sola vez. Usa el clásico si el texto extraído sale distinto."
+        )
+
+        opciones_preview = list(LISTA_MODOS_PREVIEW.keys())
+        modo_preview = st.selectbox(
+            "Vista Previa",
+            opciones_preview,
+            index=opciones_preview.index(DEFAULT_GLOBAL_SETTINGS['modo_preview']),
+            format_func=LISTA_MODOS_PREVIEW.get,
+            key="modo_preview",
+            help="La vista HTML se muestra al instante; la PDF reproduce las páginas tal como se imprimen."
+        )
     
-    return usar_toc, separar_paginas, padding
+    return usar_toc, separar_paginas, padding, motor_extraccion, modo_preview
 
 
 def render_preview(pdf_bytes):
@@ -97,6 +132,95 @@ def render_preview(pdf_bytes):
     pdf_viewer(pdf_bytes, width=700, height=800)
 
 
+def render_preview_html(html_preview):
+    """Renderiza la vista previa HTML del documento generado"""
+    st.divider()
+    st.subheader("👀 Vista Previa del Resultado")
+    components.html(html_preview, height=800, scrolling=True)
+
+
+def render_navegacion_preview(num_ventana, hay_siguiente):
+    """Renderiza los controles de la vista previa paginada.
+    Retorna el número de ventana a mostrar después de la interacción."""
+    c_prev, c_info, c_next = st.columns([1, 2, 1])
+    with c_prev:
+        if st.button("⬅️ Anteriores", disabled=num_ventana == 0, use_container_width=True):
+            return num_ventana - 1
+    with c_info:
+        st.caption(f"Bloque {num_ventana + 1} de la vista previa")
+    with c_next:
+        if st.button("Siguientes ➡️", disabled=not hay_siguiente, use_container_width=True):
+            return num_ventana + 1
+    return num_ventana
+
+
+def render_panel_rendimiento(metricas):
+    """Panel colapsable con las métricas de instrumentación (solo administradores).
+    metricas: {título: dict de RegistroInstrumentacion.como_dict()}"""
+    with st.expander("📊 Rendimiento", expanded=False):
+        st.toggle(
+            "Medir memoria (tracemalloc)",
+            key="medir_memoria",
+            help="Registra el pico de memoria de cada etapa en el próximo procesamiento. Es bastante más lento."
+        )
+
+        for titulo, datos in metricas.items():
+            if not datos:
+                continue
+            st.markdown(f"**{titulo}** · {datos['duracion_total_s'] * 1000:.0f} ms")
+            if datos.get('memoria_no_disponible'):
+                st.caption("Memoria no medida: otro procesamiento estaba usando tracemalloc.")
+
+            filas = []
+            for etapa, m in datos['etapas'].items():
+                fila = {
+                    'Etapa': etapa,
+                    'Llamadas': m['llamadas'],
+                    'Total (ms)': round(m['total_s'] * 1000, 1),
+                    'Máx (ms)': round(m['max_s'] * 1000, 1),
+                }
+                if 'pico_memoria_mb' in m:
+                    fila['Pico (MB)'] = m['pico_memoria_mb']
+                filas.append(fila)
+            if filas:
+                st.dataframe(filas, use_container_width=True, hide_index=True)
+
+            if datos['contadores']:
+                st.caption(" · ".join(f"{nombre}: {valor}" for nombre, valor in datos['contadores'].items()))
+
+            if datos['paginas']:
+                filas_paginas = []
+                for pagina, etapas in datos['paginas'].items():
+                    fila = {'Página': pagina}
+                    for etapa, m in etapas.items():
+                        if etapa == 'contadores':
+                            fila.update(m)
+                        else:
+                            fila[f"{etapa} (ms)"] = round(m['total_s'] * 1000, 1)
+                    filas_paginas.append(fila)
+                st.dataframe(filas_paginas, use_container_width=True, hide_index=True)
+
+        st.json(metricas, expanded=False)
+
+
+@st.fragment(run_every=1.0)
+def render_seguimiento_trabajo(id_trabajo):
+    """Avance de un trabajo en segundo plano; se refresca solo cada segundo.
+    Cuando el trabajo termina relanza el script completo para mostrar el resultado."""
+    estado = cola_trabajos.estado(id_trabajo)
+    if estado is None or estado['estado'] in ESTADOS_FINALES:
+        st.rerun()
+
+    if estado['estado'] == "pendiente":
+        st.progress(0.0, text="⏳ En cola, esperando un lugar libre...")
+    else:
+        st.progress(estado['progreso'], text=f"⚙️ Procesando... {estado['progreso']:.0%}")
+
+    if st.button("✖️ Cancelar", key=f"cancelar_{id_trabajo}"):
+        cola_trabajos.cancelar(id_trabajo)
+        st.rerun()
+
+
 def render_download_button(word_buffer):
     """Renderiza el botón de descarga del documento Word"""
     st.download_button(
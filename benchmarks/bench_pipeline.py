@@ -0,0 +1,212 @@
+# ==========================================
+# BENCHMARK DEL PIPELINE COMPLETO
+# ==========================================
+#
+# Mide por separado las etapas que recorre un PDF en la app:
+#   escanear_colores_pdf -> procesar_pdf -> generar_preview_visual -> guardar_documento_word
+# sobre un PDF sintético (ver benchmarks/corpus.py) o uno propio. Cada etapa se
+# repite N veces para el tiempo y una vez más bajo tracemalloc para el pico de
+# memoria. El resultado se guarda en JSON para comparar entre commits.
+#
+# Uso:
+#   python -m benchmarks.bench_pipeline [--paginas N] [--highlights N] ... [--pdf archivo.pdf]
+#                                       [--repeticiones N] [--salida res.json] [--comparar base.json]
+
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+from app.config import DEFAULT_COLOR_OPTIONS, DEFAULT_TOC_CONFIG, LISTA_ACCIONES
+from app.core import (
+    cache_resultados,
+    escanear_colores_pdf,
+    generar_preview_visual,
+    guardar_documento_word,
+    procesar_pdf
+)
+from app.core.motores_pdf import motor_por_defecto
+from app.core.word_generator import DocumentoWord
+from benchmarks.corpus import agregar_argumentos_corpus, generar_pdf_sintetico, parametros_corpus
+
+
+CARPETA_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+
+
+# ==========================================
+# PREPARACIÓN
+# ==========================================
+
+def config_benchmark(colores, motor):
+    """Config como la arma la UI: cada color con una acción distinta (sin 'Ignorar')"""
+    acciones = [a for a in LISTA_ACCIONES if a != "Ignorar"]
+    mapa_colores = {}
+    for n, color in enumerate(colores):
+        mapa_colores[color] = dict(
+            DEFAULT_COLOR_OPTIONS,
+            accion=acciones[n % len(acciones)],
+            autonumerar=n % 2 == 0,
+            pag_en_linea=n % 3 == 0
+        )
+    return {
+        'padding': 1,
+        'usar_toc': True,
+        'separar_paginas': True,
+        'motor_extraccion': motor,
+        'mapa_colores': mapa_colores,
+        'config_toc': dict(DEFAULT_TOC_CONFIG)
+    }
+
+
+def documento_word(lista_datos, config):
+    """Arma con python-docx el mismo documento que describe lista_datos, sin guardarlo"""
+    documento = DocumentoWord()
+    for tipo, texto, ref in lista_datos:
+        if tipo.startswith("CAPITULO_L"):
+            documento.agregar_heading_toc(texto, int(tipo[len("CAPITULO_L"):]), config['config_toc'])
+        elif tipo == "Separador":
+            documento.agregar_separador_pagina(int(re.search(r"\d+", texto).group()))
+        else:
+            documento.agregar_texto_resaltado(texto, config['mapa_colores'][ref])
+    return documento.doc
+
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+def medir_etapa(funcion, repeticiones):
+    """Tiempos de cada repetición y pico de memoria (tracemalloc) de una corrida aparte.
+    Una corrida previa sin medir deja cargado lo que se prepara una vez por proceso
+    (fuentes, documento base); el caché de resultados se vacía antes de cada corrida."""
+    cache_resultados.limpiar()
+    funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        cache_resultados.limpiar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+
+    cache_resultados.limpiar()
+    tracemalloc.start()
+    try:
+        funcion()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'tiempos_s': [round(t, 6) for t in tiempos],
+        'mediana_s': round(statistics.median(tiempos), 6),
+        'minimo_s': round(min(tiempos), 6),
+        'pico_memoria_mb': round(pico / (1024 * 1024), 3),
+    }
+
+
+def ejecutar(pdf_bytes, motor=None, repeticiones=3):
+    """Corre las cuatro etapas sobre el PDF y retorna {etapa: métricas}"""
+    colores = escanear_colores_pdf(io.BytesIO(pdf_bytes), motor)
+    config = config_benchmark(colores, motor)
+    _, lista_datos = procesar_pdf(io.BytesIO(pdf_bytes), config)
+    doc = documento_word(lista_datos, config)
+
+    etapas = {
+        'escanear_colores_pdf': lambda: escanear_colores_pdf(io.BytesIO(pdf_bytes), motor),
+        'procesar_pdf': lambda: procesar_pdf(io.BytesIO(pdf_bytes), config),
+        'generar_preview_visual': lambda: generar_preview_visual(
+            lista_datos, config['mapa_colores'], config['config_toc']
+        ),
+        'guardar_documento_word': lambda: guardar_documento_word(doc),
+    }
+    resultados = {nombre: medir_etapa(funcion, repeticiones) for nombre, funcion in etapas.items()}
+    return resultados, {'colores_detectados': len(colores), 'elementos': len(lista_datos)}
+
+
+def commit_actual():
+    """Hash corto del commit en el que se corre el benchmark (None fuera de git)"""
+    try:
+        salida = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        return salida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(actual, base):
+    """Imprime, por etapa, la relación de tiempos y memoria contra un resultado anterior"""
+    print(f"\nComparación contra {base.get('commit') or base.get('fecha')}:")
+    for etapa, metricas in actual['etapas'].items():
+        previa = base['etapas'].get(etapa)
+        if not previa:
+            continue
+        t = metricas['mediana_s'] / previa['mediana_s'] if previa['mediana_s'] else float('inf')
+        m = metricas['pico_memoria_mb'] / previa['pico_memoria_mb'] if previa['pico_memoria_mb'] else float('inf')
+        print(f"  {etapa:<24} tiempo x{t:.2f}   memoria x{m:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de las etapas del pipeline")
+    agregar_argumentos_corpus(parser)
+    parser.add_argument("--pdf", help="Usar este PDF en lugar del corpus sintético")
+    parser.add_argument("--motor", choices=["pymupdf", "pypdf"], default=None)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto en benchmarks/resultados/)")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+    motor = args.motor or motor_por_defecto()
+
+    if args.pdf:
+        with open(args.pdf, "rb") as archivo:
+            pdf_bytes = archivo.read()
+        corpus = {'pdf': os.path.basename(args.pdf)}
+    else:
+        corpus = parametros_corpus(args)
+        pdf_bytes = generar_pdf_sintetico(**corpus)
+    corpus['tamano_bytes'] = len(pdf_bytes)
+
+    etapas, volumen = ejecutar(pdf_bytes, motor, args.repeticiones)
+    corpus.update(volumen)
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec="seconds"),
+        'commit': commit_actual(),
+        'python': sys.version.split()[0],
+        'plataforma': platform.platform(),
+        'motor': motor,
+        'repeticiones': args.repeticiones,
+        'corpus': corpus,
+        'etapas': etapas,
+    }
+
+    for etapa, metricas in etapas.items():
+        print(f"{etapa:<24} mediana {metricas['mediana_s'] * 1000:9.1f} ms   "
+              f"pico {metricas['pico_memoria_mb']:8.2f} MB")
+
+    salida = args.salida
+    if not salida:
+        os.makedirs(CARPETA_RESULTADOS, exist_ok=True)
+        nombre = f"{resultado['commit'] or 'sin_commit'}_{datetime.now():%Y%m%d_%H%M%S}.json"
+        salida = os.path.join(CARPETA_RESULTADOS, nombre)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            comparar(resultado, json.load(archivo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# ==========================================
+# MICRO-BENCHMARK: reconstruir_texto
+# ==========================================
+#
+# Compara la reconstrucción de texto original (dicts ordenados por top y cada
+# línea por x0 en cada highlight) con la actual, que reutiliza el orden de
+# lectura calculado una vez por página. Verifica además que ambas produzcan
+# exactamente el mismo texto para cada highlight.
+#
+# Uso:
+#   python -m benchmarks.bench_reconstruir_texto [--paginas N] [--highlights N] [archivo.pdf ...]
+
+"""Micro-benchmark de reconstruir_texto: implementación original contra la actual, con el mismo texto por highlight"""
+
+import argparse
+import random
+import time
+
+from app.core.indice_espacial import crear_indice_pagina
+from app.core.motores_pdf import abrir_motor
+from app.core.pdf_extractor import reconstruir_texto_indices, seleccionar_indices
+from tests.referencia_texto import reconstruir_texto_original
+
+
+# ==========================================
+# CORPUS
+# ==========================================
+
+def pagina_sintetica(rnd, lineas=45, columnas=90):
+    """Página de texto con leve ruido vertical, espacios y caracteres duplicados (OCR)"""
+    chars = []
+    for n in range(lineas):
+        base = 60 + n * 14
+        x = 50.0
+        for _ in range(columnas):
+            ancho = rnd.uniform(4, 7)
+            top = base + rnd.uniform(-0.8, 0.8)
+            texto = " " if rnd.random() < 0.15 else rnd.choice("abcdefghijklmnñopqrstuvwxyzáéí")
+            char = {'text': texto, 'x0': x, 'x1': x + ancho, 'top': top, 'bottom': top + 11}
+            chars.append(char)
+            if rnd.random() < 0.02:
+                chars.append(dict(char))  # Caracter duplicado en la misma posición
+            x += ancho + rnd.uniform(0, 3)
+    rnd.shuffle(chars)
+    return 842.0, chars
+
+
+def highlights_sinteticos(rnd, alto, cantidad):
+    """Highlights de 1 a 4 líneas con un quad por línea, como los de un visor de PDF"""
+    highlights = []
+    for _ in range(cantidad):
+        primera = rnd.randrange(40)
+        quads = []
+        for n in range(primera, primera + rnd.randint(1, 4)):
+            top, bottom = 58 + n * 14, 72 + n * 14
+            left, right = rnd.uniform(40, 300), rnd.uniform(300, 600)
+            y_sup, y_inf = alto - top, alto - bottom
+            quads += [left, y_sup, right, y_sup, left, y_inf, right, y_inf]
+        highlights.append({"/QuadPoints": quads})
+    return highlights
+
+
+def paginas_pdf(ruta):
+    """Páginas con highlights de un PDF real: (alto, chars, highlights)"""
+    with open(ruta, "rb") as archivo:
+        motor = abrir_motor(archivo)
+        try:
+            for i in range(motor.total_paginas):
+                highlights = [h for h in motor.highlights_pagina(i) if "/Rect" in h]
+                if highlights:
+                    alto, chars = motor.caracteres_pagina(i)
+                    yield alto, list(chars), highlights
+        finally:
+            motor.cerrar()
+
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+def medir(paginas):
+    """Tiempo total de ambas implementaciones sobre las mismas selecciones de caracteres"""
+    t_original = t_actual = 0.0
+    total = distintos = 0
+    for alto, chars, highlights in paginas:
+        indice = crear_indice_pagina(chars)
+        selecciones = [seleccionar_indices(datos, alto, indice) for datos in highlights]
+
+        inicio = time.perf_counter()
+        originales = [reconstruir_texto_original([chars[i] for i in sel]) for sel in selecciones]
+        t_original += time.perf_counter() - inicio
+
+        # El orden de lectura se construye una vez por página y entra en la medición
+        inicio = time.perf_counter()
+        orden = indice.orden_lectura(selecciones)
+        actuales = [reconstruir_texto_indices(sel, orden) for sel in orden.selecciones]
+        t_actual += time.perf_counter() - inicio
+
+        total += len(selecciones)
+        distintos += sum(a != b for a, b in zip(originales, actuales))
+    return t_original, t_actual, total, distintos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pdfs", nargs="*", help="PDFs con highlights (opcional)")
+    parser.add_argument("--paginas", type=int, default=50)
+    parser.add_argument("--highlights", type=int, default=20, help="Highlights por página sintética")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args()
+
+    if args.pdfs:
+        paginas = [p for ruta in args.pdfs for p in paginas_pdf(ruta)]
+    else:
+        rnd = random.Random(args.semilla)
+        paginas = []
+        for _ in range(args.paginas):
+            alto, chars = pagina_sintetica(rnd)
+            paginas.append((alto, chars, highlights_sinteticos(rnd, alto, args.highlights)))
+
+    t_original, t_actual, total, distintos = medir(paginas)
+    print(f"Highlights: {total}  |  textos distintos: {distintos}")
+    print(f"Original: {t_original * 1000:.1f} ms  |  Actual: {t_actual * 1000:.1f} ms  |  "
+          f"x{t_original / t_actual if t_actual else float('inf'):.2f}")
+    if distintos:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# ==========================================
+# CORPUS SINTÉTICO DE PDFs CON RESALTADOS
+# ==========================================
+#
+# Genera PDFs de prueba en memoria: fpdf2 escribe el texto y pypdf agrega las
+# anotaciones /Highlight con QuadPoints (y el outline). Las posiciones de cada
+# palabra se calculan con los anchos de fpdf2, así que los quads caen sobre el
+# texto real sin tener que releer el PDF.
+#
+# Con variar_geometria, las páginas alternan entre normales, con CropBox
+# recortado, con el MediaBox desplazado del origen y giradas (/Rotate): el
+# texto y los quads no se mueven en el espacio de usuario, así que cualquier
+# motor debe extraer lo mismo que en el PDF sin variar.
+#
+# Uso:
+#   python -m benchmarks.corpus salida.pdf [--paginas N] [--highlights N] ...
+
+import argparse
+import io
+import random
+
+from fpdf import FPDF
+from pypdf import PdfReader, PdfWriter
+from pypdf.annotations import Highlight
+from pypdf.generic import ArrayObject, FloatObject, NameObject, RectangleObject
+
+
+PALETA_COLORES = [
+    (1, 1, 0),        # Amarillo
+    (0, 1, 0),        # Verde
+    (1, 0.5, 0.5),    # Rosa
+    (0.2, 0.6, 1),    # Celeste
+    (1, 0.6, 0),      # Naranja
+    (0.7, 0.4, 1),    # Violeta
+    (0.5, 0.5, 0.5),  # Gris
+    (0, 0.8, 0.8),    # Turquesa
+]
+
+VOCABULARIO = (
+    "el la los las un una de del en con por para sobre entre análisis proceso "
+    "sistema resultado datos modelo función valor página documento capítulo "
+    "estructura método teoría práctica historia desarrollo producción energía "
+    "información relación evaluación según también además porque cuando"
+).split()
+
+GEOMETRIAS_PAGINA = (
+    "normal", "recortada", "desplazada", "girada_90", "girada_180", "girada_270",
+    "recortada_girada_90", "desplazada_girada_270", "desplazada_recortada_girada_180",
+)
+
+TAMANO_FUENTE = 10
+ALTO_LINEA = 14
+MARGEN = 56
+
+
+def _lineas_pagina(pdf, rnd, lineas_por_pagina, palabras_por_linea):
+    """Escribe una página de texto y retorna sus líneas como
+    [(top, [(x0, x1), ...por palabra]), ...] en puntos desde arriba"""
+    pdf.add_page()
+    lineas = []
+    ancho_espacio = pdf.get_string_width(" ")
+    for n in range(lineas_por_pagina):
+        palabras = [rnd.choice(VOCABULARIO) for _ in range(palabras_por_linea)]
+        top = MARGEN + n * ALTO_LINEA
+        pdf.set_xy(MARGEN, top)
+        pdf.cell(0, ALTO_LINEA, " ".join(palabras))
+
+        # fpdf2 deja c_margin a cada lado dentro de la celda
+        x = MARGEN + pdf.c_margin
+        cajas = []
+        for palabra in palabras:
+            ancho = pdf.get_string_width(palabra)
+            cajas.append((x, x + ancho))
+            x += ancho + ancho_espacio
+        lineas.append((top, cajas))
+    return lineas
+
+
+def _quads_highlight(rnd, lineas, alto_pagina):
+    """QuadPoints de un resaltado de 1 a 3 líneas consecutivas, como los de un visor"""
+    primera = rnd.randrange(len(lineas))
+    cantidad = min(rnd.choice((1, 1, 1, 2, 3)), len(lineas) - primera)
+    quads = []
+    for k in range(cantidad):
+        top, cajas = lineas[primera + k]
+        desde = rnd.randrange(len(cajas)) if k == 0 else 0
+        hasta = len(cajas) - 1 if k < cantidad - 1 else rnd.randrange(desde, len(cajas))
+        x0, x1 = cajas[desde][0], cajas[hasta][1]
+        y_sup, y_inf = alto_pagina - top, alto_pagina - (top + ALTO_LINEA)
+        quads += [x0, y_sup, x1, y_sup, x0, y_inf, x1, y_inf]
+    return quads
+
+
+def _variar_geometria(pagina, geometria):
+    """Cambia las cajas o el giro de la página sin mover su contenido"""
+    partes = geometria.split("_")
+    x0, y0, x1, y1 = (float(v) for v in pagina.mediabox)
+    if "desplazada" in partes:
+        x0, y0, x1, y1 = x0 - 50, y0 - 30, x1 - 50, y1 - 30
+        pagina.mediabox = RectangleObject([x0, y0, x1, y1])
+    if "recortada" in partes:
+        pagina.cropbox = RectangleObject([x0 + 40, y0 + 60, x1 - 30, y1 - 50])
+    if "girada" in partes:
+        pagina.rotate(int(partes[-1]))
+
+
+def _agregar_outline(writer, paginas, profundidad):
+    """Outline anidado: un capítulo cada 'profundidad' páginas y un nivel más por página"""
+    if profundidad <= 0:
+        return
+    padres = []
+    for pagina in range(paginas):
+        nivel = pagina % profundidad
+        del padres[nivel:]
+        padre = padres[-1] if padres else None
+        numero = ".".join(str(pagina // profundidad + 1) if i == 0 else "1" for i in range(nivel + 1))
+        titulo = f"Capítulo {numero}" if nivel == 0 else f"Sección {numero}"
+        padres.append(writer.add_outline_item(titulo, pagina, parent=padre))
+
+
+def generar_pdf_sintetico(paginas=20, highlights_por_pagina=10, colores=4, profundidad_outline=2,
+                          lineas_por_pagina=45, palabras_por_linea=12, semilla=1, variar_geometria=False):
+    """Genera un PDF con texto y resaltados de colores. Retorna los bytes del PDF.
+    - colores: cuántos colores de PALETA_COLORES se usan en los resaltados
+    - profundidad_outline: niveles del índice (0 = sin outline)
+    - lineas_por_pagina / palabras_por_linea: densidad de texto
+    - variar_geometria: cada página toma la siguiente de GEOMETRIAS_PAGINA"""
+    rnd = random.Random(semilla)
+    pdf = FPDF(unit="pt", format="A4")
+    pdf.set_auto_page_break(False)
+    pdf.set_font("Helvetica", size=TAMANO_FUENTE)
+    # Helvetica solo cubre latin-1: el vocabulario no sale de ese rango
+    lineas_por_pag = [
+        _lineas_pagina(pdf, rnd, lineas_por_pagina, palabras_por_linea) for _ in range(paginas)
+    ]
+    alto_pagina = pdf.h
+
+    writer = PdfWriter(clone_from=PdfReader(io.BytesIO(bytes(pdf.output()))))
+    paleta = PALETA_COLORES[:max(1, min(colores, len(PALETA_COLORES)))]
+    for pagina, lineas in enumerate(lineas_por_pag):
+        for _ in range(highlights_por_pagina):
+            quads = _quads_highlight(rnd, lineas, alto_pagina)
+            xs, ys = quads[0::2], quads[1::2]
+            anotacion = Highlight(
+                rect=(min(xs), min(ys), max(xs), max(ys)),
+                quad_points=ArrayObject([FloatObject(q) for q in quads])
+            )
+            anotacion[NameObject("/C")] = ArrayObject([FloatObject(c) for c in rnd.choice(paleta)])
+            writer.add_annotation(page_number=pagina, annotation=anotacion)
+        if variar_geometria:
+            _variar_geometria(writer.pages[pagina], GEOMETRIAS_PAGINA[pagina % len(GEOMETRIAS_PAGINA)])
+
+    _agregar_outline(writer, paginas, profundidad_outline)
+    salida = io.BytesIO()
+    writer.write(salida)
+    return salida.getvalue()
+
+
+def agregar_argumentos_corpus(parser):
+    """Opciones de línea de comandos compartidas por los scripts que generan corpus"""
+    parser.add_argument("--paginas", type=int, default=20)
+    parser.add_argument("--highlights", type=int, default=10, help="Resaltados por página")
+    parser.add_argument("--colores", type=int, default=4)
+    parser.add_argument("--profundidad-outline", type=int, default=2)
+    parser.add_argument("--lineas", type=int, default=45, help="Líneas de texto por página")
+    parser.add_argument("--palabras", type=int, default=12, help="Palabras por línea")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--variar-geometria", action="store_true",
+                        help="Alternar páginas recortadas, desplazadas y giradas")
+
+
+def parametros_corpus(args):
+    """Parámetros de generar_pdf_sintetico a partir de los argumentos parseados"""
+    return {
+        'paginas': args.paginas,
+        'highlights_por_pagina': args.highlights,
+        'colores': args.colores,
+        'profundidad_outline': args.profundidad_outline,
+        'lineas_por_pagina': args.lineas,
+        'palabras_por_linea': args.palabras,
+        'semilla': args.semilla,
+        'variar_geometria': args.variar_geometria,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un PDF sintético con resaltados")
+    parser.add_argument("salida")
+    agregar_argumentos_corpus(parser)
+    args = parser.parse_args()
+    with open(args.salida, "wb") as archivo:
+        archivo.write(generar_pdf_sintetico(**parametros_corpus(args)))
+
+
+if __name__ == "__main__":
+    main()
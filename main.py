@@ -6,25 +6,47 @@ import streamlit as st
 
 # Configuración
 from app.config import PAGE_CONFIG
-from app.environment import show_environment_badge, is_prod
+from app.environment import (
+    show_environment_badge,
+    is_prod,
+    get_procesos_extraccion,
+    get_presupuesto_memoria_mb,
+    get_limite_paginas_escaneo,
+    exportar_a_disco
+)
 
 # Core - Lógica de negocio
-from app.core import escanear_colores_pdf, procesar_pdf, generar_preview_visual
+from app.core import (
+    escanear_colores_pdf,
+    generar_preview_ventana,
+    generar_preview_html,
+    hash_contenido,
+    cola_trabajos,
+    trabajo_procesar_pdf,
+    LectorMapeado,
+    presupuesto_memoria,
+    RegistroInstrumentacion
+)
 
 # UI - Componentes de interfaz
 from app.ui import (
     render_tab_home,
     render_tab_pricing,
     render_color_config,
+    render_muestras_colores,
     render_toc_config,
     render_global_settings,
     render_preview,
-    render_download_button
+    render_preview_html,
+    render_navegacion_preview,
+    render_download_button,
+    render_panel_rendimiento,
+    render_seguimiento_trabajo
 )
 
 # Auth - Autenticación
 from app.ui.auth_ui import render_login_page, render_user_header
-from app.database.auth import esta_autenticado, inicializar_estado_auth
+from app.database.auth import esta_autenticado, inicializar_estado_auth, obtener_usuario_actual, es_admin
 
 # ==========================================
 # CONFIGURACIÓN DE PÁGINA
@@ -37,6 +59,7 @@ st.set_page_config(**PAGE_CONFIG)
 # ==========================================
 
 show_environment_badge()
+presupuesto_memoria.ajustar_limite(get_presupuesto_memoria_mb())
 
 # ==========================================
 # ESTADO DE SESIÓN
@@ -48,6 +71,12 @@ if 'colores_detectados' not in st.session_state:
     st.session_state['colores_detectados'] = []
 if 'last_file_hash' not in st.session_state: 
     st.session_state['last_file_hash'] = 0
+if 'hash_por_archivo' not in st.session_state: 
+    st.session_state['hash_por_archivo'] = {}
+if 'resultados_trabajos' not in st.session_state:
+    st.session_state['resultados_trabajos'] = {}
+
+MAX_RESULTADOS_SESION = 3  # Resultados de trabajos que se conservan por sesión
 
 # ==========================================
 # VERIFICAR AUTENTICACIÓN
@@ -74,7 +103,9 @@ else:
         st.markdown("## ⚡ Panel de Extracción")
 
 
-        # --- PRIVACIDAD: No se guarda ningún archivo en disco, todo se procesa en memoria ---
+        # --- PRIVACIDAD: No se guarda ningún archivo con nombre en disco: si hay que extraerlo, el PDF se
+        # vuelca a un temporal anónimo (invisible en el sistema de archivos) que se borra al terminar.
+        # Solo la extracción en varios procesos usa una copia con nombre, borrada al terminar la extracción ---
         archivo_subido = st.file_uploader("Subí tu documento PDF", type=["pdf"])
 
         # Validación de archivo: tipo y tamaño
@@ -87,10 +118,30 @@ else:
             elif archivo_subido.size > MAX_MB * 1024 * 1024:
                 st.error(f"❌ El archivo excede el límite de {MAX_MB} MB.")
             else:
-                file_hash = archivo_subido.size
+                # Hash SHA-256 del contenido, calculado una sola vez por archivo subido
+                id_archivo = getattr(archivo_subido, 'file_id', None) or archivo_subido.name
+                if id_archivo not in st.session_state['hash_por_archivo']:
+                    st.session_state['hash_por_archivo'] = {id_archivo: hash_contenido(archivo_subido)}
+                file_hash = st.session_state['hash_por_archivo'][id_archivo]
+
                 if st.session_state['last_file_hash'] != file_hash:
                     with st.spinner("Escaneando colores y estructura..."):
-                        st.session_state['colores_detectados'] = escanear_colores_pdf(archivo_subido)
+                        # Los colores se muestran a medida que aparecen
+                        aviso_escaneo = st.empty()
+                        encontrados = []
+
+                        def mostrar_color(color):
+                            encontrados.append(color)
+                            render_muestras_colores(aviso_escaneo, encontrados)
+
+                        st.session_state['colores_detectados'] = escanear_colores_pdf(
+                            archivo_subido,
+                            st.session_state.get('motor_ext'),
+                            hash_pdf=file_hash,
+                            limite_paginas=get_limite_paginas_escaneo(),
+                            al_encontrar=mostrar_color
+                        )
+                        aviso_escaneo.empty()
                         st.session_state['last_file_hash'] = file_hash
 
                 colores = st.session_state['colores_detectados']
@@ -100,24 +151,127 @@ else:
                     # Renderizar componentes de configuración
                     config_final = render_color_config(colores)
                     config_toc = render_toc_config()
-                    usar_toc, separar_paginas, padding = render_global_settings()
+                    usar_toc, separar_paginas, padding, motor_extraccion, modo_preview = render_global_settings()
 
-                    # --- PROCESAR ---
+                    # --- PROCESAR: en segundo plano, sin bloquear la ejecución del script ---
                     if st.button("🚀 PROCESAR DOCUMENTO", type="primary", use_container_width=True):
                         config_total = {
                             'padding': padding,
                             'usar_toc': usar_toc,
                             'separar_paginas': separar_paginas,
+                            'motor_extraccion': motor_extraccion,
+                            'procesos': get_procesos_extraccion(),
+                            'exportar_disco': exportar_a_disco(),
+                            'usuario': getattr(obtener_usuario_actual(), 'id', None),
                             'mapa_colores': config_final,
                             'config_toc': config_toc
                         }
-                        with st.spinner("Generando documentos..."):
-                            word_buffer, lista_datos = procesar_pdf(archivo_subido, config_total)
-                            pdf_bytes = generar_preview_visual(lista_datos, config_final, config_toc)
-                        if lista_datos:
+                        trabajo_previo = st.session_state.pop('trabajo', None)
+                        if trabajo_previo:
+                            cola_trabajos.cancelar(trabajo_previo['id'])
+                        # El trabajo lee la subida sin copiarla (cursor propio) y la vuelca a un temporal
+                        # anónimo solo si no tiene el resultado ni la extracción en caché
+                        lector_subida = LectorMapeado(archivo_subido.getbuffer())
+                        # Mismo PDF + misma configuración = mismo resultado: el trabajo lo toma del caché
+                        st.session_state['trabajo'] = {
+                            'id': cola_trabajos.enviar(
+                                trabajo_procesar_pdf,
+                                lector_subida,
+                                config_total,
+                                file_hash,
+                                # Tiempos por etapa y página (memoria solo si un admin lo pidió)
+                                medir_memoria=st.session_state.get('medir_memoria', False),
+                                # La vista de la subida se suelta aunque el trabajo se cancele antes de correr
+                                al_finalizar=lector_subida.close
+                            ),
+                            'hash': file_hash,
+                            'config_colores': config_final,
+                            'config_toc': config_toc
+                        }
+
+                    # --- SEGUIMIENTO DEL TRABAJO ---
+                    trabajo = st.session_state.get('trabajo')
+                    if trabajo and trabajo['hash'] != file_hash:
+                        # Se subió otro archivo: el trabajo anterior ya no sirve
+                        cola_trabajos.cancelar(trabajo['id'])
+                        del st.session_state['trabajo']
+                    elif trabajo:
+                        final = cola_trabajos.retirar(trabajo['id'])
+                        if final is None and cola_trabajos.estado(trabajo['id']) is not None:
+                            render_seguimiento_trabajo(trabajo['id'])
+                        else:
+                            del st.session_state['trabajo']
+                            if final is None:
+                                st.warning("El procesamiento se perdió (p. ej. por un reinicio del servidor). Volvé a procesar el documento.")
+                            elif final['estado'] == "error":
+                                st.error(f"❌ No se pudo procesar el documento: {final['error']}")
+                            elif final['estado'] == "cancelado":
+                                st.info("Procesamiento cancelado.")
+                            else:
+                                # Los resultados quedan en la sesión por id de trabajo (solo los últimos)
+                                resultados = st.session_state['resultados_trabajos']
+                                resultados[trabajo['id']] = {
+                                    'clave': final['resultado']['clave'],
+                                    'hash': trabajo['hash'],
+                                    'word_bytes': final['resultado']['word_bytes'],
+                                    'lista_datos': final['resultado']['lista_datos'],
+                                    'config_colores': trabajo['config_colores'],
+                                    'config_toc': trabajo['config_toc'],
+                                    'metricas': final['resultado']['metricas']
+                                }
+                                while len(resultados) > MAX_RESULTADOS_SESION:
+                                    resultados.pop(next(iter(resultados)))
+
+                                # El resultado actual se usa para navegar la vista previa entre reruns
+                                st.session_state['resultado'] = resultados[trabajo['id']]
+                                st.session_state['inicios_preview'] = [0]
+                                st.session_state['ventana_preview'] = 0
+
+                    resultado = st.session_state.get('resultado')
+                    if resultado and resultado['hash'] == file_hash and 'trabajo' not in st.session_state:
+                        if resultado['lista_datos']:
                             st.success("¡Extracción completada con éxito!")
-                            render_download_button(word_buffer)
-                            render_preview(pdf_bytes)
+                            render_download_button(resultado['word_bytes'])
+
+                            registro_preview = RegistroInstrumentacion(memoria=st.session_state.get('medir_memoria', False))
+                            with registro_preview.activo():
+                                # --- VISTA PREVIA HTML: sin generar PDF ni cargar fuentes ---
+                                if modo_preview == "html":
+                                    html_preview = generar_preview_html(
+                                        resultado['lista_datos'],
+                                        resultado['config_colores'],
+                                        resultado['config_toc'],
+                                        clave_cache=resultado['clave']
+                                    )
+                                    render_preview_html(html_preview)
+                                else:
+                                    # --- VISTA PREVIA PAGINADA: cada bloque se genera recién cuando se pide ---
+                                    inicios = st.session_state['inicios_preview']
+                                    num_ventana = st.session_state['ventana_preview']
+                                    with st.spinner("Generando vista previa..."):
+                                        pdf_bytes, siguiente = generar_preview_ventana(
+                                            resultado['lista_datos'],
+                                            resultado['config_colores'],
+                                            resultado['config_toc'],
+                                            inicio=inicios[num_ventana],
+                                            clave_cache=resultado['clave'],
+                                            al_avisar=st.warning
+                                        )
+                                    if siguiente is not None and len(inicios) == num_ventana + 1:
+                                        inicios.append(siguiente)
+
+                                    render_preview(pdf_bytes)
+                                    nueva_ventana = render_navegacion_preview(num_ventana, siguiente is not None)
+                                    if nueva_ventana != num_ventana:
+                                        st.session_state['ventana_preview'] = nueva_ventana
+                                        st.rerun()
+
+                            # --- PANEL DE RENDIMIENTO: solo administradores ---
+                            if es_admin():
+                                render_panel_rendimiento({
+                                    'Procesamiento': resultado.get('metricas'),
+                                    'Vista previa': registro_preview.como_dict()
+                                })
                         else:
                             st.warning("No se ha extraído contenido. Verifica que no hayas marcado todo como 'Ignorar'.")
                 else:
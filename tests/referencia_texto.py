@@ -0,0 +1,65 @@
+# ==========================================
+# RECONSTRUCCIÓN DE TEXTO ORIGINAL (REFERENCIA)
+# ==========================================
+#
+# La implementación de reconstruir_texto anterior al orden de lectura por
+# página: dicts ordenados por top y cada línea por x0, en cada highlight.
+# La usan tests/test_reconstruir_texto.py (mismo texto que la actual) y
+# benchmarks/bench_reconstruir_texto.py (tiempos).
+
+import re
+import unicodedata
+
+
+def reconstruir_texto_original(valid_chars):
+    """Implementación anterior, conservada como referencia de resultado y de tiempo"""
+    if not valid_chars:
+        return ""
+    seen = {}
+    for c in valid_chars:
+        key = (round(c['x0'], 1), round(c['top'], 1))
+        if key not in seen or (not seen[key]['text'].strip() and c['text'].strip()):
+            seen[key] = c
+    valid_chars = list(seen.values())
+    if not valid_chars:
+        return ""
+    alturas = [c['bottom'] - c['top'] for c in valid_chars if c['bottom'] - c['top'] > 0]
+    altura_promedio = sum(alturas) / len(alturas) if alturas else 10
+    tolerancia_linea = altura_promedio * 0.5
+    chars_por_y = sorted(valid_chars, key=lambda c: c['top'])
+    lineas = []
+    linea_actual = [chars_por_y[0]]
+    y_base = chars_por_y[0]['top']
+    for char in chars_por_y[1:]:
+        if abs(char['top'] - y_base) <= tolerancia_linea:
+            linea_actual.append(char)
+        else:
+            lineas.append(linea_actual)
+            linea_actual = [char]
+            y_base = char['top']
+    if linea_actual:
+        lineas.append(linea_actual)
+
+    def y_promedio_linea(linea):
+        return sum(c['top'] for c in linea) / len(linea)
+
+    lineas.sort(key=y_promedio_linea)
+    partes_finales = []
+    for linea in lineas:
+        linea_ordenada = sorted(linea, key=lambda c: c['x0'])
+        partes_linea = []
+        ultimo_x1 = None
+        for char in linea_ordenada:
+            if ultimo_x1 is not None:
+                gap = char['x0'] - ultimo_x1
+                char_width = max(char['x1'] - char['x0'], 1)
+                if gap > char_width * 0.3:
+                    partes_linea.append(' ')
+            partes_linea.append(char['text'])
+            ultimo_x1 = char['x1']
+        texto_linea = ''.join(partes_linea).strip()
+        if texto_linea:
+            partes_finales.append(texto_linea)
+    texto = ' '.join(partes_finales)
+    texto = unicodedata.normalize('NFC', texto)
+    return re.sub(r'\s+', ' ', texto).strip()
@@ -0,0 +1,219 @@
+# ==========================================
+# AUTH: VALIDACIÓN LOCAL, REFRESH-AHEAD Y LIMITADOR DE LOGIN
+# ==========================================
+#
+# Con un cliente de Supabase de prueba (sin red) y st.session_state como un
+# dict: los reruns no deben consultar a Supabase mientras el token esté
+# vigente, y la sesión se renueva antes de vencer con el refresh token más
+# reciente del cliente. Los bloqueos por intentos fallidos van por email y
+# cliente (y por cliente solo), con st.context simulado.
+
+import itertools
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.database import auth, supabase_client
+
+
+class AuthFalso:
+    """GoTrue de prueba: registra cada llamada y, como Supabase, revoca la
+    sesión si se reusa un refresh token ya rotado"""
+
+    def __init__(self, duracion_s):
+        self.duracion_s = duracion_s
+        self.llamadas = []
+        self.sesion = None
+        self.usados = set()
+        self.emitidos = itertools.count(1)
+        self.usuario = SimpleNamespace(id="u1", email_confirmed_at="2024-01-01")
+
+    def _nueva_sesion(self):
+        n = next(self.emitidos)
+        self.sesion = SimpleNamespace(
+            access_token=f"access-{n}", refresh_token=f"refresh-{n}",
+            expires_at=int(time.time() + self.duracion_s), user=self.usuario
+        )
+        return SimpleNamespace(session=self.sesion, user=self.usuario)
+
+    def sign_in_with_password(self, credenciales):
+        self.llamadas.append("sign_in_with_password")
+        if credenciales["password"] != "clave":
+            raise RuntimeError("Invalid login credentials")
+        return self._nueva_sesion()
+
+    def get_session(self):
+        self.llamadas.append("get_session")
+        return self.sesion
+
+    def refresh_session(self, refresh_token=None):
+        self.llamadas.append("refresh_session")
+        refresh_token = refresh_token or self.sesion.refresh_token
+        if refresh_token in self.usados:
+            self.sesion = None
+            raise RuntimeError("Invalid Refresh Token: Already Used")
+        self.usados.add(refresh_token)
+        return self._nueva_sesion()
+
+    def rotar_por_su_cuenta(self):
+        """Renovación hecha por el cliente sin pasar por la app (como el auto-refresh de GoTrue)"""
+        self.refresh_session()
+        self.llamadas.clear()
+
+
+@pytest.fixture
+def estado(monkeypatch):
+    estado = {}
+    monkeypatch.setattr(auth.st, "session_state", estado)
+    return estado
+
+
+def preparar(monkeypatch, duracion_s):
+    cliente = SimpleNamespace(auth=AuthFalso(duracion_s))
+    monkeypatch.setattr(auth, "get_supabase_client", lambda: cliente)
+    monkeypatch.setattr(auth, "ensure_profile", lambda *args: None)
+    return cliente.auth
+
+
+def test_reruns_sin_consultas_a_supabase(monkeypatch, estado):
+    gotrue = preparar(monkeypatch, duracion_s=3600)
+    auth.inicializar_estado_auth()
+    assert auth.iniciar_sesion("a@b.com", "clave")["success"]
+    gotrue.llamadas.clear()
+
+    for _ in range(50):
+        auth.inicializar_estado_auth()
+
+    assert gotrue.llamadas == []
+    assert auth.esta_autenticado()
+
+
+def test_refresca_antes_de_vencer(monkeypatch, estado):
+    gotrue = preparar(monkeypatch, duracion_s=auth.MARGEN_REFRESCO_S - 10)
+    auth.iniciar_sesion("a@b.com", "clave")
+    gotrue.duracion_s = 3600
+    gotrue.llamadas.clear()
+
+    auth.inicializar_estado_auth()
+    assert gotrue.llamadas.count("refresh_session") == 1
+    assert estado['session'].access_token == "access-2"
+
+    gotrue.llamadas.clear()
+    for _ in range(10):
+        auth.inicializar_estado_auth()
+    assert gotrue.llamadas == []
+
+
+def test_refresca_con_el_token_rotado_por_el_cliente(monkeypatch, estado):
+    gotrue = preparar(monkeypatch, duracion_s=auth.MARGEN_REFRESCO_S - 10)
+    auth.iniciar_sesion("a@b.com", "clave")
+    gotrue.rotar_por_su_cuenta()  # El token de session_state queda ya usado
+
+    auth.inicializar_estado_auth()
+
+    assert auth.esta_autenticado()
+    assert estado['session'] is gotrue.sesion
+    assert estado['session'].refresh_token == "refresh-3"
+
+
+def test_refresco_fallido_conserva_la_sesion_vigente(monkeypatch, estado):
+    gotrue = preparar(monkeypatch, duracion_s=auth.MARGEN_REFRESCO_S - 10)
+    auth.iniciar_sesion("a@b.com", "clave")
+
+    def sin_red(refresh_token=None):
+        raise RuntimeError("Sin conexión")
+
+    monkeypatch.setattr(gotrue, "refresh_session", sin_red)
+
+    auth.inicializar_estado_auth()
+    assert auth.esta_autenticado()
+    # Se reintenta más tarde, no en cada rerun
+    assert estado['sesion_valida_hasta'] > time.time()
+
+    estado['session'].expires_at = time.time() - 1
+    estado['sesion_valida_hasta'] = 0.0
+    auth.inicializar_estado_auth()
+    assert not auth.esta_autenticado()
+
+
+@pytest.fixture
+def contexto(monkeypatch):
+    """st.context simulado y limitadores vacíos; devuelve una función para cambiar de cliente"""
+    almacen = auth.AlmacenLimitadorMemoria()
+    monkeypatch.setattr(auth.limitador_email_cliente, "almacen", almacen)
+    monkeypatch.setattr(auth.limitador_email, "almacen", almacen)
+    monkeypatch.setattr(auth.limitador_cliente, "almacen", almacen)
+    monkeypatch.setattr(auth, "get_proxies_confiables", lambda: 0)
+
+    def usar(ip, headers=None):
+        monkeypatch.setattr(auth.st, "context", SimpleNamespace(ip_address=ip, headers=headers or {}))
+
+    usar("10.0.0.1")
+    return usar
+
+
+def test_bloquear_un_email_no_lo_bloquea_desde_otro_cliente(monkeypatch, estado, contexto):
+    preparar(monkeypatch, duracion_s=3600)
+    contexto("6.6.6.6")
+    for _ in range(auth.MAX_INTENTOS_EMAIL):
+        auth.iniciar_sesion("victima@b.com", "mala")
+    assert not auth.iniciar_sesion("victima@b.com", "clave")["success"]
+
+    contexto("10.0.0.1")
+    assert auth.iniciar_sesion("victima@b.com", "clave")["success"]
+
+
+def test_password_spraying_bloquea_al_cliente(monkeypatch, estado, contexto):
+    preparar(monkeypatch, duracion_s=3600)
+    contexto("6.6.6.6")
+    for i in range(auth.MAX_INTENTOS_CLIENTE):
+        auth.iniciar_sesion(f"u{i}@b.com", "mala")
+
+    assert not auth.iniciar_sesion("otro@b.com", "clave")["success"]
+    contexto("10.0.0.1")
+    assert auth.iniciar_sesion("otro@b.com", "clave")["success"]
+
+
+def test_sin_cliente_conocido_no_se_comparte_un_bloqueo(monkeypatch, estado, contexto):
+    preparar(monkeypatch, duracion_s=3600)
+    contexto(None)
+    for _ in range(auth.MAX_INTENTOS_EMAIL):
+        auth.iniciar_sesion("victima@b.com", "mala")
+    # Sin cliente cuenta el umbral por email solo, más alto
+    assert auth.iniciar_sesion("victima@b.com", "clave")["success"]
+
+    for _ in range(auth.MAX_INTENTOS_EMAIL_SIN_CLIENTE):
+        auth.iniciar_sesion("victima@b.com", "mala")
+    assert not auth.iniciar_sesion("victima@b.com", "clave")["success"]
+    # El bloqueo sin cliente no alcanza al usuario desde su propio IP
+    contexto("10.0.0.1")
+    assert auth.iniciar_sesion("victima@b.com", "clave")["success"]
+
+
+def test_x_forwarded_for_solo_detras_de_proxies_configurados(monkeypatch, contexto):
+    contexto("10.0.0.1", {"X-Forwarded-For": "1.2.3.4, 5.6.7.8"})
+    assert auth._id_cliente() == "10.0.0.1"
+
+    contexto(None, {"X-Forwarded-For": "1.2.3.4"})
+    assert auth._id_cliente() is None
+
+    # Con un proxy propio, la IP es la que agregó ese proxy (la última);
+    # lo anterior lo pudo escribir el cliente
+    monkeypatch.setattr(auth, "get_proxies_confiables", lambda: 1)
+    contexto("10.0.0.1", {"X-Forwarded-For": "1.2.3.4, 5.6.7.8"})
+    assert auth._id_cliente() == "5.6.7.8"
+    monkeypatch.setattr(auth, "get_proxies_confiables", lambda: 2)
+    assert auth._id_cliente() == "1.2.3.4"
+
+
+def test_cerrar_sesion_solo_revoca_esta_sesion(estado):
+    cierres = []
+    cliente = SimpleNamespace(auth=SimpleNamespace(sign_out=lambda opciones=None: cierres.append(opciones)))
+    estado[supabase_client.CLAVE_CLIENTE_SESION] = cliente
+
+    auth.cerrar_sesion()
+
+    # Scope local: no cierra las sesiones del usuario en otros dispositivos
+    assert cierres == [{"scope": "local"}]
+    assert supabase_client.CLAVE_CLIENTE_SESION not in estado
@@ -0,0 +1,13 @@
+# ==========================================
+# AJUSTES DE AMBIENTE
+# ==========================================
+
+import pytest
+
+from app import environment
+
+
+@pytest.mark.parametrize("valor, esperado", [(None, None), ("0", None), ("", None), ("abc", None), ("-3", None), ("40", 40)])
+def test_limite_paginas_escaneo(monkeypatch, valor, esperado):
+    monkeypatch.setattr(environment, "_get_secret", lambda clave, default=None: valor if clave == "LIMITE_PAGINAS_ESCANEO" else default)
+    assert environment.get_limite_paginas_escaneo() == esperado
@@ -0,0 +1,35 @@
+# ==========================================
+# EXPORTACIÓN DE DOCX A DISCO
+# ==========================================
+#
+# Un nombre por usuario y resultado (reexportar pisa el archivo) y, por
+# usuario, solo las exportaciones más recientes.
+
+import os
+
+from app.core import word_generator
+
+
+def exportar(carpeta, datos, usuario, clave=None):
+    ruta = word_generator.exportar_docx_async(datos, usuario, clave, carpeta=str(carpeta))
+    word_generator._cola_exportacion.join()
+    return ruta
+
+
+def test_mismo_resultado_pisa_el_archivo(tmp_path):
+    primera = exportar(tmp_path, b"uno", "u1", ("resultado", "h", ()))
+    segunda = exportar(tmp_path, b"dos", "u1", ("resultado", "h", ()))
+
+    assert primera == segunda
+    assert os.listdir(tmp_path) == [os.path.basename(primera)]
+    with open(primera, "rb") as f:
+        assert f.read() == b"dos"
+
+
+def test_conserva_las_mas_recientes_por_usuario(tmp_path, monkeypatch):
+    monkeypatch.setattr(word_generator, "MAX_EXPORTACIONES_POR_USUARIO", 3)
+    # Otro usuario cuyo nombre empieza igual: sus archivos no se tocan
+    ajena = exportar(tmp_path, b"ajeno", "u1_b")
+    rutas = [exportar(tmp_path, f"doc {n}".encode(), "u1") for n in range(5)]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(r) for r in rutas[-3:] + [ajena])
@@ -0,0 +1,81 @@
+# ==========================================
+# PARIDAD DEL ÍNDICE ESPACIAL CON EL RECORRIDO LINEAL
+# ==========================================
+#
+# extraer_caracteres_quads / extraer_caracteres_rect con el índice de la página
+# deben devolver exactamente lo mismo que el recorrido de todos los caracteres,
+# tanto con la tabla NumPy como con el índice en Python puro (np is None).
+
+import io
+import random
+
+import pytest
+
+from app.core import indice_espacial
+from app.core.motores_pdf import MotorPypdf
+from app.core.pdf_extractor import extraer_caracteres_quads, extraer_caracteres_rect, procesar_highlight
+from benchmarks.corpus import generar_pdf_sintetico
+
+
+@pytest.fixture(params=["numpy", "python"])
+def crear_indice(request, monkeypatch):
+    if request.param == "numpy":
+        if indice_espacial.np is None:
+            pytest.skip("NumPy no instalado")
+    else:
+        monkeypatch.setattr(indice_espacial, "np", None)
+    return indice_espacial.crear_indice_pagina
+
+
+@pytest.fixture(scope="module")
+def paginas():
+    """(alto, chars, highlights) de cada página de un corpus sintético"""
+    pdf_bytes = generar_pdf_sintetico(paginas=3, highlights_por_pagina=12, semilla=11)
+    motor = MotorPypdf(io.BytesIO(pdf_bytes))
+    try:
+        return [motor.caracteres_pagina(i) + (motor.highlights_pagina(i),) for i in range(motor.total_paginas)]
+    finally:
+        motor.cerrar()
+
+
+def test_indice_de_la_clase_esperada(crear_indice):
+    indice = crear_indice([{'text': "a", 'x0': 0, 'x1': 1, 'top': 0, 'bottom': 1}])
+    esperado = indice_espacial.IndiceEspacialPagina if indice_espacial.np is None else indice_espacial.TablaCaracteresPagina
+    assert type(indice) is esperado
+
+
+def test_paridad_en_el_corpus(crear_indice, paginas):
+    for alto, chars, highlights in paginas:
+        indice = crear_indice(chars)
+        for datos in highlights:
+            quads = datos["/QuadPoints"]
+            assert extraer_caracteres_quads(quads, alto, chars, indice) == extraer_caracteres_quads(quads, alto, chars)
+            assert extraer_caracteres_rect(datos, alto, chars, indice) == extraer_caracteres_rect(datos, alto, chars)
+            assert procesar_highlight(datos, alto, chars, indice) == procesar_highlight(datos, alto, chars)
+
+
+def test_paridad_en_bordes_y_superposiciones(crear_indice):
+    """Puntos medios sobre los bordes de los rectángulos, caracteres repetidos
+    en la misma posición y quads que se superponen"""
+    rnd = random.Random(3)
+    chars = []
+    for _ in range(400):
+        x0 = rnd.randrange(0, 40) * 2.5
+        top = rnd.randrange(0, 20) * 5.0
+        chars.append({'text': rnd.choice("ab "), 'x0': x0, 'x1': x0 + 5, 'top': top, 'bottom': top + 10})
+    chars += [dict(c) for c in chars[:50]]
+    alto = 200.0
+    indice = crear_indice(chars)
+
+    for _ in range(200):
+        quads = []
+        for _ in range(rnd.randint(1, 3)):
+            left, right = sorted(rnd.randrange(0, 44) * 2.5 for _ in range(2))
+            y_inf, y_sup = sorted(alto - rnd.randrange(0, 24) * 5.0 for _ in range(2))
+            quads += [left, y_sup, right, y_sup, left, y_inf, right, y_inf]
+        xs, ys = quads[0::2], quads[1::2]
+        datos = {"/Rect": [min(xs), min(ys), max(xs), max(ys)], "/QuadPoints": quads}
+
+        assert extraer_caracteres_quads(quads, alto, chars, indice) == extraer_caracteres_quads(quads, alto, chars)
+        assert extraer_caracteres_rect(datos, alto, chars, indice) == extraer_caracteres_rect(datos, alto, chars)
+        assert procesar_highlight(datos, alto, chars, indice) == procesar_highlight(datos, alto, chars)
@@ -0,0 +1,53 @@
+# ==========================================
+# INSTRUMENTACIÓN: MEMORIA CON REGISTROS CONCURRENTES
+# ==========================================
+#
+# tracemalloc es global al proceso: mientras un registro mide memoria, otro
+# que también la pida corre sin ella y no toca el pico del primero.
+
+import threading
+import tracemalloc
+
+from app.core.instrumentacion import RegistroInstrumentacion, span
+
+
+def test_un_solo_registro_mide_memoria_a_la_vez():
+    primero = RegistroInstrumentacion(memoria=True)
+    segundo = RegistroInstrumentacion(memoria=True)
+    dentro = threading.Event()
+    terminado = threading.Event()
+
+    def concurrente():
+        dentro.wait(10)
+        with segundo.activo():
+            with span("otro"):
+                pass
+        terminado.set()
+
+    hilo = threading.Thread(target=concurrente)
+    hilo.start()
+    with primero.activo():
+        with span("grande"):
+            datos = bytearray(8 * 1024 * 1024)
+            del datos  # Solo queda en el pico
+            dentro.set()
+            assert terminado.wait(10)
+    hilo.join()
+
+    # El segundo no reinició el pico: el primero sigue viendo los 8 MB
+    assert primero.como_dict()['etapas']['grande']['pico_memoria_mb'] >= 8
+    assert not primero.memoria_no_disponible
+    assert segundo.memoria_no_disponible
+    assert 'pico_memoria_mb' not in segundo.como_dict()['etapas']['otro']
+    assert not tracemalloc.is_tracing()
+
+
+def test_memoria_disponible_al_terminar_el_otro():
+    with RegistroInstrumentacion(memoria=True).activo():
+        pass
+    registro = RegistroInstrumentacion(memoria=True)
+    with registro.activo():
+        with span("etapa"):
+            pass
+    assert not registro.memoria_no_disponible
+    assert 'pico_memoria_mb' in registro.como_dict()['etapas']['etapa']
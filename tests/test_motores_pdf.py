@@ -0,0 +1,61 @@
+# ==========================================
+# PARIDAD ENTRE MOTORES DE EXTRACCIÓN
+# ==========================================
+#
+# Los dos motores deben extraer el mismo texto de cada resaltado, también en
+# páginas recortadas, desplazadas del origen o giradas. La referencia es el
+# mismo corpus sin variar la geometría: el contenido no se mueve en el espacio
+# de usuario, así que el resultado tiene que ser idéntico.
+
+import io
+
+import pytest
+
+from app.config import DEFAULT_COLOR_OPTIONS, DEFAULT_TOC_CONFIG
+from app.core import escanear_colores_pdf, procesar_pdf
+from app.core.motores_pdf import MOTOR_PYMUPDF, MOTOR_PYPDF, pymupdf
+from benchmarks.corpus import GEOMETRIAS_PAGINA, generar_pdf_sintetico
+
+
+MOTORES = [
+    MOTOR_PYPDF,
+    pytest.param(MOTOR_PYMUPDF, marks=pytest.mark.skipif(pymupdf is None, reason="PyMuPDF no instalado")),
+]
+
+PARAMETROS_CORPUS = {'paginas': len(GEOMETRIAS_PAGINA), 'highlights_por_pagina': 6, 'lineas_por_pagina': 20, 'semilla': 7}
+
+
+def extraer(pdf_bytes, motor):
+    colores = escanear_colores_pdf(io.BytesIO(pdf_bytes), motor)
+    config = {
+        'padding': 1,
+        'usar_toc': True,
+        'separar_paginas': True,
+        'motor_extraccion': motor,
+        'mapa_colores': {color: dict(DEFAULT_COLOR_OPTIONS, accion="Texto Normal") for color in colores},
+        'config_toc': dict(DEFAULT_TOC_CONFIG),
+    }
+    _, lista_datos = procesar_pdf(io.BytesIO(pdf_bytes), config)
+    return lista_datos
+
+
+@pytest.fixture(scope="module")
+def referencia():
+    return extraer(generar_pdf_sintetico(**PARAMETROS_CORPUS), MOTOR_PYPDF)
+
+
+def test_referencia_tiene_todos_los_resaltados(referencia):
+    textos = [datos for datos in referencia if datos[0] == "Texto Normal"]
+    assert len(textos) == PARAMETROS_CORPUS['paginas'] * PARAMETROS_CORPUS['highlights_por_pagina']
+    assert all(texto.strip() for _, texto, _ in textos)
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_motor_igual_a_referencia(motor, referencia):
+    assert extraer(generar_pdf_sintetico(**PARAMETROS_CORPUS), motor) == referencia
+
+
+@pytest.mark.parametrize("motor", MOTORES)
+def test_geometria_variada_igual_a_referencia(motor, referencia):
+    pdf_bytes = generar_pdf_sintetico(**PARAMETROS_CORPUS, variar_geometria=True)
+    assert extraer(pdf_bytes, motor) == referencia
@@ -0,0 +1,87 @@
+# ==========================================
+# EXTRACCIÓN EN PARALELO
+# ==========================================
+#
+# Los workers arrancan por forkserver/spawn (no heredan nada del proceso
+# padre) y mapean el PDF desde una ruta: la del archivo original o la de una
+# copia con nombre que solo existe durante la extracción en paralelo. El
+# resultado es el mismo que el serial.
+
+import glob
+import io
+import os
+import tempfile
+
+import pytest
+
+from app.core import PDFMapeado, escanear_colores_pdf
+from app.core import pdf_extractor
+from benchmarks.corpus import generar_pdf_sintetico
+
+
+@pytest.fixture(scope="module")
+def pdf_bytes():
+    return generar_pdf_sintetico(paginas=6, highlights_por_pagina=5, semilla=5)
+
+
+@pytest.fixture
+def copias(monkeypatch):
+    """Rutas de las copias con nombre que crea la extracción en paralelo"""
+    creadas = []
+    original = pdf_extractor._copia_con_nombre
+
+    def registrar(archivo_pdf):
+        creadas.append(original(archivo_pdf))
+        return creadas[-1]
+
+    monkeypatch.setattr(pdf_extractor, "_copia_con_nombre", registrar)
+    return creadas
+
+
+def extraer(archivo, pdf_bytes, procesos):
+    colores = escanear_colores_pdf(io.BytesIO(pdf_bytes))
+    return pdf_extractor._extraer_documento(archivo, colores, {'procesos': procesos})
+
+
+def test_workers_sin_fork():
+    assert pdf_extractor._contexto_workers.get_start_method() in ("forkserver", "spawn")
+
+
+def test_el_volcado_es_anonimo(pdf_bytes):
+    antes = set(glob.glob(os.path.join(tempfile.gettempdir(), "*")))
+    with PDFMapeado(io.BytesIO(pdf_bytes)) as pdf:
+        assert pdf.ruta is None and pdf.abrir().ruta is None
+        assert set(glob.glob(os.path.join(tempfile.gettempdir(), "*"))) == antes
+
+
+def test_paralelo_desde_el_temporal_igual_al_serial(pdf_bytes, copias):
+    serial = extraer(io.BytesIO(pdf_bytes), pdf_bytes, 1)
+    assert copias == []  # Serial: ninguna copia con nombre
+
+    with PDFMapeado(io.BytesIO(pdf_bytes)) as pdf:
+        paralelo = extraer(pdf.abrir(), pdf_bytes, 2)
+
+    assert paralelo == serial
+    assert serial['registros']
+    assert len(copias) == 1 and not os.path.exists(copias[0])
+
+
+def test_paralelo_desde_un_archivo_usa_su_ruta(pdf_bytes, copias, tmp_path):
+    ruta = tmp_path / "doc.pdf"
+    ruta.write_bytes(pdf_bytes)
+    with PDFMapeado(ruta) as pdf:
+        paralelo = extraer(pdf.abrir(), pdf_bytes, 2)
+
+    assert paralelo == extraer(io.BytesIO(pdf_bytes), pdf_bytes, 1)
+    assert copias == []
+
+
+def test_la_copia_se_borra_si_la_extraccion_falla(pdf_bytes, copias):
+    def cancelar(fraccion):
+        if fraccion > 0:
+            raise RuntimeError("cancelado")
+
+    colores = escanear_colores_pdf(io.BytesIO(pdf_bytes))
+    with pytest.raises(RuntimeError):
+        pdf_extractor._extraer_documento(io.BytesIO(pdf_bytes), colores, {'procesos': 2}, cancelar)
+    assert len(copias) == 1 and not os.path.exists(copias[0])
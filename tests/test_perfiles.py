@@ -0,0 +1,98 @@
+# ==========================================
+# SINCRONIZACIÓN DE PERFILES EN SEGUNDO PLANO
+# ==========================================
+#
+# Con un cliente de Supabase de prueba que registra cada upsert y el token
+# con que se envió. Los lotes se envían a mano (enviar_pendientes): el hilo de
+# fondo queda con un intervalo tan largo que no interviene.
+
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.perfiles import SincronizadorPerfiles
+
+
+class ClienteFalso:
+    def __init__(self):
+        self.token = None
+        self.upserts = []
+        self.fallar = set()
+        self.postgrest = SimpleNamespace(auth=self._auth)
+
+    def _auth(self, token):
+        self.token = token
+
+    def table(self, nombre):
+        return ConsultaFalsa(self, nombre)
+
+
+class ConsultaFalsa:
+    def __init__(self, cliente, tabla):
+        self.cliente = cliente
+        self.tabla = tabla
+        self.fila = None
+
+    def upsert(self, fila, ignore_duplicates=False):
+        assert ignore_duplicates  # Nunca pisa un perfil existente
+        self.fila = fila
+        return self
+
+    def execute(self):
+        if self.fila['id'] in self.cliente.fallar:
+            raise RuntimeError("relation \"profiles\" does not exist")
+        self.cliente.upserts.append((self.tabla, self.fila['id'], self.cliente.token))
+
+
+@pytest.fixture
+def cliente():
+    return ClienteFalso()
+
+
+@pytest.fixture
+def sincronizador(cliente):
+    return SincronizadorPerfiles(lambda: cliente, intervalo_s=3600, tamano_lote=100)
+
+
+def test_asegurar_no_hace_io(cliente, sincronizador):
+    sincronizador.asegurar("u1", "token-u1")
+    assert cliente.upserts == [] and cliente.token is None
+
+
+def test_un_upsert_por_usuario_con_su_token(cliente, sincronizador):
+    sincronizador.asegurar("u1", "token-u1")
+    sincronizador.asegurar("u2", "token-u2")
+
+    assert sincronizador.enviar_pendientes() == 2
+    assert cliente.upserts == [("profiles", "u1", "token-u1"), ("profiles", "u2", "token-u2")]
+
+
+def test_ids_repetidos_se_envian_una_vez(cliente, sincronizador):
+    sincronizador.asegurar("u1", "token-viejo")
+    sincronizador.asegurar("u1", "token-nuevo")
+
+    sincronizador.enviar_pendientes()
+    assert cliente.upserts == [("profiles", "u1", "token-nuevo")]
+
+
+def test_conocidos_no_se_encolan(cliente, sincronizador):
+    sincronizador.marcar_conocido("u1")
+    sincronizador.asegurar("u1", "token-u1")
+    sincronizador.asegurar("u2", "token-u2")
+    sincronizador.enviar_pendientes()
+    # u2 quedó asegurado: un nuevo login no vuelve a enviarlo
+    sincronizador.asegurar("u2", "token-u2")
+
+    assert sincronizador.enviar_pendientes() == 0
+    assert cliente.upserts == [("profiles", "u2", "token-u2")]
+
+
+def test_upsert_fallido_se_reintenta_en_el_proximo_login(cliente, sincronizador):
+    cliente.fallar.add("u1")
+    sincronizador.asegurar("u1", "token-1")
+    assert sincronizador.enviar_pendientes() == 0
+
+    cliente.fallar.clear()
+    sincronizador.asegurar("u1", "token-2")
+    assert sincronizador.enviar_pendientes() == 1
+    assert cliente.upserts == [("profiles", "u1", "token-2")]
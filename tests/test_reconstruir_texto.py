@@ -0,0 +1,67 @@
+# ==========================================
+# RECONSTRUCCIÓN DE TEXTO: MISMO TEXTO QUE LA ORIGINAL
+# ==========================================
+#
+# Para cada highlight del corpus sintético, el texto armado con el orden de
+# lectura por página (reconstruir_texto_indices) debe ser idéntico al de la
+# implementación original (tests/referencia_texto.py), que ordena los
+# caracteres de cada highlight por separado.
+
+import io
+import random
+
+import pytest
+
+from app.core.indice_espacial import crear_indice_pagina
+from app.core.motores_pdf import MOTOR_PYMUPDF, MOTOR_PYPDF, abrir_motor
+from app.core.pdf_extractor import reconstruir_texto_indices, seleccionar_indices
+from benchmarks.bench_reconstruir_texto import highlights_sinteticos, pagina_sintetica
+from benchmarks.corpus import generar_pdf_sintetico
+from tests.referencia_texto import reconstruir_texto_original
+
+
+def paginas_corpus(motor_extraccion, **parametros):
+    """(alto, chars, highlights) de cada página con highlights del PDF sintético"""
+    motor = abrir_motor(io.BytesIO(generar_pdf_sintetico(**parametros)), motor_extraccion)
+    try:
+        paginas = []
+        for i in range(motor.total_paginas):
+            highlights = [h for h in motor.highlights_pagina(i) if "/Rect" in h]
+            if highlights:
+                alto, chars = motor.caracteres_pagina(i)
+                paginas.append((alto, list(chars), highlights))
+        return paginas
+    finally:
+        motor.cerrar()
+
+
+def textos(alto, chars, highlights):
+    """(originales, actuales) para los highlights de una página"""
+    indice = crear_indice_pagina(chars)
+    selecciones = [seleccionar_indices(datos, alto, indice) for datos in highlights]
+    originales = [reconstruir_texto_original([chars[i] for i in sel]) for sel in selecciones]
+    orden = indice.orden_lectura(selecciones)
+    actuales = [reconstruir_texto_indices(sel, orden) for sel in orden.selecciones]
+    return originales, actuales
+
+
+@pytest.mark.parametrize("motor_extraccion", [MOTOR_PYPDF, MOTOR_PYMUPDF])
+@pytest.mark.parametrize("variar_geometria", [False, True])
+def test_mismo_texto_en_el_corpus(motor_extraccion, variar_geometria):
+    paginas = paginas_corpus(motor_extraccion, paginas=9, highlights_por_pagina=15, semilla=4,
+                             variar_geometria=variar_geometria)
+    total = 0
+    for alto, chars, highlights in paginas:
+        originales, actuales = textos(alto, chars, highlights)
+        assert actuales == originales
+        total += sum(bool(t) for t in originales)
+    assert total > 0
+
+
+def test_mismo_texto_con_ruido_y_duplicados():
+    """Páginas con ruido vertical, espacios y caracteres duplicados en la misma posición (OCR)"""
+    rnd = random.Random(7)
+    for _ in range(10):
+        alto, chars = pagina_sintetica(rnd)
+        originales, actuales = textos(alto, chars, highlights_sinteticos(rnd, alto, 20))
+        assert actuales == originales
@@ -0,0 +1,132 @@
+# ==========================================
+# TRABAJOS DE PROCESAMIENTO EN SEGUNDO PLANO
+# ==========================================
+
+import io
+import threading
+import time
+
+from app.config import DEFAULT_COLOR_OPTIONS, DEFAULT_TOC_CONFIG
+from app.core import PDFMapeado, cache_resultados, escanear_colores_pdf, hash_contenido
+from app.core import trabajos
+from benchmarks.corpus import generar_pdf_sintetico
+
+
+def config_corpus(pdf_bytes, **extra):
+    colores = escanear_colores_pdf(io.BytesIO(pdf_bytes))
+    config = {
+        'padding': 1,
+        'usar_toc': True,
+        'separar_paginas': True,
+        'mapa_colores': {color: dict(DEFAULT_COLOR_OPTIONS, accion="Texto Normal") for color in colores},
+        'config_toc': dict(DEFAULT_TOC_CONFIG),
+    }
+    config.update(extra)
+    return config
+
+
+def test_exporta_a_disco_tambien_desde_el_cache(monkeypatch):
+    exportados = []
+    monkeypatch.setattr(trabajos, "exportar_docx_async", lambda datos, usuario=None, clave=None: exportados.append((datos, usuario)))
+    pdf_bytes = generar_pdf_sintetico(paginas=2, highlights_por_pagina=3)
+    config = config_corpus(pdf_bytes, exportar_disco=True, usuario="u1")
+    hash_pdf = hash_contenido(io.BytesIO(pdf_bytes))
+    cache_resultados.limpiar()
+
+    primero = trabajos.trabajo_procesar_pdf(PDFMapeado(io.BytesIO(pdf_bytes)), config, hash_pdf)
+    # Otro usuario, mismo PDF y misma config: el resultado sale del caché
+    segundo = trabajos.trabajo_procesar_pdf(PDFMapeado(io.BytesIO(pdf_bytes)), dict(config, usuario="u2"), hash_pdf)
+
+    assert segundo['metricas']['etapas'] == {}
+    assert exportados == [(primero['word_bytes'], "u1"), (segundo['word_bytes'], "u2")]
+
+
+def test_sin_exportar_disco_no_exporta(monkeypatch):
+    exportados = []
+    monkeypatch.setattr(trabajos, "exportar_docx_async", lambda datos, usuario=None, clave=None: exportados.append(datos))
+    pdf_bytes = generar_pdf_sintetico(paginas=1, highlights_por_pagina=2)
+
+    trabajos.trabajo_procesar_pdf(PDFMapeado(io.BytesIO(pdf_bytes)), config_corpus(pdf_bytes))
+
+    assert exportados == []
+
+
+def esperar_final(cola, id_trabajo, timeout=10):
+    limite = time.monotonic() + timeout
+    while cola.estado(id_trabajo)['estado'] not in trabajos.ESTADOS_FINALES:
+        assert time.monotonic() < limite
+        time.sleep(0.01)
+    return cola.retirar(id_trabajo)
+
+
+def test_al_finalizar_en_cada_final():
+    cola = trabajos.ColaTrabajos(1)
+    finalizados = []
+
+    def ok(al_progresar):
+        return "listo"
+
+    def falla(al_progresar):
+        raise ValueError("roto")
+
+    def cancelable(al_progresar):
+        while True:
+            al_progresar(0.5)
+            time.sleep(0.01)
+
+    id_ok = cola.enviar(ok, al_finalizar=lambda: finalizados.append("ok"))
+    assert esperar_final(cola, id_ok)['resultado'] == "listo"
+    id_falla = cola.enviar(falla, al_finalizar=lambda: finalizados.append("falla"))
+    assert esperar_final(cola, id_falla)['estado'] == "error"
+    id_cancelable = cola.enviar(cancelable, al_finalizar=lambda: finalizados.append("cancelado"))
+    while cola.estado(id_cancelable)['estado'] != "ejecutando":
+        time.sleep(0.01)
+    cola.cancelar(id_cancelable)
+    assert esperar_final(cola, id_cancelable)['estado'] == "cancelado"
+
+    assert finalizados == ["ok", "falla", "cancelado"]
+
+
+def test_cancelado_en_cola_libera_el_pdf():
+    cola = trabajos.ColaTrabajos(1)
+    liberar = threading.Event()
+    bloqueante = cola.enviar(lambda al_progresar: liberar.wait(10))
+    pdf_bytes = generar_pdf_sintetico(paginas=1, highlights_por_pagina=1)
+    pdf = PDFMapeado(io.BytesIO(pdf_bytes))
+
+    id_trabajo = cola.enviar(trabajos.trabajo_procesar_pdf, pdf, config_corpus(pdf_bytes), al_finalizar=pdf.cerrar)
+    assert cola.cancelar(id_trabajo)
+
+    # Nunca corrió, pero el temporal y su mapa ya se cerraron
+    assert cola.retirar(id_trabajo)['estado'] == "cancelado"
+    assert pdf._archivo.closed and pdf._mapa.closed
+    liberar.set()
+    esperar_final(cola, bloqueante)
+
+
+def test_solo_vuelca_y_reserva_si_hay_que_extraer(monkeypatch):
+    volcados, reservas = [], []
+
+    class PDFMapeadoContado(PDFMapeado):
+        def __init__(self, origen):
+            volcados.append(origen)
+            super().__init__(origen)
+
+    reservar = trabajos.presupuesto_memoria.reservar
+    monkeypatch.setattr(trabajos, "PDFMapeado", PDFMapeadoContado)
+    monkeypatch.setattr(trabajos.presupuesto_memoria, "reservar", lambda cantidad, al_esperar=None: reservas.append(cantidad) or reservar(cantidad, al_esperar))
+    pdf_bytes = generar_pdf_sintetico(paginas=2, highlights_por_pagina=3)
+    config = config_corpus(pdf_bytes)
+    hash_pdf = hash_contenido(io.BytesIO(pdf_bytes))
+    cache_resultados.limpiar()
+
+    primero = trabajos.trabajo_procesar_pdf(io.BytesIO(pdf_bytes), config, hash_pdf)
+    assert len(volcados) == 1 and len(reservas) == 1
+
+    # Mismo resultado en caché
+    assert trabajos.trabajo_procesar_pdf(io.BytesIO(pdf_bytes), config, hash_pdf)['word_bytes'] == primero['word_bytes']
+    # Otra configuración de estilos: la extracción sale del caché
+    otra = trabajos.trabajo_procesar_pdf(io.BytesIO(pdf_bytes), dict(config, usar_toc=False), hash_pdf)
+    assert otra['metricas']['contadores'] == {'extraccion_desde_cache': 1}
+
+    assert len(volcados) == 1 and len(reservas) == 1